@@ -10,6 +10,9 @@ import pytz
 import csv
 import uuid
 from doc_processor import DocumentProcessor
+from play_encoding import ENCODINGS
+from stats_engine import EXAMPLE_TOKEN_BUDGET
+from topics import resolve_topic, strip_prefix, BUTTON_PREFIX
 from calendar_service import CalendarService
 import time
 import random
@@ -31,6 +34,11 @@ try:
     doc_processor = DocumentProcessor()
     calendar_service = CalendarService()
     
+    # Pick up new or changed game files without a restart. Under the debug
+    # reloader only the serving child process watches, not the supervisor.
+    if os.environ.get('WERKZEUG_RUN_MAIN') == 'true' or __name__ != '__main__':
+        doc_processor.start_watcher()
+    
     # Configure Gemini AI
     GOOGLE_API_KEY = os.getenv('GOOGLE_API_KEY')
     if not GOOGLE_API_KEY:
@@ -304,7 +312,25 @@ try:
         # Only suggest on exactly the 6th message
         return count == 6
 
-    def get_ai_response(message, chat_context=None):
+    def get_scheduling_response(message, session_id):
+        """Book the call a scheduling message asks for; None when nothing could be booked"""
+        try:
+            result = calendar_service.schedule_call(message)
+            if result.get('success'):
+                if session_id:
+                    session_states[session_id] = {
+                        'awaiting_rating': True,
+                        'call_scheduled': True
+                    }
+                    message_counts[session_id] = 0
+                return f"""Perfect! Your consultation is scheduled for {result.get('event_time')}. Calendar invites sent.
+
+            Please rate your experience with me today (1-5)."""
+        except Exception as e:
+            print(f"Error scheduling call: {str(e)}")
+        return None
+
+    def get_ai_response(message, chat_context=None, doc_context=None, encoding=None, plan=None):
         try:
             print("\n=== AI Response Debug ===")
             print(f"Processing message: {message}")
@@ -318,35 +344,10 @@ try:
             if session_id and session_id in completed_sessions:
                 return "🔒 This conversation has ended. Please click 'Clear Chat' or refresh the page to start a new chat."
 
-            # First, handle greetings and introductions
-            greeting_keywords = ['hi', 'hello', 'hey', 'good morning', 'good afternoon', 'good evening']
-            name_keywords = ['i am', 'my name', 'this is']
-            
-            message_lower = message.lower()
-            is_greeting = any(keyword in message_lower for keyword in greeting_keywords)
-            contains_name = any(keyword in message_lower for keyword in name_keywords)
-            
-            # Handle initial greeting with name
-            if (is_greeting or contains_name): # and not chat_context
-                # Extract name if present
-                name = None
-                if contains_name:
-                    for keyword in name_keywords:
-                        if keyword in message_lower:
-                            name_part = message_lower.split(keyword)[-1].strip()
-                            if name_part:
-                                name = name_part.title()
-                                break
-                
-                greeting = f"Hello{' ' + name if name else ''}!" + "\n" + "Welcome to the NFL Play-by-Play Assistant. I'm your virtual analyst, here to help you with:\n"
-                services = [
-                    "• Generating tactical summaries for any NFL team",
-                    "• Identifying play-calling tendencies and patterns",
-                    "• Analyzing player behavior (QBs, RBs, WRs)",
-                    "• Preparing game-specific scouting reports"
-                ]
-                response = greeting + "\n".join(services) + "\n\nHow can I assist you today?"
-                return response
+            # Classify the message and plan its steps unless the caller already did
+            if plan is None:
+                plan = doc_processor.plan_query(message)
+                print(f"Query plan: {plan.describe()}")
 
             # Check session state for rating/feedback flow
             if session_id and session_id in session_states:
@@ -388,17 +389,92 @@ try:
                     print(f"Storing final chat state - Session: {session_id}, Rating: {rating}, Feedback: {feedback}, Call Scheduled: {call_scheduled}")
                     return "✨ Thank you for your feedback! Chat session complete."
 
-            # Get relevant document context first
-            try:
-                print("Searching document context...")
-                doc_context = doc_processor.get_document_context(message)
-                print(f"Document context found: {bool(doc_context)}")
-                if doc_context:
-                    print(f"Context preview: {doc_context[:200]}...")
-            except Exception as doc_error:
-                print(f"Error getting document context: {str(doc_error)}")
+            # Small talk the planner recognized gets a canned reply
+            if 'reply' in plan.steps:
+                return "You're welcome! Ask me about any team, player, down or quarter whenever you're ready."
+
+            # Handle greetings and introductions
+            name_keywords = ['i am', 'my name', 'this is']
+            
+            message_lower = message.lower()
+            contains_name = any(keyword in message_lower for keyword in name_keywords)
+            
+            # Handle initial greeting with name
+            if 'greet' in plan.steps:
+                # Extract name if present
+                name = None
+                if contains_name:
+                    for keyword in name_keywords:
+                        if keyword in message_lower:
+                            name_part = message_lower.split(keyword)[-1].strip()
+                            if name_part:
+                                name = name_part.title()
+                                break
+                
+                greeting = f"Hello{' ' + name if name else ''}!" + "\n" + "Welcome to the NFL Play-by-Play Assistant. I'm your virtual analyst, here to help you with:\n"
+                services = [
+                    "• Generating tactical summaries for any NFL team",
+                    "• Identifying play-calling tendencies and patterns",
+                    "• Analyzing player behavior (QBs, RBs, WRs)",
+                    "• Preparing game-specific scouting reports"
+                ]
+                response = greeting + "\n".join(services) + "\n\nHow can I assist you today?"
+                return response
+
+            # Counts, play lookups and drive charts the indexes answer on their own skip the model
+            if doc_context is None and not plan.needs_llm():
+                started = time.perf_counter()
+                try:
+                    answer = doc_processor.answer_plan(plan)
+                except Exception as plan_error:
+                    print(f"Error answering from the indexes: {str(plan_error)}")
+                    answer = ""
+                if answer:
+                    print(f"Answered {plan.intent} question without the model in "
+                          f"{(time.perf_counter() - started) * 1000:.1f} ms")
+                    return answer
+            # A scheduling message that booked nothing and names no football needs no play context
+            if doc_context is None and plan.intent == 'scheduling' and 'retrieve' not in plan.steps:
                 doc_context = ""
 
+            # Get relevant document context first, unless the caller already selected it. Questions
+            # asking for counts or rates get the exact numbers and a few example plays instead of
+            # a full budget of raw plays to tally.
+            if doc_context is None:
+                try:
+                    stats_context = doc_processor.get_stats_context(message, plan.slots['player'])
+                except Exception as stats_error:
+                    print(f"Error computing stats: {str(stats_error)}")
+                    stats_context = ""
+                try:
+                    print("Searching document context...")
+                    if stats_context:
+                        examples = doc_processor.get_document_context(message, budget=EXAMPLE_TOKEN_BUDGET,
+                                                                      encoding=encoding)
+                        doc_context = stats_context + ("\n\nExample plays:\n" + examples if examples else "")
+                    else:
+                        doc_context = doc_processor.get_document_context(message, encoding=encoding)
+                    print(f"Document context found: {bool(doc_context)}")
+                    if doc_context:
+                        print(f"Context preview: {doc_context[:200]}...")
+                except Exception as doc_error:
+                    print(f"Error getting document context: {str(doc_error)}")
+                    doc_context = ""
+
+            # Plays inside any game-clock window the question names (two-minute drill, last 5 minutes of the 4th)
+            try:
+                window_context = doc_processor.get_time_window_context(message)
+            except Exception as window_error:
+                print(f"Error getting time window context: {str(window_error)}")
+                window_context = ""
+
+            # Drive chart reconstructed from the plays, for questions about drives
+            try:
+                drive_context = doc_processor.get_drive_context(message)
+            except Exception as drive_error:
+                print(f"Error building drive chart: {str(drive_error)}")
+                drive_context = ""
+
             # Prepare conversation history
             conversation = []
             if chat_context:
@@ -415,6 +491,12 @@ try:
             == Play-by-Play Input ==
             {doc_context if doc_context else 'No structured context — use raw logs to analyze.'}
 
+            == Plays In Requested Time Window ==
+            {window_context if window_context else 'No specific game-clock window requested.'}
+
+            == Drive Chart ==
+            {drive_context if drive_context else 'Drives are marked in the play-by-play input where relevant.'}
+
             == Prior Conversation ==
             {str(conversation) if conversation else 'No previous messages'}
 
@@ -423,13 +505,14 @@ try:
 
             == Your Task ==
             - Parse and extract key details: down, distance, yard line, play type (pass/rush/punt/etc.), player names, and outcomes.
-            - Group sequences into drives — from one possession change to the next.
+            - Drives are already segmented: use the Drive Chart and "Drive N" headers rather than regrouping plays.
             - Cite timestamps and quarters when possible (e.g., “Q2 3:42”).
             - Use structured insights from raw play descriptions; **do not rely on pre-parsed formats**.
             - If red zone tendencies, pass depth, or rush styles are requested — infer them by scanning and summarizing patterns in the raw logs.
 
             == Rules ==
             - Answer based strictly on the provided data.
+            - When the input opens with exact counts computed from the plays, quote those numbers rather than recounting.
             - Be specific. Use numbers, patterns, and examples from the logs.
             - Format your response professionally and tactically, with bullets or numbering if helpful.
             - Keep the final answer concise — no more than 200 words.
@@ -438,7 +521,7 @@ try:
             == Chain of Thought ==
             To generate your answer:
             1. **Step 1:** First parse and extract key elements from each play (down, distance, players, outcomes).
-            2. **Step 2:** Organize plays into drives and summarize sequences.
+            2. **Step 2:** Place plays in their drives (from the Drive Chart or "Drive N" headers) and summarize sequences.
             3. **Step 3:** Look for patterns relevant to the user's question (e.g., run-pass ratio, red zone behavior).
             4. **Step 4:** Only then, generate a final summary of insights using structured football reasoning.
 
@@ -470,9 +553,58 @@ try:
             print(traceback.format_exc())
             return "I apologize, but I'm having trouble processing your request. Please try again or ask a different question."
 
+    # Questions whose target figures (depth, direction, aDOT per receiver) the stats engine computes
+    TARGET_TOPICS = {
+        'routing tendencies': "Pass direction and depth tendencies by receiver",
+        'adot': "Average depth of target (aDOT) and deep share per receiver",
+    }
+
+    def get_player_topic_response(topic, player=None):
+        """Summarize one player's plays; the top passer for a quarterback summary"""
+        if not player:
+            if topic == 'quarterback summary':
+                passers = doc_processor.top_players('passer', 1)
+                player = passers[0][0] if passers else None
+            else:
+                # Most targeted receiver, otherwise the busiest rusher
+                candidates = doc_processor.top_players('target', 1) or doc_processor.top_players('rusher', 1)
+                player = candidates[0][0] if candidates else None
+        if not player:
+            return None
+        player_context = doc_processor.get_player_context(player)
+        if not player_context:
+            return None
+        # The materialized report leads so the narrative quotes its exact figures
+        report = doc_processor.get_report_context('passer' if topic == 'quarterback summary' else 'player', player)
+        label = 'Quarterback' if topic == 'quarterback summary' else 'Player-level'
+        return get_ai_response(f"{label} behavior summary for {player}",
+                               doc_context="\n\n".join(part for part in (report, player_context) if part))
+
+    def get_report_topic_response(topic):
+        """Materialized report for a report button, formatted without an LLM call"""
+        if topic == 'team report':
+            return doc_processor.get_report_context('team') or None
+        role = 'passer' if topic == 'quarterback summary' else 'target'
+        report = doc_processor.get_report_context(role)
+        # Teams without a pass target still have a busiest rusher
+        return report or doc_processor.get_report_context('rusher') or None
+
+    def get_target_topic_response(topic):
+        """Narrate per-receiver target figures computed from the parsed pass columns"""
+        question = TARGET_TOPICS[topic]
+        try:
+            stats_context = doc_processor.get_stats_context(question)
+        except Exception as stats_error:
+            print(f"Error computing target figures: {str(stats_error)}")
+            return None
+        if not stats_context:
+            return None
+        return get_ai_response(f"{question}. Narrate these exact figures; do not recount plays.",
+                               doc_context=stats_context)
+
     # Topic-specific responses for button clicks
-    def get_topic_response(topic):
-        """Get hardcoded responses for button clicks"""
+    def get_topic_response(topic, narrate=False):
+        """Get responses for button clicks; report buttons answer from materialized reports unless narrate is set"""
         responses = {
             'team report': """Sharing a team-level behavior report!""",
                         
@@ -482,14 +614,36 @@ try:
                         
             'routing tendencies': """Sharing routing tendicies by top pass target!""",
                         
-            'aDOT': """Sharing average depth of target (aDOT) per receiver!""",
+            'adot': """Sharing average depth of target (aDOT) per receiver!""",
                         
             'about us': """Sharing details about us!"""
             }
         
-        # Handle "Tell me about" format
-        if topic.lower().startswith('tell me about '):
-            topic = topic.lower().replace('tell me about ', '')
+        # Button labels resolve to their topic; other "Tell me about" messages keep their wording
+        topic = resolve_topic(topic) or strip_prefix(topic)
+        
+        # Report buttons return the report built at ingest; the LLM only narrates it on request
+        if topic.lower() in ('team report', 'player summary', 'quarterback summary') and not narrate:
+            report_response = get_report_topic_response(topic.lower())
+            if report_response:
+                return report_response
+
+        # Narrated player buttons analyze exactly one player's plays from the player index
+        if topic.lower() in ('player summary', 'quarterback summary'):
+            player_response = get_player_topic_response(topic.lower())
+            if player_response:
+                return player_response
+
+        if topic.lower() == 'team report':
+            report = doc_processor.get_report_context('team')
+            if report:
+                return get_ai_response("Team-level behavior report. Narrate these exact figures; do not recount plays.",
+                                       doc_context=report)
+        
+        # Route and depth buttons narrate exact target figures
+        if topic.lower() in TARGET_TOPICS:
+            target_response = get_target_topic_response(topic.lower())
+            return target_response or get_ai_response(f"Tell me about {TARGET_TOPICS[topic.lower()]}")
             
         # First try to get hardcoded response
         response = responses.get(topic.lower())
@@ -541,59 +695,46 @@ try:
             data = request.get_json()
             message = data.get('message', '')
             session_id = data.get('session_id', '')
+            # Optional per-request prompt encoding of plays ('text' or 'compact'), for A/B comparisons
+            encoding = data.get('encoding')
+            # Report buttons answer from materialized reports; narrate asks the LLM to write them up
+            narrate = bool(data.get('narrate'))
 
             if not message:
                 return jsonify({'error': 'No message provided'}), 400
+            if encoding and encoding not in ENCODINGS:
+                return jsonify({'error': f"Unknown encoding; expected one of {', '.join(ENCODINGS)}"}), 400
 
             print(f"\n=== New Chat Message ===")
             print(f"Session ID: {session_id}")
             print(f"Message: {message}")
+            if encoding:
+                print(f"Prompt encoding: {encoding}")
 
             # Log the user's message and get the session ID
             session_id = log_chat(session_id, 'user', message) or session_id
 
             # Check if this is a button click
-            is_button_click = message.lower().startswith('tell me about ') or message.lower() in [
-                'team report', 'player summary', 'quarterback summary', 'routing tendencies', 
-                'aDOT', 'about us'
-            ]
+            is_button_click = message.lower().startswith(BUTTON_PREFIX) or resolve_topic(message) is not None
 
             # Get response based on whether it's a button click or regular message
             if is_button_click:
-                response = get_topic_response(message)
+                response = get_topic_response(message, narrate=narrate)
             else:
                 # Get chat context for this session
                 chat_context = chat_histories.get(session_id, [])
                 print(f"Chat context length: {len(chat_context)}")
-                response = get_ai_response(message, chat_context)
+                # Plan first: counts and lookups come from the indexes, and a booked call needs no model
+                plan = doc_processor.plan_query(message)
+                print(f"Query plan: {plan.describe()}")
+                response = None
+                if plan.intent == 'scheduling' and session_id not in completed_sessions:
+                    response = get_scheduling_response(message, session_id)
+                if not response:
+                    response = get_ai_response(message, chat_context, encoding=encoding, plan=plan)
 
             print(f"Response received: {response[:200]}...")
 
-            # Check if this is a scheduling attempt
-            scheduling_keywords = ['tomorrow', 'next', 'schedule', 'book']
-            time_indicators = ['pm', 'am', ':']
-            is_scheduling_attempt = (
-                any(keyword in message.lower() for keyword in scheduling_keywords) and
-                any(indicator in message.lower() for indicator in time_indicators)
-            )
-
-            # Handle scheduling if detected
-            if is_scheduling_attempt:
-                try:
-                    result = calendar_service.schedule_call(message)
-                    if result.get('success'):
-                        if session_id:
-                            session_states[session_id] = {
-                                'awaiting_rating': True,
-                                'call_scheduled': True
-                            }
-                            message_counts[session_id] = 0
-                        response = f"""Perfect! Your consultation is scheduled for {result.get('event_time')}. Calendar invites sent.
-
-            Please rate your experience with me today (1-5)."""
-                except Exception as e:
-                    print(f"Error scheduling call: {str(e)}")
-
             # Check if we should ask for rating (after 6 messages if no call scheduled)
             message_count = message_counts.get(session_id, 0)
             if message_count >= 10 and session_id not in completed_sessions:  #6
@@ -651,6 +792,25 @@ try:
             print(traceback.format_exc())
             return jsonify({"error": str(e)}), 500
 
+    @app.route('/retrieval_cache')
+    def retrieval_cache():
+        return jsonify(doc_processor.retrieval_cache_stats())
+
+    @app.route('/reports')
+    def reports():
+        """Materialized report as JSON: ?kind=team|passer|rusher|target|player&name=..."""
+        kind = request.args.get('kind', 'team')
+        name = request.args.get('name')
+        if kind == 'team':
+            report = doc_processor.get_team_report(name)
+        elif kind in ('passer', 'rusher', 'target', 'player'):
+            report = doc_processor.get_player_report(name, None if kind == 'player' else kind)
+        else:
+            return jsonify({'error': 'Unknown report kind'}), 400
+        if not report:
+            return jsonify({'error': 'No report found'}), 404
+        return jsonify(report)
+
     @app.route('/static/<path:filename>')
     def serve_static(filename):
         return send_from_directory(app.static_folder, filename)
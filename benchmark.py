@@ -0,0 +1,194 @@
+import os
+import sys
+import json
+import time
+import shutil
+import platform
+import resource
+import argparse
+import tempfile
+import subprocess
+import contextlib
+from synthetic_corpus import FLAVORS, write_corpus_dir
+
+DEFAULT_OUTPUT = 'benchmark_results.jsonl'
+DEFAULT_SIZES = '17,68,272'
+
+# A mix of the question shapes the assistant gets: players, situations, time windows, drives
+QUERIES = (
+    'third down passes in the red zone',
+    'How does the offense attack on 3rd and long?',
+    'Tell me about Jackson',
+    'deep passes to the left',
+    'rushing plays up the middle on first down',
+    'What happened in the last 2 minutes of the 4th quarter?',
+    'scoring drives in the second half',
+    'sacks and interceptions',
+    'field goal attempts',
+    'quarter by quarter momentum',
+)
+
+
+def percentile(values, fraction):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+
+def latency(function, queries, rounds):
+    """p50 / p95 / mean milliseconds of function(query) over every query, repeated rounds times"""
+    timings = []
+    for _ in range(rounds):
+        for query in queries:
+            started = time.perf_counter()
+            function(query)
+            timings.append((time.perf_counter() - started) * 1000)
+    return {
+        'p50_ms': round(percentile(timings, 0.5), 3),
+        'p95_ms': round(percentile(timings, 0.95), 3),
+        'mean_ms': round(sum(timings) / len(timings), 3),
+        'queries': len(timings),
+    }
+
+
+def peak_rss_mb(who=resource.RUSAGE_SELF):
+    # ru_maxrss is in kilobytes on Linux and bytes on macOS
+    peak = resource.getrusage(who).ru_maxrss
+    return round(peak / (1024 * 1024 if sys.platform == 'darwin' else 1024), 1)
+
+
+def measure(docs_dir, workers, rounds):
+    """Ingest one corpus directory in this process and return its measurements"""
+    work_dir = tempfile.mkdtemp(prefix='benchmark-artifacts-')
+    # Measure real extraction, not cache or corpus file hits
+    os.environ.update({'INGEST_CACHE': '0', 'CORPUS_STORE': '0', 'INGEST_ARTIFACT_DIR': work_dir})
+    from doc_processor import DocumentProcessor, EXTRACTOR_VERSION
+    from corpus_store import MappedCorpus, write_corpus
+
+    try:
+        with open(os.devnull, 'w') as devnull, contextlib.redirect_stdout(devnull):
+            processor = DocumentProcessor(docs_dir, workers=workers, autoload=False)
+            started = time.perf_counter()
+            processor.load_all_documents()
+            ingest_seconds = time.perf_counter() - started
+            started = time.perf_counter()
+            processor.build_index()
+            index_seconds = time.perf_counter() - started
+
+            plays = len(processor.play_table)
+            search = latency(processor.search_knowledge_base, QUERIES, rounds)
+            context = latency(processor.get_document_context, QUERIES, rounds)
+
+            corpus_path = os.path.join(work_dir, 'corpus.bin')
+            started = time.perf_counter()
+            corpus_bytes = write_corpus(corpus_path, processor.knowledge_base, processor.sources, EXTRACTOR_VERSION)
+            write_seconds = time.perf_counter() - started
+            started = time.perf_counter()
+            MappedCorpus(corpus_path)
+            open_seconds = time.perf_counter() - started
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+    return {
+        'extractor_version': EXTRACTOR_VERSION,
+        'files': len(processor.ingest_report),
+        'failed_files': sum(1 for entry in processor.ingest_report if entry['error']),
+        'input_bytes': sum(os.path.getsize(os.path.join(docs_dir, name)) for name in os.listdir(docs_dir)),
+        'plays': plays,
+        'retrieval_units': len(processor.index.units),
+        'ingest_seconds': round(ingest_seconds, 3),
+        'ingest_plays_per_second': round(plays / ingest_seconds, 1) if ingest_seconds else None,
+        'index_seconds': round(index_seconds, 3),
+        'peak_rss_mb': peak_rss_mb(),
+        'worker_peak_rss_mb': peak_rss_mb(resource.RUSAGE_CHILDREN),
+        'search_latency': search,
+        'context_latency': context,
+        'corpus_store': {
+            'bytes': corpus_bytes,
+            'write_seconds': round(write_seconds, 3),
+            'open_seconds': round(open_seconds, 4),
+        },
+    }
+
+
+def git_revision():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True,
+                              cwd=os.path.dirname(os.path.abspath(__file__)), timeout=10).stdout.strip() or None
+    except (OSError, subprocess.SubprocessError):
+        return None
+
+
+def run(args):
+    """Generate each corpus size and measure it in a fresh process so peak RSS is per size"""
+    sizes = [int(size) for size in args.sizes.split(',') if size.strip()]
+    revision = git_revision()
+    failures = 0
+    for games in sizes:
+        corpus_dir = tempfile.mkdtemp(prefix=f'benchmark-{args.flavor}-{games}-')
+        try:
+            started = time.perf_counter()
+            written, plays = write_corpus_dir(corpus_dir, args.flavor, teams=args.teams, seasons=args.seasons,
+                                              seed=args.seed, limit=games)
+            generate_seconds = time.perf_counter() - started
+            print(f"Measuring {written} {args.flavor} games ({plays} plays)...")
+            command = [sys.executable, os.path.abspath(__file__), 'measure', corpus_dir,
+                       '--workers', str(args.workers), '--rounds', str(args.rounds)]
+            completed = subprocess.run(command, capture_output=True, text=True)
+            if completed.returncode != 0:
+                print(f"Measurement failed for {games} games:\n{completed.stderr}")
+                failures += 1
+                continue
+            result = {
+                'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S%z'),
+                'revision': revision,
+                'label': args.label,
+                'python': platform.python_version(),
+                'platform': platform.platform(),
+                'flavor': args.flavor,
+                'games': written,
+                'workers': args.workers,
+                'generate_seconds': round(generate_seconds, 3),
+            }
+            result.update(json.loads(completed.stdout.strip().splitlines()[-1]))
+        finally:
+            shutil.rmtree(corpus_dir, ignore_errors=True)
+
+        with open(args.output, 'a', encoding='utf-8') as file:
+            file.write(json.dumps(result, sort_keys=True) + "\n")
+        print(f"- {written} games, {result['plays']} plays: ingest {result['ingest_seconds']}s "
+              f"({result['ingest_plays_per_second']} plays/s), index {result['index_seconds']}s, "
+              f"peak RSS {result['peak_rss_mb']} MB, search p95 {result['search_latency']['p95_ms']} ms, "
+              f"context p95 {result['context_latency']['p95_ms']} ms")
+    print(f"Results appended to {args.output}")
+    return 1 if failures else 0
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark ingestion and retrieval on synthetic corpora")
+    subparsers = parser.add_subparsers(dest='command')
+    run_parser = subparsers.add_parser('run', help="Generate corpora of growing size and measure each (default)")
+    measure_parser = subparsers.add_parser('measure', help="Measure one existing documents directory")
+    measure_parser.add_argument('docs_dir')
+    for sub in (run_parser, measure_parser):
+        sub.add_argument('--workers', type=int, default=os.cpu_count() or 1)
+        sub.add_argument('--rounds', type=int, default=5, help="Times each benchmark query is repeated")
+    run_parser.add_argument('--flavor', choices=FLAVORS, default='pdf')
+    run_parser.add_argument('--sizes', default=DEFAULT_SIZES, help="Comma-separated game counts")
+    run_parser.add_argument('--teams', type=int, default=32)
+    run_parser.add_argument('--seasons', type=int, default=5)
+    run_parser.add_argument('--seed', type=int, default=0)
+    run_parser.add_argument('--label', help="Free-form tag stored with the results")
+    run_parser.add_argument('--output', default=DEFAULT_OUTPUT, help="JSON Lines file results are appended to")
+
+    argv = sys.argv[1:] if argv is None else list(argv)
+    if not argv or argv[0] not in ('run', 'measure', '-h', '--help'):
+        argv = ['run'] + argv
+    args = parser.parse_args(argv)
+    if args.command == 'measure':
+        print(json.dumps(measure(args.docs_dir, args.workers, args.rounds)))
+        return 0
+    return run(args)
+
+
+if __name__ == '__main__':
+    sys.exit(main())
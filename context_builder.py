@@ -0,0 +1,96 @@
+import re
+
+DEFAULT_TOKEN_BUDGET = 6000
+# Tokens of game-clock window plays a prompt carries on top of the document context
+TIME_WINDOW_TOKEN_BUDGET = 1500
+# Gemini averages about four characters of English per token
+CHARS_PER_TOKEN = 4
+
+WORD = re.compile(r'[a-z0-9]+')
+
+
+def estimate_tokens(text):
+    """Local estimate of the prompt tokens a text costs: a token per four characters, at least one per word"""
+    return max(len(text) // CHARS_PER_TOKEN, len(text.split()))
+
+
+def dedupe_key(text):
+    """Unit text without case, punctuation or spacing, so copies differing only in those collide.
+
+    Copies that differ in any word or number keep distinct keys; game units
+    whose plays are already in are skipped by play range in build_context().
+    """
+    return ' '.join(WORD.findall(text.lower()))
+
+
+def fit_lines(text, budget):
+    """Leading whole lines of text that fit in a token budget ("" if not even the first does)"""
+    kept = []
+    used = 0
+    for line in text.split("\n"):
+        cost = estimate_tokens(line) + 1
+        if used + cost > budget:
+            break
+        kept.append(line)
+        used += cost
+    return "\n".join(kept)
+
+
+def chronological_key(unit, plays, weeks):
+    """Game units by week (when known) and game, then by game clock; passages after, in rank order"""
+    if unit.play_start < 0:
+        return (1, 0, 0, 0, 0)
+    start = unit.play_start
+    return (0, weeks.get(unit.doc_id) or 0, plays.game[start], plays.game_seconds[start], start)
+
+
+def build_context(units, plays, budget=DEFAULT_TOKEN_BUDGET, header="Based on our documents:", weeks=None,
+                  encoder=None):
+    """Prompt context of ranked retrieval units within a token budget.
+
+    Units are taken best first, skipping near-duplicates and game units whose
+    plays are all already included, until the budget is spent; a unit too big
+    for what is left is cut at a line boundary if it would be the first, and
+    skipped otherwise. The chosen units are then put back in game and clock
+    order and joined once. With an encoder (play_encoding.CompactEncoder)
+    units are rendered and assembled by it, after setting aside room for the
+    legend every candidate unit could need. Returns (context, estimated
+    tokens, units used).
+    """
+    weeks = weeks or {}
+    remaining = budget - estimate_tokens(header)
+    if encoder:
+        remaining -= encoder.overhead(units)
+    seen = set()
+    covered = set()
+    chosen = []
+    for rank, unit in enumerate(units):
+        key = dedupe_key(unit.text)
+        if not key or key in seen:
+            continue
+        unit_plays = range(unit.play_start, unit.play_end) if unit.play_start >= 0 else ()
+        if unit_plays and all(i in covered for i in unit_plays):
+            continue
+        text = encoder.render(unit) if encoder else unit.text
+        cost = estimate_tokens(text) + 1
+        if cost > remaining:
+            if chosen:
+                continue
+            text = fit_lines(text, remaining)
+            if not text:
+                break
+            cost = estimate_tokens(text) + 1
+        seen.add(key)
+        covered.update(unit_plays)
+        chosen.append((chronological_key(unit, plays, weeks), rank, text, unit))
+        remaining -= cost
+        if remaining <= 0:
+            break
+    if not chosen:
+        return "", 0, 0
+    chosen.sort(key=lambda entry: entry[:2])
+    if encoder:
+        context = encoder.assemble(header, [(unit, text) for _, _, text, unit in chosen])
+    else:
+        context = "\n\n".join([header] + [text for _, _, text, _ in chosen])
+    return context, estimate_tokens(context), len(chosen)
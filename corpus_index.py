@@ -0,0 +1,341 @@
+from array import array
+from play_parser import PlayTable
+from search_index import BM25Index, token_counts, merge_counts
+from vector_index import VectorIndex
+from game_router import GameRouter
+from stats_engine import StatsEngine
+from drive_table import DriveTable
+from play_index import FacetIndex, ClockIndex, PlayerIndex, parse_situation, parse_time_window, ids_from_bitmap
+
+GRANULARITIES = ('play', 'drive', 'quarter')
+
+# How many units of each granularity a search returns by default
+DEFAULT_LIMITS = {'play': 60, 'drive': 12, 'quarter': 4, 'passage': 20}
+
+DRIVE_TERMS = ('drive', 'possession', 'series', 'sequence', 'scoring march')
+QUARTER_TERMS = ('by quarter', 'each quarter', 'per quarter', 'quarter by quarter', 'each half', 'by half',
+                 'game flow', 'momentum', 'start to finish')
+
+# Reciprocal rank fusion constant: how much rank 1 outweighs rank 10 when merging lexical and vector results
+FUSION_K = 60
+
+# Passages longer than this are split at whitespace
+MAX_PASSAGE_CHARS = 1200
+
+
+class RetrievalUnit:
+    """A searchable piece of the corpus: a play, drive, quarter or free-text passage.
+
+    A game unit keeps only its play range and heading; its text is read from
+    the play table when asked for, so with a memory-mapped corpus the play
+    records stay in the shared mapped pages instead of being copied per unit.
+    """
+
+    __slots__ = ('unit_id', 'doc_id', 'granularity', 'header', 'play_start', 'play_end', 'plays')
+
+    def __init__(self, unit_id, doc_id, granularity, header, play_start=-1, play_end=-1, plays=None):
+        self.unit_id = unit_id
+        self.doc_id = doc_id
+        self.granularity = granularity
+        # Text of a passage, or the heading line of a drive or quarter (None for a play)
+        self.header = header
+        # Range of plays in CorpusIndex.plays covered by this unit (end exclusive)
+        self.play_start = play_start
+        self.play_end = play_end
+        self.plays = plays
+
+    @property
+    def text(self):
+        if self.plays is None:
+            return self.header
+        records = self.plays.text[self.play_start:self.play_end]
+        return "\n".join(records if self.header is None else [self.header] + records)
+
+
+def choose_granularity(query):
+    """Pick the retrieval granularity that matches the scope of a question"""
+    query = query.lower()
+    if any(term in query for term in DRIVE_TERMS):
+        return 'drive'
+    if any(term in query for term in QUARTER_TERMS):
+        return 'quarter'
+    return 'play'
+
+
+def play_token_counts(plays, i):
+    """(BM25F field term frequencies, term frequencies of the whole record) of a play, tokenizing its
+    text once; drive and quarter units reuse the whole-record counts of their plays"""
+    parts = plays.text[i].split(' | ')
+    description = ' | '.join(parts[4:])
+    label, text = description.split(':', 1) if ':' in description else ('', description)
+    situation = token_counts(' '.join(parts[:4]))
+    prose = token_counts(text)
+    fields = {
+        'player': token_counts(' '.join(plays.players_for(i))),
+        'play_type': token_counts(plays.play_types[plays.play_type[i]]),
+        'situation': situation,
+        'text': prose,
+    }
+    return fields, merge_counts(merge_counts(token_counts(label), situation), prose)
+
+
+def split_passages(text):
+    """Split free text into paragraph passages of bounded length"""
+    passages = []
+    for paragraph in text.split('\n\n'):
+        paragraph = ' '.join(paragraph.split())
+        while len(paragraph) > MAX_PASSAGE_CHARS:
+            cut = paragraph.rfind(' ', 0, MAX_PASSAGE_CHARS)
+            cut = cut if cut > 0 else MAX_PASSAGE_CHARS
+            passages.append(paragraph[:cut])
+            paragraph = paragraph[cut:].strip()
+        if paragraph:
+            passages.append(paragraph)
+    return passages
+
+
+class CorpusIndex:
+    """Retrieval units and play table built once from a loaded knowledge base.
+
+    Games with a parsed play table are indexed at three granularities (play,
+    drive and quarter) so a query can pick the scope it needs; every other
+    document becomes paragraph passages.
+
+    A prebuilt table holding every game's plays (the memory-mapped corpus) can
+    be passed as plays; it is used in place and documents then name their
+    'play_range' in it instead of carrying their own table.
+
+    Each game is a shard: its plays and its units of every granularity are
+    contiguous id ranges, recorded in shards, and a GameRouter picks the
+    shards a question names so only their slices of the indexes are read.
+    Its drives are reconstructed once into the drive table, whose summaries
+    head the drive units.
+
+    A reload passes the index it replaces as previous, with the doc ids that
+    were ingested again as stale: every other game keeps its units and BM25
+    entries from previous, so only new and changed games are tokenized.
+    """
+
+    def __init__(self, knowledge_base, plays=None, previous=None, stale=()):
+        self.plays = plays if plays is not None else PlayTable()
+        self.units = []
+        self.by_granularity = {name: [] for name in GRANULARITIES + ('passage',)}
+        # One BM25 index per granularity so a query only touches the units it can return
+        self.text_index = {name: BM25Index(previous.text_index[name] if previous is not None else None)
+                           for name in self.by_granularity}
+        # Unit id of each play's play-granularity unit
+        self.play_unit = array('I')
+        # doc id -> game name, week, play range and unit id range per granularity of each game
+        self.shards = {}
+        # Drive chart of every game, reconstructed from its plays
+        self.drives = DriveTable(self.plays)
+
+        for doc_id, content in knowledge_base.items():
+            play_range = content.get('play_range') if isinstance(content, dict) else None
+            plays = content.get('plays') if isinstance(content, dict) else None
+            reuse = previous if previous is not None and doc_id in previous.shards and doc_id not in stale else None
+            if play_range and plays is None:
+                self._add_game_units(doc_id, *play_range, week=content.get('week'), previous=reuse)
+            elif isinstance(plays, PlayTable) and len(plays):
+                offset = len(self.plays)
+                self.plays.extend(plays)
+                self._add_game_units(doc_id, offset, len(self.plays), week=content.get('week'), previous=reuse)
+            else:
+                self._add_passages(doc_id, content)
+        for text_index in self.text_index.values():
+            text_index.finalize()
+        self.facets = FacetIndex(self.plays)
+        self.clock = ClockIndex(self.plays)
+        self.players = PlayerIndex(self.plays)
+        self.vectors = VectorIndex(self)
+        self.router = GameRouter(self.shards)
+        self.stats = StatsEngine(self.plays, self.players)
+
+    def _append_unit(self, doc_id, granularity, header, play_start=-1, play_end=-1):
+        plays = self.plays if play_start >= 0 else None
+        unit = RetrievalUnit(len(self.units), doc_id, granularity, header, play_start, play_end, plays)
+        self.units.append(unit)
+        self.by_granularity[granularity].append(unit.unit_id)
+        return unit
+
+    def _add_unit(self, doc_id, granularity, header, play_start=-1, play_end=-1, fields=None, counts=None):
+        unit = self._append_unit(doc_id, granularity, header, play_start, play_end)
+        if counts is not None:
+            self.text_index[granularity].add_counts(unit.unit_id, counts)
+        else:
+            self.text_index[granularity].add(unit.unit_id, fields or header)
+
+    def _span_counts(self, header, record_counts, start, end):
+        """Term frequencies of a drive or quarter unit: its header and the records of its plays"""
+        counts = token_counts(header)
+        for i in range(start, end):
+            merge_counts(counts, record_counts[i])
+        return {'text': counts}
+
+    def _add_game_units(self, doc_id, start, end, week=None, previous=None):
+        plays = self.plays
+        shard = self.shards[doc_id] = {'game': plays.games[plays.game[start]], 'plays': (start, end), 'week': week}
+        if previous is not None:
+            self._copy_game_units(doc_id, shard, previous)
+            return
+        first_unit = len(self.units)
+        # Whole-record term frequencies by play id, for the drive and quarter units
+        record_counts = {}
+        for i in range(start, end):
+            fields, record_counts[i] = play_token_counts(plays, i)
+            self.play_unit.append(len(self.units))
+            self._add_unit(doc_id, 'play', None, i, i + 1, counts=fields)
+        shard['play'] = (first_unit, len(self.units))
+
+        first_unit = len(self.units)
+        drives = self.drives
+        shard['drives'] = drives.add_game(start, end)
+        for i in range(*shard['drives']):
+            drive_start, drive_end = drives.play_start[i], drives.play_end[i]
+            header = f"Drive {drives.number[i]} ({doc_id}): {drives.summary(i)}"
+            self._add_unit(doc_id, 'drive', header, drive_start, drive_end,
+                           counts=self._span_counts(header, record_counts, drive_start, drive_end))
+        shard['drive'] = (first_unit, len(self.units))
+
+        first_unit = len(self.units)
+        quarter_start = start
+        for i in range(start + 1, end + 1):
+            if i == end or plays.quarter[i] != plays.quarter[quarter_start]:
+                header = f"Quarter {plays.quarter[quarter_start]} ({doc_id}): {i - quarter_start} plays"
+                self._add_unit(doc_id, 'quarter', header, quarter_start, i,
+                               counts=self._span_counts(header, record_counts, quarter_start, i))
+                quarter_start = i
+        shard['quarter'] = (first_unit, len(self.units))
+
+    def _copy_game_units(self, doc_id, shard, previous):
+        """Take an unchanged game's units and BM25 entries from the previous index, moved to this one's ids"""
+        start, end = shard['plays']
+        old = previous.shards[doc_id]
+        shard['drives'] = self.drives.add_game(start, end)
+        play_offset = start - old['plays'][0]
+        for granularity in GRANULARITIES:
+            first_unit = len(self.units)
+            old_start, old_end = old[granularity]
+            for unit in previous.units[old_start:old_end]:
+                self._append_unit(doc_id, granularity, unit.header, unit.play_start + play_offset,
+                                  unit.play_end + play_offset)
+            if granularity == 'play':
+                self.play_unit.extend(range(first_unit, len(self.units)))
+            self.text_index[granularity].copy_units(previous.text_index[granularity], old_start, old_end,
+                                                    first_unit - old_start)
+            shard[granularity] = (first_unit, len(self.units))
+
+    def _add_passages(self, doc_id, content):
+        if isinstance(content, str):
+            passages = split_passages(content)
+        elif isinstance(content, dict) and 'text' in content:
+            passages = split_passages(content['text'])
+        elif isinstance(content, list):
+            passages = [' '.join(str(item).split()) for item in content]
+        else:
+            passages = split_passages(str(content))
+        for passage in passages:
+            if passage:
+                self._add_unit(doc_id, 'passage', passage)
+
+    def shard_ranges(self, games, granularity):
+        """Sorted (start, end) unit id ranges of a granularity in the given games' shards"""
+        return sorted(self.shards[doc_id][granularity] for doc_id in games if doc_id in self.shards)
+
+    def filter_units(self, filters, granularity, window_plays=None, games=None):
+        """Units of a granularity that contain at least one play matching the facet filters
+        (and, when given, falling in the set of time-window play ids and in the games' shards)"""
+        selected = self.facets.select(filters)
+        if games is not None:
+            shard_bits = 0
+            for doc_id in games:
+                start, end = self.shards[doc_id]['plays']
+                shard_bits |= (1 << end) - (1 << start)
+            selected &= shard_bits
+        play_ids = ids_from_bitmap(selected)
+        if window_plays is not None:
+            play_ids = [i for i in play_ids if i in window_plays]
+        if granularity == 'play':
+            return {self.play_unit[i] for i in play_ids}
+        matching = set(play_ids)
+        if games is None:
+            unit_ids = self.by_granularity[granularity]
+        else:
+            unit_ids = [unit_id for start, end in self.shard_ranges(games, granularity) for unit_id in range(start, end)]
+        return {unit_id for unit_id in unit_ids
+                if any(i in matching for i in range(self.units[unit_id].play_start, self.units[unit_id].play_end))}
+
+    def scope_plays(self, query, players=None):
+        """Play ids in the games and game-clock window a question names, and involving any of players
+        when given, or None when it names none of them"""
+        games = self.router.route(query)
+        clock_games = [self.shards[doc_id]['game'] for doc_id in games] if games is not None else None
+        play_ids = self.clock.select(parse_time_window(query), clock_games)
+        if play_ids is None and games is not None:
+            play_ids = [i for doc_id in games for i in range(*self.shards[doc_id]['plays'])]
+        if players:
+            involved = set()
+            for name in players:
+                involved.update(self.players.plays(name))
+            play_ids = sorted(involved if play_ids is None else involved.intersection(play_ids))
+        return play_ids
+
+    def scope_drives(self, query):
+        """Drive ids in the games and game-clock window a question names (every drive when it names neither)"""
+        games = self.router.route(query)
+        doc_ids = games if games is not None else self.shards
+        drive_ids = [i for doc_id in doc_ids for i in range(*self.shards[doc_id]['drives'])]
+        clock_games = [self.shards[doc_id]['game'] for doc_id in games] if games is not None else None
+        window_plays = self.clock.select(parse_time_window(query), clock_games)
+        if window_plays is not None:
+            window_plays = set(window_plays)
+            drives = self.drives
+            drive_ids = [i for i in drive_ids
+                         if any(j in window_plays for j in range(drives.play_start[i], drives.play_end[i]))]
+        return drive_ids
+
+    def search(self, query, granularity=None, limit=None, semantic=False):
+        """Rank units of one granularity (plus free-text passages) by BM25F score.
+
+        Situational wording (downs, distance, quarter, field zone, play type,
+        offense) and game-clock windows ("two-minute drill", "last 5 minutes
+        of the 4th") are turned into filters first, and only the units they
+        select are ranked. A question naming game ids, teams, opponents or
+        weeks is routed to those games' shards, so its cost scales with the
+        games it is about rather than the whole library. With semantic,
+        vector similarity results are fused in by reciprocal rank, so concept
+        matches ("attack the edge" for end runs) join the keyword matches.
+        """
+        granularity = granularity or choose_granularity(query)
+        limit = limit or DEFAULT_LIMITS[granularity]
+        games = self.router.route(query)
+        ranges = self.shard_ranges(games, granularity) if games is not None else None
+        filters = parse_situation(query)
+        clock_games = [self.shards[doc_id]['game'] for doc_id in games] if games is not None else None
+        window_plays = self.clock.select(parse_time_window(query), clock_games)
+        candidates = None
+        if (filters or window_plays is not None) and len(self.plays):
+            candidates = self.filter_units(filters, granularity, window_plays, games)
+            matches = self.text_index[granularity].search(query, limit, candidates=candidates, ranges=ranges)
+        else:
+            matches = self.text_index[granularity].search(query, limit, ranges=ranges)
+            # Free-text passages belong to no game and are searched whatever the routing
+            matches.extend(self.text_index['passage'].search(query, DEFAULT_LIMITS['passage']))
+        # Stable sort keeps equally relevant units in game order
+        matches.sort(key=lambda match: -match[0])
+        matches = matches[:limit]
+        if semantic:
+            matches = fuse(matches, self.vectors.search(query, granularity, limit, candidates, ranges), limit)
+        return [self.units[unit_id] for _, unit_id in matches]
+
+
+def fuse(lexical, vector, limit):
+    """Merge two ranked (score, unit_id) lists by reciprocal rank fusion"""
+    scores = {}
+    for ranking in (lexical, vector):
+        for rank, (_, unit_id) in enumerate(ranking):
+            scores[unit_id] = scores.get(unit_id, 0.0) + 1.0 / (FUSION_K + rank + 1)
+    # Lexical order breaks ties, so a query with no vector matches keeps its BM25 ranking
+    order = {unit_id: rank for rank, (_, unit_id) in enumerate(lexical)}
+    ranked = sorted(scores.items(), key=lambda item: (-item[1], order.get(item[0], len(order))))
+    return [(score, unit_id) for unit_id, score in ranked[:limit]]
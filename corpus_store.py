@@ -0,0 +1,188 @@
+import os
+import sys
+import json
+import mmap
+from array import array
+from play_parser import PlayTable, StringTable
+
+MAGIC = b'NFLCORP1'
+FORMAT_VERSION = 2
+# Every section starts on an 8-byte boundary so it can be cast to any typecode
+ALIGN = 8
+STRING_TABLES = ('games', 'teams', 'field_sides', 'play_types', 'players')
+
+
+def _padding(size):
+    return -size % ALIGN
+
+
+class MappedText:
+    """Read-only sequence of play texts decoded on access from a UTF-8 blob.
+
+    Text i is blob[offsets[i]:offsets[i + 1]]; nothing is decoded until it is
+    read, so the strings themselves stay in the shared mapped pages.
+    """
+
+    def __init__(self, blob, offsets):
+        self.blob = blob
+        self.offsets = offsets
+
+    def __len__(self):
+        return len(self.offsets) - 1
+
+    def __getitem__(self, i):
+        if isinstance(i, slice):
+            return [self[j] for j in range(*i.indices(len(self)))]
+        if i < 0:
+            i += len(self)
+        if not 0 <= i < len(self):
+            raise IndexError('play text index out of range')
+        return str(self.blob[self.offsets[i]:self.offsets[i + 1]], 'utf-8')
+
+    def __iter__(self):
+        for i in range(len(self)):
+            yield self[i]
+
+
+class MappedPlayTable(PlayTable):
+    """PlayTable whose columns are read-only views into a memory-mapped corpus file"""
+
+    def __init__(self, sections, strings):
+        for name in self.NUMERIC_COLUMNS:
+            setattr(self, name, sections[name])
+        self.player_offsets = sections['player_offsets']
+        self.player_ids = sections['player_ids']
+        self.text = MappedText(sections['text_blob'], sections['text_offsets'])
+        for name in STRING_TABLES:
+            setattr(self, name, StringTable(strings[name]))
+        self._sections = sections
+
+    def append(self, *args, **kwargs):
+        raise TypeError("A memory-mapped play table is read-only")
+
+    def extend(self, other, start=0, end=None):
+        raise TypeError("A memory-mapped play table is read-only")
+
+    def nbytes(self):
+        """Bytes of the corpus file mapped for this table"""
+        return sum(view.nbytes for view in self._sections.values())
+
+
+def write_corpus(path, knowledge_base, sources, version, source_plays=None):
+    """Write a knowledge base to the compact corpus format.
+
+    Documents with a 'play_range' (loaded from an earlier corpus file) take
+    their plays from source_plays, the table that range refers to.
+
+    Layout: MAGIC, an 8-byte little-endian header length, a JSON header
+    (documents, string tables, section offsets), then one aligned section per
+    numeric column, the CSR player lists, the text offsets and the UTF-8 text
+    blob. Documents without plays are kept as JSON in the header.
+    """
+    plays = PlayTable()
+    documents = []
+    for doc_id, content in knowledge_base.items():
+        table = content.get('plays') if isinstance(content, dict) else None
+        play_range = content.get('play_range') if isinstance(content, dict) else None
+        if play_range and table is None:
+            start = len(plays)
+            plays.extend(source_plays, *play_range)
+            documents.append({'doc_id': doc_id, 'play_range': [start, len(plays)], 'text': content.get('text', ''),
+                              'week': content.get('week')})
+        elif isinstance(table, PlayTable) and len(table):
+            start = len(plays)
+            plays.extend(table)
+            documents.append({'doc_id': doc_id, 'play_range': [start, len(plays)], 'text': content.get('text', ''),
+                              'week': content.get('week')})
+        elif isinstance(content, dict) and 'plays' in content:
+            # A PDF without play records; only its text is searchable
+            documents.append({'doc_id': doc_id, 'content': content.get('text', '')})
+        else:
+            documents.append({'doc_id': doc_id, 'content': content})
+
+    text_offsets = array('Q', [0])
+    text_blob = bytearray()
+    for text in plays.text:
+        text_blob.extend(text.encode('utf-8'))
+        text_offsets.append(len(text_blob))
+
+    arrays = [(name, getattr(plays, name)) for name in PlayTable.NUMERIC_COLUMNS]
+    arrays += [('player_offsets', plays.player_offsets), ('player_ids', plays.player_ids),
+               ('text_offsets', text_offsets), ('text_blob', array('B', text_blob))]
+    sections = {}
+    offset = 0
+    for name, values in arrays:
+        nbytes = len(values) * values.itemsize
+        sections[name] = [values.typecode, offset, nbytes]
+        offset += nbytes + _padding(nbytes)
+
+    header = json.dumps({
+        'format': FORMAT_VERSION,
+        'version': version,
+        'byteorder': sys.byteorder,
+        'sources': sources,
+        'plays': len(plays),
+        'documents': documents,
+        'strings': {name: getattr(plays, name).values for name in STRING_TABLES},
+        'sections': sections,
+    }).encode('utf-8')
+
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, 'wb') as file:
+        file.write(MAGIC)
+        file.write(len(header).to_bytes(8, 'little'))
+        file.write(header)
+        file.write(b'\0' * _padding(len(MAGIC) + 8 + len(header)))
+        for name, values in arrays:
+            data = values.tobytes()
+            file.write(data)
+            file.write(b'\0' * _padding(len(data)))
+    # Atomic so a running server never maps a half-written file
+    os.replace(tmp_path, path)
+    return os.path.getsize(path)
+
+
+class MappedCorpus:
+    """A corpus file mapped read-only.
+
+    The play table is served straight from the mapped pages, so opening is
+    just parsing the header, and every process mapping the same file shares
+    one physical copy of it.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        with open(path, 'rb') as file:
+            # The mapping stays valid after the file object is closed
+            self.map = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+        if self.map[:len(MAGIC)] != MAGIC:
+            raise ValueError(f"{path} is not a corpus file")
+        header_start = len(MAGIC) + 8
+        header_length = int.from_bytes(self.map[len(MAGIC):header_start], 'little')
+        header = json.loads(self.map[header_start:header_start + header_length])
+        if header.get('format') != FORMAT_VERSION or header.get('byteorder') != sys.byteorder:
+            raise ValueError(f"{path} was written in an incompatible format")
+        self.version = header['version']
+        self.sources = header['sources']
+
+        data_start = header_start + header_length
+        data_start += _padding(data_start)
+        view = memoryview(self.map)
+        sections = {}
+        for name, (typecode, offset, nbytes) in header['sections'].items():
+            sections[name] = view[data_start + offset:data_start + offset + nbytes].cast(typecode)
+        self.plays = MappedPlayTable(sections, header['strings'])
+
+        self.knowledge_base = {}
+        for document in header['documents']:
+            if 'play_range' in document:
+                self.knowledge_base[document['doc_id']] = {
+                    'text': document['text'],
+                    'play_range': tuple(document['play_range']),
+                    'week': document.get('week'),
+                }
+            else:
+                self.knowledge_base[document['doc_id']] = document['content']
+
+    def __len__(self):
+        return len(self.plays)
@@ -3,13 +3,185 @@ from PyPDF2 import PdfReader
 import docx
 import json
 import csv
-import re
+import time
+import traceback
+import threading
+import itertools
+from concurrent.futures import ProcessPoolExecutor, TimeoutError as FutureTimeoutError
+from concurrent.futures.process import BrokenProcessPool
+from ingest_cache import IngestCache
+from ingest_manifest import IngestManifest, artifact_names
+from play_parser import PlayTable, RECORD_START, split_records, iter_records, parse_record
+from corpus_index import CorpusIndex, choose_granularity
+from corpus_store import MappedCorpus, write_corpus
+from play_index import parse_time_window
+from espn_ingest import json_records, csv_records, is_play_by_play_csv, game_week
+from result_cache import ResultCache, normalize_query, DEFAULT_MAX_ENTRIES, DEFAULT_TTL_SECONDS
+from context_builder import build_context, fit_lines, estimate_tokens, DEFAULT_TOKEN_BUDGET, TIME_WINDOW_TOKEN_BUDGET
+from play_encoding import CompactEncoder, ENCODINGS
+from stats_engine import parse_stats_query, parse_target_query, format_stats
+from drive_table import format_drives, DRIVE_CHART_TOKEN_BUDGET
+from reports import ReportStore, format_team_report, format_player_report
+from query_planner import plan_query, LOOKUP_PLAY_LIMIT
+
+# Bump whenever extraction or structuring output changes so cached entries are re-extracted
+EXTRACTOR_VERSION = '4'
+
+# Exports read straight into the play table; a game present in one of these skips its PDF
+STRUCTURED_EXTENSIONS = ('.json', '.csv')
+
+# Write buffer for the debug and full-text sidecar files
+SIDECAR_BUFFER = 1024 * 1024
+
+# Map file extensions to the loader method that handles them
+LOADERS = {
+    '.pdf': 'load_pdf',
+    '.docx': 'load_docx',
+    '.txt': 'load_text',
+    '.csv': 'load_csv',
+    '.json': 'load_json',
+}
+
+
+def game_key(filepath):
+    """Identify the game a document covers by its file name without extension"""
+    return os.path.splitext(os.path.basename(filepath))[0]
+
+
+def superseded_files(filenames):
+    """PDFs of games that are also present as structured play-by-play (.json/.csv with the same name)"""
+    structured = {game_key(f) for f in filenames if os.path.splitext(f)[1].lower() in STRUCTURED_EXTENSIONS}
+    return {f for f in filenames if os.path.splitext(f)[1].lower() == '.pdf' and game_key(f) in structured}
+
+
+def paragraph_block(text):
+    """Structured content block for a paragraph of free text"""
+    return {
+        'text': text,
+        'metadata': {
+            'dates': [],  # Empty list for dates
+            'keywords': [],  # Empty list for keywords
+            'type': 'paragraph'  # Default content type
+        }
+    }
+
+
+def play_block(record, fields):
+    """Structured content block for one parsed play record"""
+    return {
+        'text': record,
+        'metadata': {
+            'dates': [],
+            'keywords': [fields['play_type']] + fields['players'],
+            'type': 'play',
+            'quarter': fields['quarter'],
+            'clock': fields['clock']
+        }
+    }
+
+
+def detach_plays(knowledge_base, plays):
+    """Copy of a knowledge base whose 'play_range' entries get their own PlayTable cut from plays"""
+    detached = {}
+    for doc_id, content in knowledge_base.items():
+        if isinstance(content, dict) and content.get('play_range') and 'plays' not in content:
+            table = PlayTable()
+            table.extend(plays, *content['play_range'])
+            content = {'text': content.get('text', ''), 'plays': table, 'week': content.get('week')}
+        detached[doc_id] = content
+    return detached
+
+
+def _ingest_file(docs_dir, filename):
+    """Load a single file in a worker process and return its knowledge base entries"""
+    started = time.perf_counter()
+    processor = DocumentProcessor(docs_dir, workers=1, autoload=False)
+    try:
+        processor.load_file(filename)
+        error = None
+    except Exception as e:
+        error = f"{type(e).__name__}: {str(e)}"
+    return {
+        'file': filename,
+        'documents': processor.knowledge_base,
+        'artifacts': processor.artifacts.get(filename, []),
+        'seconds': time.perf_counter() - started,
+        'error': error,
+    }
+
+
+def teams_applied(plan, applied):
+    """Whether every team a query plan names narrowed the filters applied; a team missing from the corpus
+    leaves figures about every team, which only the model can caveat"""
+    return all(facet in applied for facet, slot in (('offense', 'team'), ('defense', 'opponent'))
+               if plan.slots[slot])
+
+
+def terminate_workers(executor):
+    """Kill the worker processes of a process pool, e.g. one still stuck on a file past its timeout"""
+    # ProcessPoolExecutor has no public way to stop a task that is already running
+    processes = list((getattr(executor, '_processes', None) or {}).values())
+    for process in processes:
+        process.terminate()
+    for process in processes:
+        process.join(timeout=5)
+
+
+def failed_result(filename, seconds, error):
+    """Ingest result of a file that loaded nothing"""
+    return {'file': filename, 'documents': {}, 'seconds': seconds, 'error': error}
+
 
 class DocumentProcessor:
-    def __init__(self, docs_dir=None):
+    def __init__(self, docs_dir=None, workers=None, autoload=True):
         # Use environment variable if available, otherwise use default
         self.docs_dir = docs_dir or os.getenv('DOCUMENTS_DIR', 'documents')
         self.knowledge_base = {}
+        # Retrieval units, built once after loading instead of on every query
+        self.index = CorpusIndex({})
+        # Bumped every time a new index is swapped in; cached results carry the one they came from
+        self.generation = 0
+        # Retrieval results by normalized query, so repeated questions and buttons skip the search
+        self.result_cache = ResultCache(int(os.getenv('RETRIEVAL_CACHE_SIZE', str(DEFAULT_MAX_ENTRIES))),
+                                        float(os.getenv('RETRIEVAL_CACHE_TTL', str(DEFAULT_TTL_SECONDS))))
+        # Estimated prompt tokens get_document_context() may spend on retrieved documents
+        self.context_token_budget = int(os.getenv('CONTEXT_TOKEN_BUDGET', str(DEFAULT_TOKEN_BUDGET)))
+        # How plays are written into prompts by default: 'text' records or 'compact' rows with a legend
+        self.prompt_encoding = os.getenv('PROMPT_ENCODING', 'text')
+        
+        # Number of ingestion worker processes (1 = load files serially in this process)
+        if workers is None:
+            workers = int(os.getenv('INGEST_WORKERS', os.cpu_count() or 1))
+        self.workers = max(1, workers)
+        # Seconds to wait for a single file before giving up on it
+        self.file_timeout = float(os.getenv('INGEST_FILE_TIMEOUT', '300'))
+        # Per-file timing and failures from the last load_all_documents() run
+        self.ingest_report = []
+        # Cache of extracted PDF text so unchanged files skip PyPDF2 on restart
+        self.cache = IngestCache(version=EXTRACTOR_VERSION) if os.getenv('INGEST_CACHE', '1') != '0' else None
+        # Sources ingested and the sidecar artifacts derived from them, kept out of docs_dir
+        self.manifest = IngestManifest()
+        # Artifact paths written by this processor's loaders, by source file name
+        self.artifacts = {}
+        # Compact corpus file mapped at startup instead of re-ingesting unchanged documents
+        corpus_store = os.getenv('CORPUS_STORE', os.path.join(self.manifest.artifact_dir, 'corpus.bin'))
+        self.corpus_path = None if corpus_store == '0' else corpus_store
+        self.mapped_corpus = None
+        # Team and player reports materialized per game and saved next to the corpus file
+        report_store = os.getenv('REPORT_STORE', os.path.join(self.manifest.artifact_dir, 'reports.json'))
+        self.reports = ReportStore(None if report_store == '0' else report_store)
+        # (size, mtime) of each source file the knowledge base was loaded from
+        self.sources = {}
+        # (size, mtime) of source files that failed to load, skipped by reload() until they change
+        self.failed_sources = {}
+        # Serializes reloads; queries never wait on it
+        self.reload_lock = threading.Lock()
+        self.watcher = None
+        # Fuse vector similarity into get_document_context's keyword search
+        self.semantic_search = os.getenv('SEMANTIC_SEARCH', '1') != '0'
+        
+        if not autoload:
+            return
         
         print("\n=== Initializing Document Processor ===")
         print(f"Current working directory: {os.getcwd()}")
@@ -23,16 +195,20 @@ class DocumentProcessor:
             except Exception as e:
                 print(f"Error creating documents directory: {str(e)}")
                 print("Full traceback:")
-                import traceback
                 print(traceback.format_exc())
                 return
         
         # Initialize the knowledge base
-        self.load_all_documents()
+        if not self.load_corpus_store():
+            self.load_all_documents()
+            self.save_corpus_store()
+        self.build_index()
         
         # Print summary
         print("\n=== Document Processor Summary ===")
         print(f"Total documents loaded: {len(self.knowledge_base)}")
+        print(f"Total plays parsed: {len(self.play_table)} ({self.play_table.nbytes() / 1024:.0f} KB)")
+        print(f"Retrieval units: " + ", ".join(f"{len(ids)} {name}" for name, ids in self.index.by_granularity.items()))
         for doc_name, content in self.knowledge_base.items():
             if isinstance(content, str):
                 print(f"- {doc_name}: {len(content)} characters")
@@ -49,29 +225,27 @@ class DocumentProcessor:
             print(f"Error: Documents directory not found at {self.docs_dir}")
             return
             
-        files = os.listdir(self.docs_dir)
+        # Sort so the knowledge base is filled in the same order on every run
+        files = sorted(os.listdir(self.docs_dir))
         print(f"Found {len(files)} files in documents directory:")
         
+        # Debug and text dumps of another document would ingest the same game again
+        derived = self.manifest.derived_files(files)
+        superseded = superseded_files(files)
+        supported = self.source_files(files)
         for filename in files:
-            filepath = os.path.join(self.docs_dir, filename)
-            try:
-                print(f"\nProcessing file: {filename}")
-                if filename.endswith('.pdf'):
-                    self.load_pdf(filepath)
-                elif filename.endswith('.docx'):
-                    self.load_docx(filepath)
-                elif filename.endswith('.txt'):
-                    self.load_text(filepath)
-                elif filename.endswith('.csv'):
-                    self.load_csv(filepath)
-                elif filename.endswith('.json'):
-                    self.load_json(filepath)
-                else:
-                    print(f"Unsupported file type: {filename}")
-            except Exception as e:
-                print(f"Error loading {filename}: {str(e)}")
-                import traceback
-                print(traceback.format_exc())
+            if filename in derived:
+                print(f"Skipping derived artifact: {filename}")
+            elif filename in superseded:
+                print(f"Skipping {filename}: the same game is present as structured play-by-play")
+            elif filename not in supported:
+                print(f"Unsupported file type: {filename}")
+        
+        # Snapshot before loading so a file changed mid-load is picked up by the next reload()
+        self.sources = self.source_snapshot()
+        self.knowledge_base.update(self.ingest_files(supported))
+        self.manifest.forget_missing(supported)
+        self.save_manifest()
         
         print(f"\nLoaded {len(self.knowledge_base)} documents into knowledge base")
         for doc_name in self.knowledge_base:
@@ -81,10 +255,325 @@ class DocumentProcessor:
             else:
                 print(f"- {doc_name}: {type(content).__name__}")
     
+    def ingest_files(self, filenames):
+        """Load files (in worker processes when configured) and return their entries in filename order"""
+        started = time.perf_counter()
+        if self.workers > 1 and len(filenames) > 1:
+            results = self._load_parallel(filenames)
+        else:
+            results = self._load_serial(filenames)
+        
+        # Merge in filename order regardless of which worker finished first
+        documents = {}
+        self.ingest_report = []
+        for filename in filenames:
+            result = results[filename]
+            documents.update(result['documents'])
+            if not result['error']:
+                previous = self.manifest.sources.get(filename, {}).get('artifacts', [])
+                self.manifest.record(filename, os.path.join(self.docs_dir, filename), game_key(filename),
+                                     result.get('artifacts') or previous)
+            self.ingest_report.append({
+                'file': filename,
+                'seconds': round(result['seconds'], 3),
+                'status': 'error' if result['error'] else 'ok',
+                'error': result['error'],
+            })
+        
+        print(f"\n=== Ingestion Report ({self.workers} worker(s), {time.perf_counter() - started:.2f}s) ===")
+        for entry in self.ingest_report:
+            line = f"- {entry['file']}: {entry['status']} in {entry['seconds']:.3f}s"
+            if entry['error']:
+                line += f" ({entry['error']})"
+            print(line)
+        failures = [entry for entry in self.ingest_report if entry['error']]
+        if failures:
+            print(f"{len(failures)} file(s) failed to load")
+        return documents
+    
+    def save_manifest(self):
+        try:
+            self.manifest.save()
+        except OSError as e:
+            print(f"Error saving ingest manifest: {str(e)}")
+    
+    def source_files(self, files=None):
+        """Document files in docs_dir that have a loader, excluding derived artifacts and superseded PDFs"""
+        files = sorted(os.listdir(self.docs_dir)) if files is None else files
+        skipped = self.manifest.derived_files(files) | superseded_files(files)
+        return [f for f in files if os.path.splitext(f)[1].lower() in LOADERS and f not in skipped]
+    
+    def source_snapshot(self):
+        """Size and modification time of every source file, to tell whether the corpus file is current"""
+        snapshot = {}
+        for filename in self.source_files():
+            stat = os.stat(os.path.join(self.docs_dir, filename))
+            snapshot[filename] = [stat.st_size, stat.st_mtime_ns]
+        return snapshot
+    
+    def load_corpus_store(self):
+        """Map the corpus file if it was built from the current documents; False if they must be ingested"""
+        if not self.corpus_path or not os.path.exists(self.corpus_path):
+            return False
+        started = time.perf_counter()
+        try:
+            corpus = MappedCorpus(self.corpus_path)
+        except (OSError, ValueError) as e:
+            print(f"Ignoring corpus file {self.corpus_path}: {str(e)}")
+            return False
+        if corpus.version != EXTRACTOR_VERSION or corpus.sources != self.source_snapshot():
+            print(f"Corpus file {self.corpus_path} is out of date; ingesting documents")
+            return False
+        self.mapped_corpus = corpus
+        self.knowledge_base = corpus.knowledge_base
+        self.sources = corpus.sources
+        print(f"Mapped corpus file {self.corpus_path}: {len(corpus)} plays from "
+              f"{len(self.knowledge_base)} documents in {time.perf_counter() - started:.3f}s")
+        return True
+    
+    def save_corpus_store(self):
+        """Write the loaded knowledge base to the corpus file and switch to the mapped copy"""
+        if not self.corpus_path:
+            return
+        if any(entry['error'] for entry in self.ingest_report):
+            # Don't record a snapshot that would hide a failed file on the next start
+            print("Not writing corpus file because some documents failed to load")
+            return
+        try:
+            size = write_corpus(self.corpus_path, self.knowledge_base, self.sources, EXTRACTOR_VERSION)
+            print(f"Wrote corpus file {self.corpus_path} ({size / 1024:.0f} KB)")
+        except (OSError, TypeError, ValueError) as e:
+            print(f"Error writing corpus file: {str(e)}")
+            return
+        self.load_corpus_store()
+    
+    def build_index(self):
+        """Build retrieval units for everything in the knowledge base"""
+        started = time.perf_counter()
+        plays = self.mapped_corpus.plays if self.mapped_corpus else None
+        self.index = CorpusIndex(self.knowledge_base, plays)
+        self.advance_generation()
+        print(f"Built retrieval index with {len(self.index.units)} units in {time.perf_counter() - started:.2f}s")
+        self.refresh_reports()
+    
+    def refresh_reports(self):
+        """Summarize games added or changed since the reports were last built and merge the season views"""
+        started = time.perf_counter()
+        summarized = self.reports.refresh(self.index, {name: (stat[0], stat[1]) for name, stat in self.sources.items()
+                                                       if stat})
+        print(f"Reports: {summarized} of {len(self.index.shards)} games summarized, "
+              f"{len(self.reports.teams)} teams and {len(self.reports.players)} players "
+              f"in {time.perf_counter() - started:.3f}s")
+    
+    def advance_generation(self):
+        """Retire cached retrieval results once a new index is in place"""
+        # The index is assigned before the bump, so a key read at the new generation never gets old results
+        self.generation += 1
+        self.result_cache.clear()
+    
+    def retrieval_cache_stats(self):
+        """Hit/miss counters and occupancy of the retrieval result cache"""
+        stats = self.result_cache.stats()
+        stats['generation'] = self.generation
+        return stats
+    
+    def reload(self):
+        """Ingest added and changed documents, drop deleted ones, and swap in a new index.
+        
+        Only the files that changed are parsed, and only their games are
+        tokenized; the other games' units are copied from the current index. A
+        file that fails to load is not tried again until its size or mtime
+        changes, and nothing is rebuilt when no good file was added, changed or
+        removed. The new knowledge base and index are built aside while queries
+        keep using the current ones, then swapped in with plain attribute
+        assignments. Returns True if anything changed.
+        """
+        with self.reload_lock:
+            if not os.path.exists(self.docs_dir):
+                return False
+            snapshot = self.source_snapshot()
+            changed = [f for f in snapshot
+                       if self.sources.get(f) != snapshot[f] and self.failed_sources.get(f) != snapshot[f]]
+            removed = [f for f in self.sources if f not in snapshot]
+            # A deleted file that failed is only a removal if its last good version is still served
+            removed += [f for f in self.failed_sources if f not in snapshot and f in self.knowledge_base]
+            self.failed_sources = {f: stat for f, stat in self.failed_sources.items() if f in snapshot}
+            if not changed and not removed:
+                return False
+            started = time.perf_counter()
+            print(f"\n=== Reloading Documents: {len(changed)} added or changed, {len(removed)} removed ===")
+            
+            loaded = self.ingest_files(changed) if changed else {}
+            failed = {entry['file'] for entry in self.ingest_report if entry['error']}
+            for filename in changed:
+                self.failed_sources.pop(filename, None)
+            self.failed_sources.update((f, snapshot[f]) for f in failed)
+            if not removed and all(f in failed for f in changed):
+                print(f"All {len(changed)} changed documents failed to load; keeping the current index")
+                return False
+            knowledge_base = {}
+            for filename in snapshot:
+                if filename in loaded:
+                    knowledge_base[filename] = loaded[filename]
+                elif filename in failed and filename in self.knowledge_base:
+                    # Keep serving the last good version of a file that now fails to load
+                    knowledge_base[filename] = self.knowledge_base[filename]
+                elif filename not in changed and filename in self.knowledge_base:
+                    knowledge_base[filename] = self.knowledge_base[filename]
+            # Loaders key entries by file name, but keep anything else they produced too
+            for doc_id, content in loaded.items():
+                knowledge_base.setdefault(doc_id, content)
+            # A failed file is retried once it changes again
+            sources = {f: stat for f, stat in snapshot.items() if f not in self.failed_sources}
+            
+            plays = self.mapped_corpus.plays if self.mapped_corpus else None
+            corpus = None
+            if self.corpus_path:
+                try:
+                    write_corpus(self.corpus_path, knowledge_base, sources, EXTRACTOR_VERSION, plays)
+                    corpus = MappedCorpus(self.corpus_path)
+                    knowledge_base, plays = corpus.knowledge_base, corpus.plays
+                except (OSError, TypeError, ValueError) as e:
+                    print(f"Error writing corpus file: {str(e)}")
+            if corpus is None and plays is not None:
+                knowledge_base = detach_plays(knowledge_base, plays)
+                plays = None
+            index = CorpusIndex(knowledge_base, plays, previous=self.index, stale=set(loaded))
+            
+            # Swap: a query running now finishes on the old generation, the next one sees the new
+            self.knowledge_base, self.index, self.mapped_corpus = knowledge_base, index, corpus
+            self.advance_generation()
+            self.sources = sources
+            self.refresh_reports()
+            self.manifest.forget_missing(list(snapshot))
+            self.save_manifest()
+            print(f"Reloaded in {time.perf_counter() - started:.2f}s: {len(knowledge_base)} documents, "
+                  f"{len(index.plays)} plays, {len(index.units)} retrieval units")
+            return True
+    
+    def start_watcher(self, interval=None):
+        """Poll the documents directory in a background thread and reload() on changes"""
+        if interval is None:
+            interval = float(os.getenv('DOCUMENTS_WATCH_INTERVAL', '5'))
+        if interval <= 0 or self.watcher:
+            return None
+        
+        def watch():
+            while True:
+                time.sleep(interval)
+                try:
+                    self.reload()
+                except Exception as e:
+                    print(f"Error reloading documents: {str(e)}")
+                    print(traceback.format_exc())
+        
+        self.watcher = threading.Thread(target=watch, name='documents-watcher', daemon=True)
+        self.watcher.start()
+        print(f"Watching {os.path.abspath(self.docs_dir)} for changes every {interval:g}s")
+        return self.watcher
+    
+    @property
+    def play_table(self):
+        """Every parsed play across all loaded games"""
+        return self.index.plays
+    
+    def load_file(self, filename):
+        """Dispatch a file in the documents directory to the loader for its type"""
+        filepath = os.path.join(self.docs_dir, filename)
+        loader = getattr(self, LOADERS[os.path.splitext(filename)[1].lower()])
+        print(f"\nProcessing file: {filename}")
+        loader(filepath)
+    
+    def _load_serial(self, filenames):
+        """Load files one at a time in this process"""
+        results = {}
+        for filename in filenames:
+            started = time.perf_counter()
+            loaded = {}
+            error = None
+            # Give each loader an empty knowledge base so a failure can't leave partial entries behind
+            knowledge_base, self.knowledge_base = self.knowledge_base, loaded
+            try:
+                self.load_file(filename)
+            except Exception as e:
+                error = f"{type(e).__name__}: {str(e)}"
+                print(f"Error loading {filename}: {str(e)}")
+                print(traceback.format_exc())
+            finally:
+                self.knowledge_base = knowledge_base
+            results[filename] = {
+                'file': filename,
+                'documents': {} if error else loaded,
+                'artifacts': self.artifacts.get(filename, []),
+                'seconds': time.perf_counter() - started,
+                'error': error,
+            }
+        return results
+    
+    def _load_parallel(self, filenames):
+        """Load files in a process pool; a failing, crashing or hung file only loses that file"""
+        workers = min(self.workers, len(filenames))
+        print(f"Loading {len(filenames)} files with {workers} worker processes")
+        results, unfinished = self._run_pool(filenames, workers)
+        if unfinished:
+            # A dying worker breaks the pool for every file still in flight; retry those one per
+            # fresh pool so only the file that kills its worker is lost
+            print(f"Worker process died; retrying {len(unfinished)} unfinished file(s) one at a time")
+            for filename in unfinished:
+                retried, broken = self._run_pool([filename], 1)
+                if broken:
+                    print(f"Worker process died again while loading {filename}")
+                results[filename] = retried.get(filename) or failed_result(
+                    filename, 0.0, "BrokenProcessPool: worker process died while loading this file")
+        for filename in filenames:
+            if results[filename]['error']:
+                print(f"Error loading {filename}: {results[filename]['error']}")
+                results[filename]['documents'] = {}
+        return results
+    
+    def _run_pool(self, filenames, workers):
+        """(results, files lost to a broken pool) of loading files in a new process pool"""
+        results = {}
+        unfinished = []
+        hung = False
+        executor = ProcessPoolExecutor(max_workers=workers)
+        try:
+            futures = {filename: executor.submit(_ingest_file, self.docs_dir, filename) for filename in filenames}
+            deadline = time.monotonic() + self.file_timeout * len(filenames) / workers
+            for filename, future in futures.items():
+                try:
+                    timeout = max(self.file_timeout, deadline - time.monotonic())
+                    results[filename] = future.result(timeout=timeout)
+                except FutureTimeoutError:
+                    hung = True
+                    future.cancel()
+                    results[filename] = failed_result(filename, timeout, f"Timed out after {timeout:.0f}s")
+                except BrokenProcessPool:
+                    unfinished.append(filename)
+                except Exception as e:
+                    results[filename] = failed_result(filename, 0.0, f"{type(e).__name__}: {str(e)}")
+        finally:
+            # Every other file has finished by now, so only hung workers are killed
+            if hung:
+                terminate_workers(executor)
+            executor.shutdown(wait=not hung, cancel_futures=True)
+        return results, unfinished
+    
     def extract_structured_content(self, text):
         """Extract and structure content from text"""
         content_blocks = []
         
+        # Play-by-play text becomes one block per play record
+        preamble, records = split_records(text)
+        if records:
+            if preamble:
+                content_blocks.append(paragraph_block(preamble))
+            for record in records:
+                fields = parse_record(record)
+                if fields:
+                    content_blocks.append(play_block(record, fields))
+            return content_blocks
+        
         # Split text into paragraphs
         paragraphs = text.split('\n\n')
         
@@ -96,122 +585,153 @@ class DocumentProcessor:
             # Clean up the text
             paragraph = ' '.join(paragraph.split())  # Remove extra whitespace
             
-            # Initialize metadata with default values
-            metadata = {
-                'dates': [],  # Empty list for dates
-                'keywords': [],  # Empty list for keywords
-                'type': 'paragraph'  # Default content type
-            }
-            
-            content_blocks.append({
-                'text': paragraph,
-                'metadata': metadata
-            })
+            content_blocks.append(paragraph_block(paragraph))
         
         return content_blocks
 
+    def iter_pdf_pages(self, reader, log):
+        """Yield the cleaned text of each PDF page, logging every page to the debug sidecar"""
+        for i, page in enumerate(reader.pages, 1):
+            try:
+                page_text = page.extract_text()
+            except Exception as page_error:
+                error_msg = f"Error extracting text from page {i}: {str(page_error)}"
+                print(error_msg)
+                log.write(f"\n{error_msg}\n")
+                continue
+            if not page_text:
+                print(f"Warning: No text extracted from page {i}")
+                log.write(f"\nWarning: No text extracted from page {i}\n")
+                continue
+            # Clean up the text
+            page_text = ' '.join(page_text.split())  # Remove extra whitespace
+            log.write(f"\n=== Page {i} ===\n")
+            log.write(page_text + "\n")
+            print(f"Extracted {len(page_text)} characters from page {i}")
+            yield page_text
+    
+    def structure_pages(self, pages, game, log=None):
+        """Turn a stream of page texts into structured blocks, a play table and any non-play text
+        
+        Pages are consumed one at a time, so peak memory does not grow with the
+        length of the PDF beyond the parsed plays themselves.
+        """
+        structured_content = []
+        plays = PlayTable()
+        passages = []
+        for kind, chunk in iter_records(pages):
+            if kind == 'play':
+                fields = parse_record(chunk)
+                if not fields:
+                    continue
+                plays.append(game=game, **fields)
+                structured_content.append(play_block(chunk, fields))
+            else:
+                passages.append(chunk)
+                structured_content.append(paragraph_block(chunk))
+            if log:
+                log.write(f"- {chunk[:100]}...\n")
+        return structured_content, plays, "\n\n".join(passages)
+    
     def load_pdf(self, filepath):
         """Extract text from PDF file"""
-        try:
-            filepath = os.path.normpath(filepath)
-            print(f"\nProcessing PDF file: {filepath}")
-            
-            if not os.path.exists(filepath):
-                print(f"Error: File not found at {filepath}")
-                return
-                
-            print(f"File size: {os.path.getsize(filepath)} bytes")
-            
-            # Create a debug file with a safe name
-            debug_filename = os.path.basename(filepath).replace(' ', '_') + '_debug.txt'
-            debug_file = os.path.join(os.path.dirname(filepath), debug_filename)
-            
-            with open(debug_file, 'w', encoding='utf-8') as f:
-                f.write(f"=== PDF Processing Debug Log ===\n")
-                f.write(f"File: {filepath}\n")
-                f.write(f"Size: {os.path.getsize(filepath)} bytes\n\n")
+        filepath = os.path.normpath(filepath)
+        print(f"\nProcessing PDF file: {filepath}")
+        
+        if not os.path.exists(filepath):
+            print(f"Error: File not found at {filepath}")
+            return
             
-            reader = PdfReader(filepath)
-            print(f"Number of pages: {len(reader.pages)}")
+        print(f"File size: {os.path.getsize(filepath)} bytes")
+        
+        cache_key = None
+        if self.cache:
+            cache_key = self.cache.key_for(filepath)
+            if self.cache.has(cache_key):
+                try:
+                    self._store_pdf(filepath, self.cache.iter_pages(cache_key))
+                    print(f"Loaded PDF from ingest cache: {filepath}")
+                    return
+                except ValueError as e:
+                    print(f"Re-extracting {filepath}: {str(e)}")
+        
+        self._extract_pdf(filepath, cache_key)
+    
+    def _store_pdf(self, filepath, pages, log=None):
+        """Run the page stream through structuring and add the game to the knowledge base"""
+        structured_content, plays, text = self.structure_pages(pages, game_key(filepath), log)
+        if not structured_content:
+            return None
+        # Play records live in the play table; 'text' only keeps what is not a play
+        entry = {
+            'text': text,
+            'structured_content': structured_content,
+            'plays': plays
+        }
+        self.knowledge_base[os.path.basename(filepath)] = entry
+        print(f"Content blocks: {len(structured_content)}")
+        print(f"Plays parsed: {len(plays)}")
+        return entry
+    
+    def _extract_pdf(self, filepath, cache_key=None):
+        """Extract a PDF page by page: PyPDF2 -> sidecars and cache -> structuring"""
+        # Sidecars go to the artifact directory so they are never picked up as documents
+        debug_file, text_file = [self.manifest.artifact_path(name) for name in artifact_names(os.path.basename(filepath))]
+        self.artifacts[os.path.basename(filepath)] = [debug_file, text_file]
+        
+        cache_writer = self.cache.writer(cache_key, filepath) if cache_key else None
+        # Each sidecar is opened once and written through a buffer instead of reopened per page
+        with open(debug_file, 'w', encoding='utf-8', buffering=SIDECAR_BUFFER) as log, \
+                open(text_file, 'w', encoding='utf-8', buffering=SIDECAR_BUFFER) as text_out:
+            log.write(f"=== PDF Processing Debug Log ===\n")
+            log.write(f"File: {filepath}\n")
+            log.write(f"Size: {os.path.getsize(filepath)} bytes\n\n")
+            stats = {'pages': 0, 'characters': 0}
             
-            text = ""
-            structured_content = []
+            def tee(pages):
+                for page_text in pages:
+                    text_out.write(page_text + "\n\n")
+                    if cache_writer:
+                        cache_writer.write_page(page_text)
+                    stats['pages'] += 1
+                    stats['characters'] += len(page_text) + 2
+                    yield page_text
             
-            for i, page in enumerate(reader.pages, 1):
-                try:
-                    page_text = page.extract_text()
-                    if page_text:
-                        # Clean up the text
-                        page_text = ' '.join(page_text.split())  # Remove extra whitespace
-                        text += page_text + "\n\n"
-                        
-                        # Extract structured content from this page
-                        page_content = self.extract_structured_content(page_text)
-                        structured_content.extend(page_content)
-                        
-                        # Write page content to debug file
-                        with open(debug_file, 'a', encoding='utf-8') as f:
-                            f.write(f"\n=== Page {i} ===\n")
-                            f.write(page_text + "\n")
-                            
-                            if page_content:
-                                f.write("\nStructured content found:\n")
-                                for block in page_content:
-                                    f.write(f"- {block['text'][:100]}...\n")
-                                    # Only write metadata if dates exist
-                                    if block['metadata']['dates'] and len(block['metadata']['dates']) > 0:
-                                        f.write(f"  Context: {', '.join(block['metadata']['dates'])}\n")
-                        
-                        print(f"Extracted {len(page_text)} characters from page {i}")
-                    else:
-                        print(f"Warning: No text extracted from page {i}")
-                        with open(debug_file, 'a', encoding='utf-8') as f:
-                            f.write(f"\nWarning: No text extracted from page {i}\n")
-                except Exception as page_error:
-                    error_msg = f"Error extracting text from page {i}: {str(page_error)}"
-                    print(error_msg)
-                    with open(debug_file, 'a', encoding='utf-8') as f:
-                        f.write(f"\n{error_msg}\n")
-                    continue
+            try:
+                reader = PdfReader(filepath)
+                print(f"Number of pages: {len(reader.pages)}")
+                entry = self._store_pdf(filepath, tee(self.iter_pdf_pages(reader, log)), log)
+            except Exception as e:
+                if cache_writer:
+                    cache_writer.abort()
+                error_msg = f"Error loading PDF {filepath}: {str(e)}"
+                print(error_msg)
+                print("Full traceback:")
+                print(traceback.format_exc())
+                log.write(f"\n=== Error ===\n")
+                log.write(error_msg + "\n")
+                log.write(traceback.format_exc())
+                raise
             
-            if text:
-                # Store both raw text and structured content
-                self.knowledge_base[os.path.basename(filepath)] = {
-                    'text': text,
-                    'structured_content': structured_content
-                }
-                
-                print(f"Successfully loaded PDF: {filepath}")
-                print(f"Total extracted text: {len(text)} characters")
-                print(f"Content blocks: {len(structured_content)}")
-                
-                with open(debug_file, 'a', encoding='utf-8') as f:
-                    f.write(f"\n=== Summary ===\n")
-                    f.write(f"Total text extracted: {len(text)} characters\n")
-                    f.write(f"Content blocks: {len(structured_content)}\n")
-                
-                # Write the full text to a separate file for inspection
-                text_file = os.path.join(os.path.dirname(filepath), os.path.basename(filepath).replace('.pdf', '_text.txt'))
-                with open(text_file, 'w', encoding='utf-8') as f:
-                    f.write(text)
-                print(f"Full text saved to: {text_file}")
-            else:
+            if not entry:
+                if cache_writer:
+                    cache_writer.abort()
                 error_msg = f"Warning: No text was extracted from PDF: {filepath}"
                 print(error_msg)
-                with open(debug_file, 'a', encoding='utf-8') as f:
-                    f.write(f"\n{error_msg}\n")
-                
-        except Exception as e:
-            error_msg = f"Error loading PDF {filepath}: {str(e)}"
-            print(error_msg)
-            print("Full traceback:")
-            import traceback
-            print(traceback.format_exc())
-            with open(debug_file, 'a', encoding='utf-8') as f:
-                f.write(f"\n=== Error ===\n")
-                f.write(error_msg + "\n")
-                f.write(traceback.format_exc())
-            raise
+                log.write(f"\n{error_msg}\n")
+                return
+            
+            print(f"Successfully loaded PDF: {filepath}")
+            print(f"Total extracted text: {stats['characters']} characters")
+            log.write(f"\n=== Summary ===\n")
+            log.write(f"Pages extracted: {stats['pages']}\n")
+            log.write(f"Total text extracted: {stats['characters']} characters\n")
+            log.write(f"Content blocks: {len(entry['structured_content'])}\n")
+            log.write(f"Plays parsed: {len(entry['plays'])}\n")
+        print(f"Full text saved to: {text_file}")
+        
+        if cache_writer:
+            cache_writer.commit()
     
     def load_docx(self, filepath):
         """Extract text from DOCX file"""
@@ -226,10 +746,14 @@ class DocumentProcessor:
             raise
     
     def load_text(self, filepath):
-        """Load text file"""
+        """Load text file, parsing its play records when it is a play-by-play export"""
         try:
             with open(filepath, 'r', encoding='utf-8') as file:
                 text = file.read()
+                if RECORD_START.search(text):
+                    # Read lines as pages so the play table is built the same way as for a PDF
+                    self._store_pdf(filepath, text.splitlines())
+                    return
                 self.knowledge_base[os.path.basename(filepath)] = text
                 print(f"Successfully loaded text file: {filepath}")
                 print(f"Loaded {len(text)} characters")
@@ -238,11 +762,16 @@ class DocumentProcessor:
             raise
     
     def load_csv(self, filepath):
-        """Load CSV file as list of dictionaries"""
+        """Load CSV file as list of dictionaries, or as a game when it is a play-by-play export"""
         try:
             data = []
             with open(filepath, 'r', encoding='utf-8') as file:
                 reader = csv.DictReader(file)
+                if is_play_by_play_csv(reader.fieldnames):
+                    first = next(reader, None)
+                    rows = itertools.chain([first], reader) if first else []
+                    self._store_records(filepath, csv_records(rows), week=game_week(first))
+                    return
                 for row in reader:
                     data.append(row)
             self.knowledge_base[os.path.basename(filepath)] = data
@@ -253,63 +782,226 @@ class DocumentProcessor:
             raise
     
     def load_json(self, filepath):
-        """Load JSON file"""
+        """Load JSON file, or a game when it is ESPN play-by-play"""
         try:
             with open(filepath, 'r', encoding='utf-8') as file:
                 data = json.load(file)
-                self.knowledge_base[os.path.basename(filepath)] = data
-                print(f"Successfully loaded JSON: {filepath}")
-                print(f"Loaded {type(data).__name__} with {len(str(data))} characters")
+            records = json_records(data)
+            if records is not None:
+                self._store_records(filepath, records, week=game_week(data))
+                return
+            self.knowledge_base[os.path.basename(filepath)] = data
+            print(f"Successfully loaded JSON: {filepath}")
+            print(f"Loaded {type(data).__name__} with {len(str(data))} characters")
         except Exception as e:
             print(f"Error loading JSON {filepath}: {str(e)}")
             raise
     
-    def search_knowledge_base(self, query):
-        """Search the knowledge base for relevant information"""
-        query = query.lower()
-        best_matches = []
-        
-        for doc_id, content in self.knowledge_base.items():
-            # Handle both string content and structured content
-            if isinstance(content, dict) and 'text' in content:
-                text = content['text']
-            else:
-                text = str(content)
-            
-            # Split into sentences
-            sentences = re.split(r'[.!?]+', text)
-            
-            for sentence in sentences:
-                sentence = sentence.strip()
-                if not sentence:
-                    continue
-                    
-                sentence_lower = sentence.lower()
-                
-                # Simple relevance scoring based on term matching
-                query_terms = query.split()
-                matched_terms = sum(1 for term in query_terms if term in sentence_lower)
-                
-                if matched_terms > 0:
-                    relevance = matched_terms / len(query_terms)
-                    best_matches.append((relevance, sentence))
+    def _store_records(self, filepath, records, week=None):
+        """Parse play records from a structured export straight into the game's play table"""
+        structured_content = []
+        plays = PlayTable()
+        game = game_key(filepath)
+        for record in records:
+            fields = parse_record(record)
+            if fields:
+                plays.append(game=game, **fields)
+                structured_content.append(play_block(record, fields))
+        self.knowledge_base[os.path.basename(filepath)] = {
+            'text': '',
+            'structured_content': structured_content,
+            'plays': plays,
+            'week': week
+        }
+        print(f"Successfully loaded play-by-play: {filepath}")
+        print(f"Plays parsed: {len(plays)}")
+    
+    def search_units(self, query, granularity=None, semantic=False):
+        """(index, ranked retrieval units) for a query, from the result cache when it was asked before"""
+        # Read before the index: a reload in between at worst files new results under the old key
+        key = (self.generation, normalize_query(query), granularity, semantic)
+        cached = self.result_cache.get(key)
+        if cached is None:
+            index = self.index
+            cached = (index, tuple(index.search(query, granularity, semantic=semantic)))
+            self.result_cache.put(key, cached)
+        return cached
+    
+    def search_knowledge_base(self, query, granularity=None, semantic=False):
+        """Search the knowledge base for relevant information
         
-        # Sort by relevance score
-        best_matches.sort(reverse=True, key=lambda x: x[0])
+        granularity selects play, drive or quarter units; by default it is
+        chosen from the wording of the query. semantic fuses vector
+        similarity results in with the keyword ranking.
+        """
+        _, units = self.search_units(query, granularity, semantic)
+        return [unit.text for unit in units]
+    
+    def plays_in_window(self, start, end, games=None):
+        """Play records between two game-clock points (seconds since kickoff), in game order"""
+        plays = self.play_table
+        return [plays.text[i] for i in self.index.clock.window(start, end, games)]
+    
+    def get_time_window_context(self, query):
+        """Plays in the game-clock window a query asks about, in the games it names, within
+        TIME_WINDOW_TOKEN_BUDGET; "" if it names no window"""
+        window = parse_time_window(query)
+        if not window['windows'] and not window['opening']:
+            return ""
+        play_ids = self.index.scope_plays(query)
+        if not play_ids:
+            return ""
+        plays = self.play_table
+        ordered = sorted(play_ids, key=lambda i: (plays.game[i], plays.game_seconds[i], i))
+        header = f"{len(ordered)} plays in the requested window, in game order"
+        listed = fit_lines("\n".join(plays.text[i] for i in ordered),
+                           TIME_WINDOW_TOKEN_BUDGET - estimate_tokens(header) - 10)
+        shown = listed.count("\n") + 1 if listed else 0
+        if shown < len(ordered):
+            header += f" (the first {shown} listed)"
+        print(f"Time window context: {shown} of {len(ordered)} plays")
+        return f"{header}:\n{listed}"
+    
+    def resolve_players(self, text):
+        """Canonical names ("L.Jackson") of the players a question mentions"""
+        return self.index.players.resolve(text)
+    
+    def get_player_plays(self, name, role=None):
+        """Play records involving one player, optionally only in one role (passer, rusher, target, tackler)"""
+        plays = self.play_table
+        return [plays.text[i] for i in self.index.players.plays(name, role)]
+    
+    def top_players(self, role, count=5):
+        """Most involved players in a role as (name, play count)"""
+        return self.index.players.top(role, count)
+    
+    def get_player_context(self, name, role=None):
+        """Context block with exactly one player's plays"""
+        plays = self.get_player_plays(name, role)
+        if not plays:
+            return ""
+        context = f"Plays involving {name}" + (f" as {role}" if role else "") + f" ({len(plays)} plays):\n"
+        context += "\n".join(plays)
+        print(f"Generated player context for {name} with {len(plays)} plays")
+        return context
+    
+    def get_stats(self, query, players=None):
+        """Exact grouped aggregates for a question asking for counts, rates or yardage, or None.
         
-        # Return the most relevant sentences
-        return [match[1] for match in best_matches[:500]]
+        Grouping ("by down", "per receiver") and filters (situation, teams,
+        games, clock windows) come from the wording; the numbers come from
+        the stats engine, not the model. Questions about pass depth,
+        direction or aDOT get per-target figures instead of play figures.
+        players, when given, limits the plays to those involving them.
+        """
+        index = self.index
+        parsed = parse_target_query(query)
+        if parsed is not None:
+            group_by, filters = parsed
+            return index.stats.targets(group_by, filters, index.scope_plays(query, players))
+        parsed = parse_stats_query(query)
+        if parsed is None:
+            return None
+        group_by, filters = parsed
+        return index.stats.aggregate(group_by, filters, index.scope_plays(query, players))
     
-    def get_document_context(self, query):
-        """Get relevant context from documents for a given query"""
-        relevant_info = self.search_knowledge_base(query)
-        if not relevant_info:
-            print("No relevant information found in documents")
+    def get_stats_context(self, query, players=None):
+        """Prompt block with the exact stats a question asks for, or "" if it asks for none"""
+        stats = self.get_stats(query, players)
+        if not stats or not stats['groups']:
             return ""
+        context = format_stats(stats)
+        print(f"Generated stats context: {stats['plays']} plays in {len(stats['groups'])} groups")
+        return context
+    
+    def get_team_report(self, team=None):
+        """Materialized report of a team's offense (the busiest one by default), or None"""
+        return self.reports.team(team)
+    
+    def get_player_report(self, name=None, role=None):
+        """Materialized report of a player, or of the busiest passer, rusher or target when role is given"""
+        return self.reports.player(name, role)
+    
+    def get_report_context(self, kind, name=None):
+        """Text of a materialized report: kind 'team', or 'passer', 'rusher', 'target' or 'player' for players"""
+        if kind == 'team':
+            report = self.get_team_report(name)
+            return format_team_report(report) if report else ""
+        report = self.get_player_report(name, None if kind == 'player' else kind)
+        return format_player_report(report) if report else ""
+    
+    def plan_query(self, query):
+        """Intent, slots and execution steps for a chat message (see query_planner)"""
+        return plan_query(query, self.index.players)
+    
+    def get_lookup_context(self, plan):
+        """The plays matching a lookup plan's situation, games, clock window and players, in game order,
+        or "" when none match"""
+        index = self.index
+        play_ids = index.scope_plays(plan.query, plan.slots['player'])
+        mask, applied = index.stats.mask(plan.filters, play_ids)
+        selected = mask.nonzero()[0].tolist()
+        if not selected or not teams_applied(plan, applied):
+            return ""
+        plays = self.play_table
+        selected.sort(key=lambda i: (plays.game[i], plays.game_seconds[i], i))
+        described = [f"{facet}={','.join(map(str, values))}" for facet, values in applied.items()]
+        described += [f"player={name}" for name in plan.slots['player']]
+        lines = [f"{len(selected)} plays match" + (f" ({'; '.join(described)})" if described else "") +
+                 (f"; the first {LOOKUP_PLAY_LIMIT} in game order:" if len(selected) > LOOKUP_PLAY_LIMIT else ":")]
+        lines += [plays.text[i] for i in selected[:LOOKUP_PLAY_LIMIT]]
+        return "\n".join(lines)
+    
+    def answer_plan(self, plan):
+        """Answer a plan that needs no LLM from the stats engine and indexes, or "" when they can't"""
+        if 'stats' in plan.steps:
+            stats = self.get_stats(plan.query, plan.slots['player'])
+            if not stats or not stats['groups'] or not teams_applied(plan, stats['filters']):
+                return ""
+            return format_stats(stats)
+        if 'lookup' in plan.steps:
+            return self.get_lookup_context(plan)
+        if 'drive_chart' in plan.steps:
+            return self.get_drive_context(plan.query)
+        return ""
+    
+    def get_drives(self, query):
+        """Drive chart rows (start and end, plays, yards, time of possession, result) of the games
+        and game-clock window a query names"""
+        drives = self.index.drives
+        return [drives.row(i) for i in self.index.scope_drives(query)]
+    
+    def get_drive_context(self, query):
+        """Drive chart of the games a drive-level question is about, or "" for other questions"""
+        if choose_granularity(query) != 'drive':
+            return ""
+        drive_ids = self.index.scope_drives(query)
+        if not drive_ids:
+            return ""
+        context = fit_lines(format_drives(self.index.drives, drive_ids), DRIVE_CHART_TOKEN_BUDGET)
+        print(f"Generated drive chart with {len(drive_ids)} drives")
+        return context
+    
+    def get_document_context(self, query, granularity=None, budget=None, encoding=None):
+        """Get relevant context from documents for a given query, within a token budget
         
-        context = "Based on our documents:\n"
-        for info in relevant_info:
-            context += f"\n{info}\n"
+        The best units that fit the budget are kept, near-duplicates dropped,
+        and plays put in game and clock order. encoding picks how plays are
+        written: 'text' keeps the play records, 'compact' writes them as
+        coded rows under one legend (defaults to PROMPT_ENCODING).
+        """
+        encoding = encoding or self.prompt_encoding
+        if encoding not in ENCODINGS:
+            raise ValueError(f"Unknown prompt encoding {encoding!r}; expected one of {', '.join(ENCODINGS)}")
+        index, units = self.search_units(query, granularity, semantic=self.semantic_search)
+        weeks = {doc_id: shard['week'] for doc_id, shard in index.shards.items() if shard['week']}
+        encoder = CompactEncoder(index.plays, units) if encoding == 'compact' else None
+        context, tokens, used = build_context(units, index.plays, budget or self.context_token_budget,
+                                              weeks=weeks, encoder=encoder)
+        if not context:
+            print("No relevant information found in documents")
+            return ""
         
-        print(f"Generated context with {len(context)} characters")
+        print(f"Generated {encoding} context with {len(context)} characters "
+              f"(~{tokens} tokens, {used} of {len(units)} units)")
         return context 
\ No newline at end of file
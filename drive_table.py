@@ -0,0 +1,259 @@
+import re
+from array import array
+from play_parser import TEAM_ABBREVIATIONS, play_category, normalize_abbreviation
+
+# How the last play of a drive ended it
+RESULT_TYPES = {
+    'Passing Touchdown': 'Touchdown', 'Rushing Touchdown': 'Touchdown', 'Kickoff Return Touchdown': 'Touchdown',
+    'Field Goal Good': 'Field Goal', 'Field Goal Missed': 'Missed FG', 'Blocked Field Goal': 'Missed FG',
+    'Punt': 'Punt', 'Blocked Punt': 'Punt', 'Pass Interception Return': 'Interception',
+    'Interception Return Touchdown': 'Interception', 'Fumble Recovery (Opponent)': 'Fumble', 'Safety': 'Safety',
+}
+RESULTS = ('Touchdown', 'Field Goal', 'Missed FG', 'Punt', 'Interception', 'Fumble', 'Downs', 'Safety',
+           'End of Half', 'End of Game', 'Unknown')
+SCORING_RESULTS = {'Touchdown', 'Field Goal'}
+# Plays run from scrimmage that a drive chart counts
+SNAP_CATEGORIES = {'pass', 'rush'}
+# Markers that close whatever drive is open when they appear
+PERIOD_ENDS = {'End of Half': 'End of Half', 'End of Game': 'End of Game'}
+# Fourth-down plays that hand the ball over when they come up short
+DOWNS_TYPES = {'Rush', 'Pass Reception', 'Pass Incompletion', 'Sack'}
+# Tokens of drive chart a prompt carries; totals come first, so a long chart loses its last drives only
+DRIVE_CHART_TOKEN_BUDGET = 1500
+# The first quarter of each half after the first; a drive never continues into one
+HALF_STARTS = {3, 5}
+# Changes of possession written into a play of another type ("Sack: ... FUMBLES ..., RECOVERED by KC-...")
+TURNOVER_TEXT = re.compile(r"\bINTERCEPTED by\b|\bRECOVERED by ([A-Z]{2,3})\b", re.IGNORECASE)
+
+
+def field_position(yards_to_goal):
+    """Yards to the opponent's goal as "own 25" / "midfield" / "opp 36" ("-" when unknown)"""
+    if yards_to_goal < 0:
+        return '-'
+    if yards_to_goal == 50:
+        return 'midfield'
+    return f"own {100 - yards_to_goal}" if yards_to_goal > 50 else f"opp {yards_to_goal}"
+
+
+def format_clock(seconds):
+    return f"{seconds // 60}:{seconds % 60:02d}"
+
+
+def counted(play_type, down):
+    """Whether a play counts toward a drive's play total: snaps, and kicks, penalties and fumbles on a down"""
+    category = play_category(play_type)
+    return category in SNAP_CATEGORIES or (down > 0 and category != 'admin')
+
+
+def turnover(plays, i):
+    """'Interception' or 'Fumble' when the text of play i shows the defense ending up with the ball, else None"""
+    text = plays.text[i]
+    if 'NULLIFIED' in text:
+        return None
+    offense = TEAM_ABBREVIATIONS.get(plays.teams[plays.team[i]])
+    result = None
+    for match in TURNOVER_TEXT.finditer(text):
+        if match.group(1) is None:
+            result = 'Interception'
+        elif normalize_abbreviation(match.group(1).upper()) == offense:
+            # The offense fell on the ball, its own fumble or one forced back after an interception
+            result = None
+        elif result is None:
+            result = 'Fumble'
+    return result
+
+
+def play_result(plays, i):
+    """How play i would end a drive, by its type or, for a turnover logged as a sack, rush or catch, its text"""
+    play_type = plays.play_types[plays.play_type[i]]
+    result = RESULT_TYPES.get(play_type)
+    if result is None and play_category(play_type) in SNAP_CATEGORIES:
+        result = turnover(plays, i)
+    return result
+
+
+def replayed(plays, i):
+    """Whether play i repeats the down before it (a punt or kick run again after a penalty)"""
+    return (i > 0 and plays.down[i] > 0 and plays.play_type[i] == plays.play_type[i - 1]
+            and plays.down[i] == plays.down[i - 1] and plays.distance[i] == plays.distance[i - 1]
+            and plays.yards_to_goal[i] == plays.yards_to_goal[i - 1])
+
+
+def drive_ranges(plays, start, end):
+    """Split the plays of one game into (start, end) ranges, one per drive.
+
+    A drive ends on a score, punt, field goal try, turnover, turnover on
+    downs, the end of a half, or when the next play belongs to the other
+    offense; a kickoff opens the receiving team's drive. Quarter breaks
+    inside a half do not end a drive, nor does a kick replayed after a
+    penalty. Stretches with no counted play
+    (timeouts and kickoffs between drives) join the drive that follows, or
+    the last one at the end of a game.
+    """
+    ranges = []
+    drive_start = start
+    has_play = False
+    for i in range(start, end):
+        play_type = plays.play_types[plays.play_type[i]]
+        if ranges and drive_start == i and i > start and replayed(plays, i):
+            drive_start = ranges.pop()[0]
+            has_play = True
+        new_half = i > drive_start and plays.quarter[i] in HALF_STARTS and plays.quarter[i - 1] < plays.quarter[i]
+        new_offense = (has_play and plays.team[i] != plays.team[i - 1]
+                       and play_category(play_type) != 'admin')
+        if (play_type == 'Kickoff' or new_half or new_offense) and has_play:
+            ranges.append((drive_start, i))
+            drive_start = i
+            has_play = False
+        has_play = has_play or counted(play_type, plays.down[i]) or play_type == 'Kickoff Return Touchdown'
+        turnover_on_downs = (plays.down[i] == 4 and play_type in DOWNS_TYPES and plays.yards[i] < plays.distance[i])
+        if (play_type in PERIOD_ENDS or turnover_on_downs or play_result(plays, i)) and has_play:
+            ranges.append((drive_start, i + 1))
+            drive_start = i + 1
+            has_play = False
+    if drive_start < end:
+        if ranges and not has_play:
+            ranges[-1] = (ranges[-1][0], end)
+        else:
+            ranges.append((drive_start, end))
+    return ranges
+
+
+class DriveTable:
+    """Columnar table of drives reconstructed from the play table.
+
+    Each drive covers a contiguous play range and carries the figures a drive
+    chart shows: where it started and ended (yards to the opponent's goal),
+    plays run, net yards, game clock used and how it ended. Columns use -1
+    where the plays don't say (e.g. a drive that is all kickoff return).
+    """
+
+    NUMERIC_COLUMNS = {
+        'game': 'H',
+        'team': 'H',
+        'number': 'H',
+        'play_start': 'I',
+        'play_end': 'I',
+        'quarter': 'b',
+        'clock': 'h',
+        'end_quarter': 'b',
+        'end_clock': 'h',
+        'start_yards_to_goal': 'b',
+        'end_yards_to_goal': 'b',
+        'plays': 'H',
+        'yards': 'h',
+        'seconds': 'h',
+        'result': 'B',
+    }
+
+    def __init__(self, plays):
+        self.source = plays
+        for name, typecode in self.NUMERIC_COLUMNS.items():
+            setattr(self, name, array(typecode))
+
+    def __len__(self):
+        return len(self.play_start)
+
+    def add_game(self, start, end):
+        """Reconstruct the drives of the game at plays start..end; returns their (first, end) drive id range"""
+        plays = self.source
+        first = len(self)
+        for number, (drive_start, drive_end) in enumerate(drive_ranges(plays, start, end), 1):
+            play_ids = range(drive_start, drive_end)
+            counted_ids = [i for i in play_ids if counted(plays.play_types[plays.play_type[i]], plays.down[i])]
+            timed = [i for i in play_ids if play_category(plays.play_types[plays.play_type[i]]) != 'admin'] or counted_ids
+            last_type = plays.play_types[plays.play_type[timed[-1]]] if timed else ''
+            result = play_result(plays, timed[-1]) if timed else None
+            if result is None and counted_ids:
+                last = counted_ids[-1]
+                if plays.down[last] == 4 and last_type in DOWNS_TYPES and plays.yards[last] < plays.distance[last]:
+                    result = 'Downs'
+            if result is None:
+                ends = [PERIOD_ENDS[name] for name in (plays.play_types[plays.play_type[i]] for i in play_ids)
+                        if name in PERIOD_ENDS]
+                result = ends[-1] if ends else 'Unknown'
+            spots = [plays.yards_to_goal[i] for i in counted_ids if plays.yards_to_goal[i] >= 0]
+            start_spot = spots[0] if spots else -1
+            end_spot = 0 if result == 'Touchdown' and start_spot >= 0 else (spots[-1] if spots else -1)
+            team = plays.team[counted_ids[0]] if counted_ids else plays.team[drive_start]
+            self.game.append(plays.game[drive_start])
+            self.team.append(team)
+            self.number.append(number)
+            self.play_start.append(drive_start)
+            self.play_end.append(drive_end)
+            opening = timed[0] if timed else drive_start
+            closing = timed[-1] if timed else drive_end - 1
+            self.quarter.append(plays.quarter[opening])
+            self.clock.append(plays.clock[opening])
+            self.end_quarter.append(plays.quarter[closing])
+            self.end_clock.append(plays.clock[closing])
+            self.start_yards_to_goal.append(start_spot)
+            self.end_yards_to_goal.append(end_spot)
+            self.plays.append(len(counted_ids))
+            self.yards.append(start_spot - end_spot if start_spot >= 0 and end_spot >= 0 else 0)
+            self.seconds.append(max(plays.game_seconds[closing] - plays.game_seconds[opening], 0))
+            self.result.append(RESULTS.index(result))
+        return first, len(self)
+
+    def row(self, i):
+        """Materialize drive i as a dict"""
+        plays = self.source
+        return {
+            'game': plays.games[self.game[i]],
+            'team': plays.teams[self.team[i]],
+            'number': self.number[i],
+            'plays_range': (self.play_start[i], self.play_end[i]),
+            'quarter': self.quarter[i],
+            'clock': self.clock[i],
+            'end_quarter': self.end_quarter[i],
+            'end_clock': self.end_clock[i],
+            'start': field_position(self.start_yards_to_goal[i]),
+            'end': field_position(self.end_yards_to_goal[i]),
+            'start_yards_to_goal': self.start_yards_to_goal[i],
+            'end_yards_to_goal': self.end_yards_to_goal[i],
+            'plays': self.plays[i],
+            'yards': self.yards[i],
+            'seconds': self.seconds[i],
+            'time_of_possession': format_clock(self.seconds[i]),
+            'result': RESULTS[self.result[i]],
+        }
+
+    def summary(self, i):
+        """One-line drive chart entry: "Q1 6:17-2:18, own 43 to opp 7, 7 plays, 57 yds, 3:59, Touchdown" """
+        clock = f"Q{self.quarter[i]} {format_clock(self.clock[i])}-"
+        if self.end_quarter[i] != self.quarter[i]:
+            clock += f"Q{self.end_quarter[i]} "
+        clock += format_clock(self.end_clock[i])
+        return (f"{clock}, {field_position(self.start_yards_to_goal[i])} to "
+                f"{'end zone' if RESULTS[self.result[i]] == 'Touchdown' else field_position(self.end_yards_to_goal[i])}, "
+                f"{self.plays[i]} play{'' if self.plays[i] == 1 else 's'}, {self.yards[i]} yds, {format_clock(self.seconds[i])}, "
+                f"{RESULTS[self.result[i]]}")
+
+
+def drive_totals(drives, drive_ids):
+    """One line of per-drive averages and result counts over some drives"""
+    count = len(drive_ids)
+    if not count:
+        return ""
+    results = {}
+    for i in drive_ids:
+        results[RESULTS[drives.result[i]]] = results.get(RESULTS[drives.result[i]], 0) + 1
+    scores = sum(results.get(result, 0) for result in SCORING_RESULTS)
+    seconds = sum(drives.seconds[i] for i in drive_ids) // count
+    return (f"Totals: {count} drives, {scores} ended in points ({scores / count:.0%}); per drive "
+            f"{sum(drives.plays[i] for i in drive_ids) / count:.1f} plays, "
+            f"{sum(drives.yards[i] for i in drive_ids) / count:.1f} yds, {format_clock(seconds)}; results: "
+            + ", ".join(f"{result} {results[result]}" for result in RESULTS if result in results))
+
+
+def format_drives(drives, drive_ids, title="Drive chart"):
+    """Drive chart: its totals, then one line per drive grouped under one line per game"""
+    lines = [f"{title} ({len(drive_ids)} drives; start/end as own or opp yard line, "
+             f"time = game clock used):", drive_totals(drives, drive_ids)]
+    game = None
+    for i in drive_ids:
+        if drives.game[i] != game:
+            game = drives.game[i]
+            lines.append(f"@ {drives.source.games[game]}")
+        lines.append(f"Drive {drives.number[i]}: {drives.summary(i)}")
+    return "\n".join(lines)
@@ -0,0 +1,224 @@
+from play_parser import TEAM_ABBREVIATIONS, ABBREVIATION_ALIASES, ADMIN_TYPES
+
+# Canonical play field -> where ESPN keeps it. Each entry is tried in order and
+# may be a dotted path into a nested play (summary API "drives" JSON, core API
+# "items") or a flat column name from a CSV export.
+PLAY_SCHEMA = {
+    'quarter': ('period.number', 'period', 'quarter', 'qtr'),
+    'clock': ('clock.displayValue', 'clock.value', 'clock', 'time', 'clockDisplayValue'),
+    'team_id': ('start.team.id', 'team.id', 'teamId', 'start.teamId'),
+    'team': ('start.team.shortDisplayName', 'team.shortDisplayName', 'team', 'offense', 'posteam',
+             'start.team.abbreviation', 'team.abbreviation'),
+    'situation': ('start.downDistanceText', 'downDistanceText', 'start.shortDownDistanceText'),
+    'down': ('start.down', 'down'),
+    'distance': ('start.distance', 'distance', 'ydstogo'),
+    'field_position': ('start.possessionText', 'possessionText', 'yrdln'),
+    'yards_to_goal': ('start.yardsToEndzone', 'yardsToEndzone', 'yardline_100'),
+    'play_type': ('type.text', 'type', 'playType', 'play_type', 'typeText'),
+    'text': ('text', 'description', 'desc', 'shortText'),
+    'yards': ('statYardage', 'yards', 'yardsGained', 'yards_gained'),
+    'air_yards': ('airYards', 'air_yards', 'passAirYards'),
+    'complete': ('complete', 'isComplete'),
+    'red_zone': ('redZone', 'red_zone', 'start.redZone'),
+}
+
+# Columns a CSV export must have to be read as play-by-play rather than plain rows
+REQUIRED_FIELDS = ('quarter', 'clock', 'text')
+
+# Results ESPN reports for plays that were wiped out or are not football plays
+NO_PLAY_TYPES = ADMIN_TYPES | {'Penalty', 'Timeout'}
+
+# Plays the play-by-play PDFs mark "Incomplete" although the ball was snapped
+INCOMPLETE_TYPES = NO_PLAY_TYPES | {'Sack'}
+
+NICKNAMES = {abbreviation: nickname for nickname, abbreviation in TEAM_ABBREVIATIONS.items()}
+for alias, abbreviation in ABBREVIATION_ALIASES.items():
+    NICKNAMES.setdefault(alias, NICKNAMES[abbreviation])
+
+ORDINALS = {1: '1st', 2: '2nd', 3: '3rd', 4: '4th'}
+
+
+def lookup(play, path):
+    """Value at a dotted path in a nested play, or a flat key of that name; None if absent"""
+    if path in play:
+        value = play[path]
+    else:
+        value = play
+        for key in path.split('.'):
+            if not isinstance(value, dict) or key not in value:
+                return None
+            value = value[key]
+    return None if value == '' else value
+
+
+def field(play, name):
+    """First value the schema finds for a canonical field"""
+    for path in PLAY_SCHEMA[name]:
+        value = lookup(play, path)
+        if value is not None and not isinstance(value, (dict, list)):
+            return value
+    return None
+
+
+def as_int(value, default=None):
+    try:
+        return int(float(value))
+    except (TypeError, ValueError):
+        return default
+
+
+def as_bool(value):
+    """A JSON boolean or a CSV "true"/"1" cell; None if absent"""
+    if value is None or isinstance(value, bool):
+        return value
+    return str(value).strip().lower() in ('true', '1', 'yes', 't')
+
+
+def format_clock(value):
+    """ESPN clocks come as "14:30" or as seconds left in the quarter"""
+    text = str(value).strip()
+    if ':' in text:
+        minutes, seconds = text.split(':')[:2]
+        return f"{as_int(minutes, 0)}:{as_int(seconds, 0):02d}"
+    seconds = as_int(text, 0)
+    return f"{seconds // 60}:{seconds % 60:02d}"
+
+
+def team_name(value):
+    """Nickname used in play records ("Ravens") from a nickname, abbreviation or display name"""
+    value = str(value).strip()
+    if value in TEAM_ABBREVIATIONS:
+        return value
+    if value.upper() in NICKNAMES:
+        return NICKNAMES[value.upper()]
+    # "Baltimore Ravens"
+    last = value.split(' ')[-1]
+    return last if last in TEAM_ABBREVIATIONS else value
+
+
+def situation_text(play):
+    """"1st & 10 at DEN 36", rebuilt from down, distance and field position when ESPN has no text"""
+    situation = field(play, 'situation')
+    if situation:
+        return str(situation)
+    down = as_int(field(play, 'down'), 0)
+    position = field(play, 'field_position')
+    if not 1 <= down <= 4 or not position:
+        return 'N/A'
+    distance = as_int(field(play, 'distance'), 0)
+    return f"{ORDINALS[down]} & {distance} at {position}"
+
+
+def play_record(play, teams=None):
+    """Render one ESPN play as a pipe-delimited play record, or None if it lacks quarter, clock or text.
+
+    The record has the same layout as the play-by-play PDFs
+    ("Q1 | 14:30 | Ravens | 1st & 10 at DEN 36 | Rush: ... | Complete play,
+    not in red zone, 4 yards gained."), so parse_record() and every index
+    treat structured and PDF-extracted games alike. Air yards, which only
+    structured exports carry, are appended to the result (", 12 air yards").
+    """
+    quarter = as_int(field(play, 'quarter'))
+    clock = field(play, 'clock')
+    text = field(play, 'text')
+    if not quarter or clock is None or not text:
+        return None
+    team_id = field(play, 'team_id')
+    team = (teams or {}).get(str(team_id)) if team_id is not None else None
+    team = team or team_name(field(play, 'team') or '')
+    play_type = str(field(play, 'play_type') or 'Unknown')
+    yards = as_int(field(play, 'yards'), 0)
+    yards_to_goal = as_int(field(play, 'yards_to_goal'))
+    # Exports that carry the flags themselves win over what is derived from the play
+    red_zone = as_bool(field(play, 'red_zone'))
+    if red_zone is None:
+        red_zone = yards_to_goal is not None and 0 < yards_to_goal <= 20
+    complete = as_bool(field(play, 'complete'))
+    if complete is None:
+        complete = play_type not in INCOMPLETE_TYPES and 'No Play' not in str(text)
+    # A "|" inside the description would shift every field after it
+    description = ' '.join(str(text).replace('|', '/').split())
+    air_yards = as_int(field(play, 'air_yards'))
+    return (f"Q{quarter} | {format_clock(clock)} | {team} | {situation_text(play)} | {play_type}: {description} | "
+            f"{'Complete' if complete else 'Incomplete'} play, {'in' if red_zone else 'not in'} red zone, "
+            f"{yards} yards gained{'' if air_yards is None else f', {air_yards} air yards'}.")
+
+
+def team_names(data):
+    """ESPN team id -> nickname from a game summary's header and drives"""
+    teams = {}
+    competitions = lookup(data, 'header.competitions') or []
+    for competition in competitions[:1]:
+        for competitor in competition.get('competitors', []):
+            team = competitor.get('team', {})
+            if 'id' in team:
+                teams[str(team['id'])] = team_name(team.get('shortDisplayName') or team.get('displayName') or '')
+    for drive in json_plays_containers(data):
+        team = drive.get('team') if isinstance(drive, dict) else None
+        if isinstance(team, dict) and 'id' in team:
+            teams.setdefault(str(team['id']), team_name(team.get('shortDisplayName') or team.get('displayName') or ''))
+    return teams
+
+
+def json_plays_containers(data):
+    """Drives of a game summary ("drives": {"previous": [...], "current": {...}})"""
+    drives = data.get('drives') if isinstance(data, dict) else None
+    if not isinstance(drives, dict):
+        return []
+    containers = list(drives.get('previous') or [])
+    current = drives.get('current')
+    if isinstance(current, dict) and current not in containers:
+        containers.append(current)
+    return containers
+
+
+def json_plays(data):
+    """Plays of an ESPN play-by-play JSON document in game order, or None if it is not one"""
+    if isinstance(data, dict):
+        drives = json_plays_containers(data)
+        if drives:
+            return [play for drive in drives for play in drive.get('plays', []) if isinstance(play, dict)]
+        for key in ('plays', 'items'):
+            if isinstance(data.get(key), list):
+                return json_plays(data[key])
+        return None
+    if isinstance(data, list) and data and all(isinstance(play, dict) for play in data):
+        plays = [play for play in data if field(play, 'text') and field(play, 'quarter')]
+        return plays if plays else None
+    return None
+
+
+def json_records(data):
+    """Play records for an ESPN play-by-play JSON document, or None if it is not one"""
+    plays = json_plays(data)
+    if plays is None:
+        return None
+    teams = team_names(data)
+    if isinstance(plays, list) and plays and 'sequenceNumber' in plays[0]:
+        plays = sorted(plays, key=lambda play: as_int(play.get('sequenceNumber'), 0))
+    return [record for record in (play_record(play, teams) for play in plays) if record]
+
+
+def game_week(data):
+    """Week of the season from a game summary's header or a CSV row's "week" column, or None"""
+    if not isinstance(data, dict):
+        return None
+    for path in ('header.week.number', 'header.week', 'week.number', 'week'):
+        week = as_int(lookup(data, path))
+        if week:
+            return week
+    return None
+
+
+def is_play_by_play_csv(columns):
+    """Whether a CSV header maps onto the play schema"""
+    columns = set(columns or [])
+    return all(any(path in columns for path in PLAY_SCHEMA[name]) for name in REQUIRED_FIELDS)
+
+
+def csv_records(rows):
+    """Play records for the rows of an ESPN play-by-play CSV export"""
+    for row in rows:
+        record = play_record(row)
+        if record:
+            yield record
@@ -0,0 +1,126 @@
+import re
+from play_parser import TEAM_ABBREVIATIONS, ABBREVIATION_ALIASES
+
+# "401671789_ravens-chiefs_context.pdf": ESPN game id, then the away and home team
+GAME_NAME = re.compile(r'^(\d{6,})_([a-z0-9]+)-([a-z0-9]+)')
+GAME_ID = re.compile(r'\b\d{6,}\b')
+
+NICKNAMES = {nickname.lower(): nickname for nickname in TEAM_ABBREVIATIONS}
+NICKNAME_PATTERN = re.compile(r'\b(' + '|'.join(re.escape(name) for name in NICKNAMES) + r')\b', re.IGNORECASE)
+
+# Abbreviations only count in capitals; "NO" is far more often the word than the Saints
+ABBREVIATIONS = {abbreviation: nickname for nickname, abbreviation in TEAM_ABBREVIATIONS.items() if abbreviation != 'NO'}
+ABBREVIATIONS.update({alias: ABBREVIATIONS[abbreviation] for alias, abbreviation in ABBREVIATION_ALIASES.items()})
+ABBREVIATION_PATTERN = re.compile(r'\b[A-Z]{2,3}\b')
+
+# Cities and regions that name one team; Los Angeles and New York name two and are left out
+TEAM_CITIES = {
+    'arizona': 'Cardinals', 'atlanta': 'Falcons', 'baltimore': 'Ravens', 'buffalo': 'Bills',
+    'carolina': 'Panthers', 'chicago': 'Bears', 'cincinnati': 'Bengals', 'cleveland': 'Browns',
+    'dallas': 'Cowboys', 'denver': 'Broncos', 'detroit': 'Lions', 'green bay': 'Packers',
+    'houston': 'Texans', 'indianapolis': 'Colts', 'jacksonville': 'Jaguars', 'kansas city': 'Chiefs',
+    'las vegas': 'Raiders', 'miami': 'Dolphins', 'minnesota': 'Vikings', 'new england': 'Patriots',
+    'new orleans': 'Saints', 'philadelphia': 'Eagles', 'pittsburgh': 'Steelers', 'san francisco': '49ers',
+    'seattle': 'Seahawks', 'tampa bay': 'Buccaneers', 'tennessee': 'Titans', 'washington': 'Commanders',
+}
+CITY_PATTERN = re.compile(r'\b(' + '|'.join(TEAM_CITIES) + r')\b', re.IGNORECASE)
+
+WEEK_PATTERN = re.compile(r'\bweeks?\s+(\d{1,2})(?:\s*(?:-|to|through|and)\s*(\d{1,2}))?\b', re.IGNORECASE)
+RECENT_PATTERN = re.compile(r'\b(first|last)\s+(\d{1,2}|two|three|four|five|six|seven|eight|nine|ten)\s+games\b',
+                            re.IGNORECASE)
+NUMBER_WORDS = {'two': 2, 'three': 3, 'four': 4, 'five': 5, 'six': 6, 'seven': 7, 'eight': 8, 'nine': 9, 'ten': 10}
+
+
+def parse_game_name(doc_id):
+    """(game id, {team nicknames}) encoded in a game's file name, or (None, empty set) if it has neither"""
+    match = GAME_NAME.match(doc_id.lower())
+    if not match:
+        return None, set()
+    game_id, away, home = match.groups()
+    return game_id, {NICKNAMES[team] for team in (away, home) if team in NICKNAMES}
+
+
+def mentioned_teams(query):
+    """Team nicknames a question names by nickname, capitalized abbreviation or city"""
+    teams = {NICKNAMES[name.lower()] for name in NICKNAME_PATTERN.findall(query)}
+    teams.update(ABBREVIATIONS[token] for token in ABBREVIATION_PATTERN.findall(query) if token in ABBREVIATIONS)
+    teams.update(TEAM_CITIES[city.lower()] for city in CITY_PATTERN.findall(query))
+    return teams
+
+
+def parse_weeks(query):
+    """Week numbers a question asks about ("week 5", "weeks 3-6"), as a set"""
+    weeks = set()
+    for first, last in WEEK_PATTERN.findall(query):
+        first = int(first)
+        last = int(last) if last else first
+        weeks.update(range(min(first, last), max(first, last) + 1))
+    return weeks
+
+
+class GameRouter:
+    """Which games of the library a question is about.
+
+    Game files are named after their ESPN game id and matchup, so a question
+    naming a game id, a team or an opponent maps to a handful of games before
+    any scoring happens. ESPN ids are not in schedule order, so weeks ("week
+    5", "last 3 games") only route among games whose document said which
+    week it was.
+    """
+
+    def __init__(self, shards):
+        self.games = {}
+        self.by_id = {}
+        self.by_team = {}
+        self.weeks = {}
+        for doc_id, shard in shards.items():
+            game_id, teams = parse_game_name(doc_id)
+            self.games[doc_id] = (game_id, teams)
+            if game_id:
+                self.by_id[game_id] = doc_id
+            for team in teams:
+                self.by_team.setdefault(team, []).append(doc_id)
+            if shard.get('week'):
+                self.weeks[doc_id] = shard['week']
+        # The team the library follows: the one playing in the most games
+        self.focus_team = max(self.by_team, key=lambda team: (len(self.by_team[team]), team)) if self.by_team else None
+
+    def schedule(self, teams):
+        """Games with a known week of the named team with the most games (else the focus team), in week order"""
+        known = [team for team in teams if team in self.by_team]
+        team = max(known, key=lambda team: (len(self.by_team[team]), team)) if known else self.focus_team
+        games = [doc_id for doc_id in self.by_team.get(team, []) if doc_id in self.weeks]
+        return sorted(games, key=lambda doc_id: (self.weeks[doc_id], doc_id))
+
+    def route(self, query):
+        """Doc ids of the games a question is about, or None when it names no game, team or week.
+
+        Routing only narrows: a question whose constraints match no game, or
+        match every game, is not routed and searches the whole library.
+        """
+        selected = None
+        game_ids = [game_id for game_id in GAME_ID.findall(query) if game_id in self.by_id]
+        if game_ids:
+            selected = {self.by_id[game_id] for game_id in game_ids}
+
+        teams = mentioned_teams(query)
+        team_games = [set(self.by_team[team]) for team in teams if team in self.by_team]
+        if team_games:
+            # "Ravens vs Chiefs" means games with both teams; fall back to either if they never met
+            games = set.intersection(*team_games) or set.union(*team_games)
+            selected = games if selected is None else selected & games
+
+        weeks = parse_weeks(query)
+        if weeks and self.weeks:
+            games = {doc_id for doc_id, week in self.weeks.items() if week in weeks}
+            selected = games if selected is None else selected & games
+        for which, count in RECENT_PATTERN.findall(query):
+            schedule = self.schedule(teams)
+            count = NUMBER_WORDS.get(count.lower()) or int(count)
+            if schedule and count:
+                games = set(schedule[:count] if which.lower() == 'first' else schedule[-count:])
+                selected = games if selected is None else selected & games
+
+        if not selected or len(selected) == len(self.games):
+            return None
+        return selected
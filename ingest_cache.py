@@ -0,0 +1,238 @@
+import os
+import sys
+import json
+import time
+import hashlib
+import argparse
+
+DEFAULT_CACHE_DIR = '.ingest_cache'
+DEFAULT_MAX_MB = 256
+
+
+class CacheEntryWriter:
+    """Writes one cache entry a page at a time to a temporary file.
+
+    Nothing is visible to readers until commit() renames the finished file
+    into place; abort() throws the partial entry away.
+    """
+
+    def __init__(self, cache, key, source):
+        self.cache = cache
+        self.path = cache._entry_path(key)
+        self.tmp_path = f"{self.path}.{os.getpid()}.tmp"
+        self.pages = 0
+        self.file = open(self.tmp_path, 'w', encoding='utf-8')
+        self.file.write(json.dumps({
+            'key': key,
+            'source': os.path.basename(source),
+            'version': cache.version,
+            'created': time.time(),
+        }) + "\n")
+
+    def write_page(self, page_text):
+        self.file.write(json.dumps({'text': page_text}) + "\n")
+        self.pages += 1
+
+    def commit(self):
+        self.file.write(json.dumps({'pages': self.pages}) + "\n")
+        self.file.close()
+        # Atomic so a concurrent reader never sees a half-written entry
+        os.replace(self.tmp_path, self.path)
+        self.cache.evict()
+
+    def abort(self):
+        self.file.close()
+        self.cache._remove(self.tmp_path)
+
+
+class IngestCache:
+    """On-disk cache of extracted document text keyed by file content hash.
+
+    Each entry is a JSON Lines file: a header line, one line per extracted
+    page, and a trailer line with the page count that marks the entry as
+    complete. Structured content is not cached; it is rebuilt from the pages,
+    which costs far less than PyPDF2 extraction. Entries are named by
+    sha256(file bytes + extractor version), so a changed file or a new
+    extractor simply misses. Recency is tracked with the entry's mtime, which
+    keeps the cache safe to share between ingestion worker processes.
+    """
+
+    def __init__(self, cache_dir=None, max_bytes=None, version='1'):
+        self.cache_dir = cache_dir or os.getenv('INGEST_CACHE_DIR', DEFAULT_CACHE_DIR)
+        if max_bytes is None:
+            max_bytes = int(float(os.getenv('INGEST_CACHE_MAX_MB', DEFAULT_MAX_MB)) * 1024 * 1024)
+        self.max_bytes = max_bytes
+        self.version = str(version)
+        os.makedirs(self.cache_dir, exist_ok=True)
+
+    def key_for(self, filepath):
+        """Hash the file contents together with the extractor version"""
+        digest = hashlib.sha256()
+        digest.update(f"extractor:{self.version}\n".encode('utf-8'))
+        with open(filepath, 'rb') as file:
+            for chunk in iter(lambda: file.read(1024 * 1024), b''):
+                digest.update(chunk)
+        return digest.hexdigest()
+
+    def _entry_path(self, key):
+        return os.path.join(self.cache_dir, f"{key}.jsonl")
+
+    def has(self, key):
+        return os.path.exists(self._entry_path(key))
+
+    def iter_pages(self, key):
+        """Yield the cached page texts of an entry.
+
+        Raises ValueError (after dropping the entry) if it turns out to be
+        truncated or corrupt, so the caller can re-extract the file.
+        """
+        path = self._entry_path(key)
+        try:
+            with open(path, 'r', encoding='utf-8') as file:
+                json.loads(file.readline())
+                count = 0
+                for line in file:
+                    record = json.loads(line)
+                    if 'text' in record:
+                        count += 1
+                        yield record['text']
+                    elif record.get('pages') == count:
+                        break
+                    else:
+                        raise ValueError(f"expected {record.get('pages')} pages, found {count}")
+                else:
+                    raise ValueError("entry ends before its trailer")
+        except (ValueError, KeyError, TypeError) as e:
+            print(f"Discarding unreadable cache entry {path}: {str(e)}")
+            self._remove(path)
+            raise ValueError(f"Unreadable cache entry {path}: {str(e)}")
+        # Mark as recently used for LRU eviction
+        try:
+            os.utime(path, None)
+        except OSError:
+            pass
+
+    def writer(self, key, source):
+        """Open a CacheEntryWriter that streams a new entry page by page"""
+        return CacheEntryWriter(self, key, source)
+
+    def put(self, key, source, pages):
+        """Store the extracted pages of a file"""
+        writer = self.writer(key, source)
+        try:
+            for page_text in pages:
+                writer.write_page(page_text)
+        except BaseException:
+            writer.abort()
+            raise
+        writer.commit()
+
+    def invalidate(self, source):
+        """Remove every cached entry extracted from a file with this name"""
+        name = os.path.basename(source)
+        removed = 0
+        for path in self._entries():
+            try:
+                with open(path, 'r', encoding='utf-8') as file:
+                    header = json.loads(file.readline())
+            except (OSError, ValueError):
+                continue
+            if header.get('source') == name:
+                self._remove(path)
+                removed += 1
+        return removed
+
+    def clear(self):
+        """Remove all cached entries"""
+        entries = self._entries()
+        for path in entries:
+            self._remove(path)
+        return len(entries)
+
+    def evict(self):
+        """Delete least recently used entries until the cache fits in max_bytes"""
+        entries = []
+        for path in self._entries():
+            try:
+                stat = os.stat(path)
+            except OSError:
+                continue
+            entries.append((stat.st_mtime, stat.st_size, path))
+        total = sum(size for _, size, _ in entries)
+        evicted = 0
+        for _, size, path in sorted(entries):
+            if total <= self.max_bytes:
+                break
+            self._remove(path)
+            total -= size
+            evicted += 1
+        return evicted
+
+    def stats(self):
+        """Entry count and total size of the cache"""
+        sizes = []
+        for path in self._entries():
+            try:
+                sizes.append(os.path.getsize(path))
+            except OSError:
+                continue
+        return {
+            'cache_dir': os.path.abspath(self.cache_dir),
+            'version': self.version,
+            'entries': len(sizes),
+            'bytes': sum(sizes),
+            'max_bytes': self.max_bytes,
+        }
+
+    def _entries(self):
+        return [os.path.join(self.cache_dir, name) for name in os.listdir(self.cache_dir)
+                if name.endswith('.jsonl')]
+
+    def _remove(self, path):
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Manage the document ingestion cache")
+    parser.add_argument('--cache-dir', help="Cache directory (default: $INGEST_CACHE_DIR or .ingest_cache)")
+    subparsers = parser.add_subparsers(dest='command', required=True)
+    warm = subparsers.add_parser('warm', help="Extract every document so later starts hit the cache")
+    warm.add_argument('--docs-dir', help="Documents directory (default: $DOCUMENTS_DIR or documents)")
+    warm.add_argument('--workers', type=int, help="Number of ingestion worker processes")
+    subparsers.add_parser('clear', help="Remove all cached entries")
+    subparsers.add_parser('stats', help="Show cache size and entry count")
+    invalidate = subparsers.add_parser('invalidate', help="Remove cached entries for specific files")
+    invalidate.add_argument('files', nargs='+')
+    args = parser.parse_args(argv)
+
+    if args.cache_dir:
+        os.environ['INGEST_CACHE_DIR'] = args.cache_dir
+
+    if args.command == 'warm':
+        os.environ['INGEST_CACHE'] = '1'
+        # Imported here so the cache module stays importable from doc_processor
+        from doc_processor import DocumentProcessor
+        # Extract straight from the documents: a full start would map the corpus file and read nothing
+        processor = DocumentProcessor(args.docs_dir, workers=args.workers, autoload=False)
+        processor.load_all_documents()
+        failures = [entry for entry in processor.ingest_report if entry['error']]
+        print(json.dumps(processor.cache.stats(), indent=2))
+        return 1 if failures else 0
+
+    from doc_processor import EXTRACTOR_VERSION
+    cache = IngestCache(version=EXTRACTOR_VERSION)
+    if args.command == 'clear':
+        print(f"Removed {cache.clear()} cache entries")
+    elif args.command == 'stats':
+        print(json.dumps(cache.stats(), indent=2))
+    elif args.command == 'invalidate':
+        for source in args.files:
+            print(f"{source}: removed {cache.invalidate(source)} cache entries")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,81 @@
+import os
+import json
+import time
+
+DEFAULT_ARTIFACT_DIR = '.ingest_artifacts'
+MANIFEST_NAME = 'manifest.json'
+
+
+def artifact_names(filename):
+    """Names of the debug log and full-text sidecars load_pdf derives from a source file"""
+    return [
+        filename.replace(' ', '_') + '_debug.txt',
+        filename.replace('.pdf', '_text.txt'),
+    ]
+
+
+class IngestManifest:
+    """Record of the source documents that were ingested and the artifacts derived from each.
+
+    Derived files (debug logs, full-text dumps) are written to a separate
+    artifact directory. The manifest lets load_all_documents recognize them,
+    and the ones older versions wrote next to their PDF in the documents
+    directory, so every game is ingested from its source exactly once.
+    """
+
+    def __init__(self, artifact_dir=None):
+        self.artifact_dir = artifact_dir or os.getenv('INGEST_ARTIFACT_DIR', DEFAULT_ARTIFACT_DIR)
+        os.makedirs(self.artifact_dir, exist_ok=True)
+        self.path = os.path.join(self.artifact_dir, MANIFEST_NAME)
+        self.sources = {}
+        try:
+            with open(self.path, 'r', encoding='utf-8') as file:
+                self.sources = json.load(file).get('sources', {})
+        except FileNotFoundError:
+            pass
+        except (ValueError, AttributeError) as e:
+            print(f"Ignoring unreadable ingest manifest {self.path}: {str(e)}")
+
+    def artifact_path(self, filename):
+        return os.path.join(self.artifact_dir, filename)
+
+    def derived_files(self, filenames):
+        """The files in a directory listing that are artifacts of another file in it"""
+        names = set(filenames)
+        derived = set()
+        for filename in filenames:
+            entry = self.sources.get(filename, {})
+            candidates = [os.path.basename(path) for path in entry.get('artifacts', [])]
+            if filename.lower().endswith('.pdf'):
+                candidates += artifact_names(filename)
+            for artifact in candidates:
+                if artifact != filename and artifact in names:
+                    derived.add(artifact)
+        return derived
+
+    def record(self, filename, filepath, game, artifacts):
+        """Remember that a source file was ingested and which artifacts it produced"""
+        try:
+            stat = os.stat(filepath)
+            size, mtime = stat.st_size, stat.st_mtime
+        except OSError:
+            size, mtime = None, None
+        self.sources[filename] = {
+            'game': game,
+            'size': size,
+            'mtime': mtime,
+            'artifacts': sorted(artifacts),
+            'ingested': time.time(),
+        }
+
+    def forget_missing(self, filenames):
+        """Drop sources that are no longer in the documents directory"""
+        for filename in set(self.sources) - set(filenames):
+            del self.sources[filename]
+
+    def save(self):
+        tmp_path = f"{self.path}.{os.getpid()}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as file:
+            json.dump({'sources': self.sources}, file, indent=2, sort_keys=True)
+        # Atomic so an interrupted save never leaves a truncated manifest
+        os.replace(tmp_path, self.path)
@@ -0,0 +1,127 @@
+import re
+from play_parser import TEAM_ABBREVIATIONS
+from context_builder import estimate_tokens
+
+ENCODINGS = ('text', 'compact')
+
+# Short codes for play types; any other type is coded by its initials
+TYPE_CODES = {
+    'Rush': 'R', 'Pass Reception': 'PC', 'Pass Incompletion': 'PI', 'Sack': 'SK',
+    'Passing Touchdown': 'PTD', 'Rushing Touchdown': 'RTD', 'Pass Interception Return': 'INT',
+    'Interception Return Touchdown': 'ITD', 'Fumble Recovery (Own)': 'FRO', 'Fumble Recovery (Opponent)': 'FRD',
+    'Kickoff': 'KO', 'Kickoff Return (Offense)': 'KR', 'Kickoff Return Touchdown': 'KRTD', 'Punt': 'P',
+    'Blocked Punt': 'BP', 'Field Goal Good': 'FG', 'Field Goal Missed': 'FGM', 'Blocked Field Goal': 'BFG',
+    'Extra Point Good': 'XP', 'Extra Point Missed': 'XPM', 'Penalty': 'PEN', 'Timeout': 'TO',
+    'Official Timeout': 'OTO', 'Two-minute warning': '2MW', 'End Period': 'EQ', 'End of Half': 'EH',
+    'End of Game': 'EG', 'Safety': 'SF',
+}
+
+# Formation tags and the truncation marker of the play-by-play exports
+FORMATIONS = (('(No Huddle, Shotgun)', 'NH SG'), ('(Shotgun)', 'SG'), ('(No Huddle)', 'NH'))
+TRUNCATION = re.compile(r'\.{3,}$')
+GAIN = re.compile(r' for (-?\d+) yards?| for no gain')
+# Where the ball ended up ("to DEN 15", "ran ob at BLT 47"); the ytg and yds columns already place it
+SPOT = re.compile(r' (?:to|at) (?:the )?[A-Z]{2,3} \d{1,2}\b')
+FLAGS = "Z=in red zone, X=incomplete or no play"
+# "_context" / "_synthetic" after the matchup in game file names says nothing to the model
+GAME_SUFFIX = re.compile(r'_[a-z]+$')
+
+
+def type_code(play_type):
+    return TYPE_CODES.get(play_type) or ''.join(word[0] for word in re.findall(r'[A-Za-z0-9]+', play_type)).upper()
+
+
+def compact_description(text, yards):
+    """Play prose without its type label, truncation dots, formation wording or a gain the yds column repeats"""
+    description = ' | '.join(text.split(' | ')[4:-1])
+    description = description.split(': ', 1)[1] if ': ' in description else description
+    description = TRUNCATION.sub('', description.strip())
+    for long, short in FORMATIONS:
+        description = description.replace(long, short)
+
+    def drop_gain(match):
+        gained = 0 if match.group(1) is None else int(match.group(1))
+        return '' if gained == yards else match.group(0)
+    return SPOT.sub('', GAIN.sub(drop_gain, description)).strip()
+
+
+class CompactEncoder:
+    """Renders plays as pipe-separated rows with coded teams, play types and games.
+
+    The codes are declared once in a legend placed ahead of the rows, so the
+    prose each play record repeats ("Complete play, not in red zone, 2 yards
+    gained.", team names, "...." markers) is spent only once per prompt. Rows
+    are grouped under one header line per game instead of naming the game on
+    every row, and when every candidate play has the same offense its column
+    is dropped and the legend names the team instead.
+    """
+
+    def __init__(self, plays, units=()):
+        self.plays = plays
+        offenses = {plays.team[i] for unit in units for i in range(max(unit.play_start, 0), unit.play_end)}
+        self.offense = offenses.pop() if len(offenses) == 1 else None
+
+    def columns(self):
+        return "qtr|clock|" + ("off|" if self.offense is None else "") + "down&dist|ytg|type|yds|flags|play"
+
+    def row(self, i):
+        plays = self.plays
+        down = plays.down[i]
+        situation = f"{down}&{'G' if plays.goal_to_go[i] else plays.distance[i]}" if down > 0 else '-'
+        yards_to_goal = plays.yards_to_goal[i]
+        # Field position is more reliable than the exported flag when it is known
+        red_zone = 0 < yards_to_goal <= 20 if yards_to_goal >= 0 else plays.red_zone[i]
+        clock = plays.clock[i]
+        fields = [str(plays.quarter[i]), f"{clock // 60}:{clock % 60:02d}"]
+        if self.offense is None:
+            team = plays.teams[plays.team[i]]
+            fields.append(TEAM_ABBREVIATIONS.get(team, team))
+        fields += [situation, str(yards_to_goal) if yards_to_goal >= 0 else '-',
+                   type_code(plays.play_types[plays.play_type[i]]), str(plays.yards[i]),
+                   ('Z' if red_zone else '') + ('' if plays.complete[i] else 'X'),
+                   compact_description(plays.text[i], plays.yards[i])]
+        return '|'.join(fields)
+
+    def render(self, unit):
+        """A unit's plays as rows under a one-line header for drives and quarters; passages stay prose"""
+        if unit.play_start < 0:
+            return unit.text
+        rows = [self.row(i) for i in range(unit.play_start, unit.play_end)]
+        if unit.granularity != 'play':
+            rows.insert(0, '# ' + unit.text.split("\n", 1)[0].replace(f" ({unit.doc_id})", ''))
+        return "\n".join(rows)
+
+    def game_header(self, game):
+        return "@ " + GAME_SUFFIX.sub('', self.plays.games[game])
+
+    def legend(self, units):
+        """Column and code declarations for the plays of these units"""
+        plays = self.plays
+        types = {plays.play_types[plays.play_type[i]]
+                 for unit in units for i in range(max(unit.play_start, 0), unit.play_end)}
+        if not types:
+            return ""
+        lines = [f"Plays as rows: {self.columns()} under an \"@ game\" line (ytg = yards to the opponent's goal "
+                 f"line; flags {FLAGS}; SG=shotgun, NH=no huddle)"]
+        if self.offense is not None:
+            team = plays.teams[self.offense]
+            lines.append(f"Offense on every play: {team} ({TEAM_ABBREVIATIONS.get(team, team)})")
+        lines.append("Types: " + ", ".join(f"{type_code(play_type)}={play_type}" for play_type in sorted(types)))
+        return "\n".join(lines)
+
+    def overhead(self, units):
+        """Estimated tokens of the legend and game lines the plays of these units could need"""
+        games = {self.plays.game[unit.play_start] for unit in units if unit.play_start >= 0}
+        return estimate_tokens(self.legend(units)) + sum(estimate_tokens(self.game_header(game)) + 1
+                                                        for game in games) + 1
+
+    def assemble(self, header, chosen):
+        """Context from (unit, rendered text) pairs in order: header, legend, then rows under game lines"""
+        lines = [header, self.legend([unit for unit, _ in chosen])]
+        game = None
+        for unit, text in chosen:
+            if unit.play_start >= 0 and self.plays.game[unit.play_start] != game:
+                game = self.plays.game[unit.play_start]
+                lines.append(self.game_header(game))
+            lines.append(text)
+        return "\n".join(line for line in lines if line)
@@ -0,0 +1,478 @@
+import os
+import re
+import json
+from bisect import bisect_left, bisect_right
+from array import array
+from search_index import STOPWORDS
+from play_parser import TEAM_ABBREVIATIONS, QUARTER_SECONDS, play_category, player_roles
+
+FACETS = ('down', 'distance', 'quarter', 'field_zone', 'red_zone', 'play_type', 'category', 'offense', 'defense')
+
+ORDINALS = {'1st': 1, 'first': 1, '2nd': 2, 'second': 2, '3rd': 3, 'third': 3, '4th': 4, 'fourth': 4}
+
+DOWN_PATTERN = re.compile(r'\b(1st|2nd|3rd|4th|first|second|third|fourth)\s*(?:down|and|&)(?:\s*(long|short|medium|\d+))?')
+QUARTER_PATTERN = re.compile(r'\b(?:(1st|2nd|3rd|4th|first|second|third|fourth)\s+quarter|q([1-4]))\b')
+DISTANCE_PATTERN = re.compile(r'\b(short|long|medium)[\s-]+(?:yardage|distance)\b|\band\s+(long|short|medium)\b')
+
+# A team named as the opponent ("against the Browns", "Browns defense") filters the defense, not the offense
+TEAM_NAMES = '|'.join(re.escape(nickname.lower()) for nickname in TEAM_ABBREVIATIONS)
+TEAM_PATTERN = re.compile(r"\b(" + TEAM_NAMES + r")\b")
+OPPONENT_PATTERN = re.compile(r"\b(?:against|vs\.?|versus|facing|opposing|allowed by|given up by)\s+(?:the\s+)?("
+                              + TEAM_NAMES + r")\b|\b(" + TEAM_NAMES + r")'?\s+(?:defen[cs]e|d)\b")
+
+# Phrases that select a field zone (see field_zone())
+ZONE_PHRASES = (
+    ('goal line', ('goal_line',)),
+    ('goal-line', ('goal_line',)),
+    ('backed up', ('backed_up',)),
+    ('own end zone', ('backed_up',)),
+    ('own territory', ('backed_up', 'own_territory')),
+    ('own side', ('backed_up', 'own_territory')),
+    ('opponent territory', ('opponent_territory', 'red_zone', 'goal_line')),
+    ("opponent's territory", ('opponent_territory', 'red_zone', 'goal_line')),
+    ('plus territory', ('opponent_territory', 'red_zone', 'goal_line')),
+)
+
+# Words that select play categories or specific play types
+CATEGORY_WORDS = {
+    'pass': 'pass', 'passes': 'pass', 'passing': 'pass', 'throw': 'pass', 'throws': 'pass', 'throwing': 'pass',
+    'run': 'rush', 'runs': 'rush', 'running': 'rush', 'rush': 'rush', 'rushes': 'rush', 'rushing': 'rush',
+    'special teams': 'special_teams',
+}
+PLAY_TYPE_WORDS = {
+    'sack': ('Sack',), 'sacks': ('Sack',), 'sacked': ('Sack',),
+    'punt': ('Punt',), 'punts': ('Punt',),
+    'field goal': ('Field Goal Good', 'Field Goal Missed'), 'field goals': ('Field Goal Good', 'Field Goal Missed'),
+    'penalty': ('Penalty',), 'penalties': ('Penalty',),
+    'interception': ('Pass Interception Return',), 'interceptions': ('Pass Interception Return',),
+    'kickoff': ('Kickoff', 'Kickoff Return (Offense)'), 'kickoffs': ('Kickoff', 'Kickoff Return (Offense)'),
+}
+
+ROLES = ('passer', 'rusher', 'target', 'tackler', 'kicker', 'other')
+
+# Nicknames the play text never spells out ("king henry"), as alias -> export name. Full names
+# ("lamar jackson") need no entry: they resolve through the initial and surname of the export name.
+PLAYER_ALIASES_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'data', 'player_aliases.json')
+
+# Snaps that make up an opening script
+OPENING_SCRIPT_PLAYS = 15
+
+WINDOW_PERIODS = {
+    '1st': (0, QUARTER_SECONDS), 'first': (0, QUARTER_SECONDS),
+    '2nd': (QUARTER_SECONDS, 2 * QUARTER_SECONDS), 'second': (QUARTER_SECONDS, 2 * QUARTER_SECONDS),
+    '3rd': (2 * QUARTER_SECONDS, 3 * QUARTER_SECONDS), 'third': (2 * QUARTER_SECONDS, 3 * QUARTER_SECONDS),
+    '4th': (3 * QUARTER_SECONDS, 4 * QUARTER_SECONDS), 'fourth': (3 * QUARTER_SECONDS, 4 * QUARTER_SECONDS),
+    'first half': (0, 2 * QUARTER_SECONDS), 'second half': (2 * QUARTER_SECONDS, 4 * QUARTER_SECONDS),
+    'half': (0, 2 * QUARTER_SECONDS), 'game': (0, 4 * QUARTER_SECONDS),
+}
+WINDOW_PATTERN = re.compile(
+    r'\b(last|final|first|opening)\s+(\d+|two|three|five|ten)\s+min(?:ute)?s?\s+(?:of\s+)?(?:the\s+)?'
+    r'(first half|second half|half|game|1st|2nd|3rd|4th|first|second|third|fourth)?')
+NUMBER_WORDS = {'two': 2, 'three': 3, 'five': 5, 'ten': 10}
+
+
+def parse_time_window(query):
+    """Game-clock windows a question asks about.
+
+    Returns {'windows': [(start, end), ...], 'opening': n} in game seconds,
+    where 'opening' is the number of snaps in an opening script (or None).
+    """
+    text = query.lower()
+    windows = []
+    for match in WINDOW_PATTERN.finditer(text):
+        which, amount, period = match.groups()
+        minutes = NUMBER_WORDS.get(amount) or int(amount)
+        start, end = WINDOW_PERIODS.get(period or 'game')
+        if which in ('last', 'final'):
+            windows.append((max(start, end - minutes * 60), end))
+        else:
+            windows.append((start, min(end, start + minutes * 60)))
+    if any(phrase in text for phrase in ('two-minute', 'two minute', '2-minute', '2 minute', 'twominute')) \
+            and not windows:
+        windows.extend([(2 * QUARTER_SECONDS - 120, 2 * QUARTER_SECONDS), (4 * QUARTER_SECONDS - 120, 4 * QUARTER_SECONDS)])
+    if 'end of the first half' in text or 'end of the half' in text or 'before halftime' in text:
+        windows.append((2 * QUARTER_SECONDS - 120, 2 * QUARTER_SECONDS))
+    opening = None
+    if any(phrase in text for phrase in ('opening script', 'scripted plays', 'first script', 'opening drive')):
+        opening = OPENING_SCRIPT_PLAYS
+    return {'windows': windows, 'opening': opening}
+
+
+def distance_bucket(distance):
+    if distance < 0:
+        return None
+    if distance <= 3:
+        return 'short'
+    if distance <= 6:
+        return 'medium'
+    return 'long'
+
+
+def field_zone(yards_to_goal):
+    """Bucket field position by yards to the opponent's goal line"""
+    if yards_to_goal < 0:
+        return None
+    if yards_to_goal <= 5:
+        return 'goal_line'
+    if yards_to_goal <= 20:
+        return 'red_zone'
+    if yards_to_goal < 50:
+        return 'opponent_territory'
+    if yards_to_goal < 90:
+        return 'own_territory'
+    return 'backed_up'
+
+
+def bitmap_from_ids(ids, size):
+    """Build an int bitmap with bit i set for every id i"""
+    buffer = bytearray((size + 7) // 8)
+    for i in ids:
+        buffer[i >> 3] |= 1 << (i & 7)
+    return int.from_bytes(buffer, 'little')
+
+
+def ids_from_bitmap(bitmap):
+    """Sorted ids of the set bits of an int bitmap"""
+    ids = []
+    data = bitmap.to_bytes((bitmap.bit_length() + 7) // 8, 'little')
+    for byte_index, byte in enumerate(data):
+        if byte:
+            base = byte_index << 3
+            for bit in range(8):
+                if byte >> bit & 1:
+                    ids.append(base + bit)
+    return ids
+
+
+def parse_situation(query):
+    """Extract facet filters ({facet: set of values}) from a situational question"""
+    text = query.lower()
+    filters = {}
+
+    for match in DOWN_PATTERN.finditer(text):
+        filters.setdefault('down', set()).add(ORDINALS[match.group(1)])
+        distance = match.group(2)
+        if distance:
+            bucket = distance if not distance.isdigit() else distance_bucket(int(distance))
+            filters.setdefault('distance', set()).add(bucket)
+    for match in DISTANCE_PATTERN.finditer(text):
+        filters.setdefault('distance', set()).add(match.group(1) or match.group(2))
+
+    for match in QUARTER_PATTERN.finditer(text):
+        filters.setdefault('quarter', set()).add(ORDINALS[match.group(1)] if match.group(1) else int(match.group(2)))
+    if 'first half' in text:
+        filters.setdefault('quarter', set()).update((1, 2))
+    if 'second half' in text:
+        filters.setdefault('quarter', set()).update((3, 4))
+    if 'overtime' in text:
+        filters.setdefault('quarter', set()).add(5)
+
+    if 'red zone' in text or 'redzone' in text:
+        filters['red_zone'] = {True}
+    for phrase, zones in ZONE_PHRASES:
+        if phrase in text:
+            filters.setdefault('field_zone', set()).update(zones)
+
+    words = set(re.findall(r"[a-z']+", text))
+    for word, category in CATEGORY_WORDS.items():
+        if (' ' in word and word in text) or word in words:
+            filters.setdefault('category', set()).add(category)
+    for word, play_types in PLAY_TYPE_WORDS.items():
+        if (' ' in word and word in text) or word in words:
+            filters.setdefault('play_type', set()).update(play_types)
+
+    opponents = {name for match in OPPONENT_PATTERN.finditer(text) for name in match.groups() if name}
+    # Matched as names, not looked up in words, which drop the digits of "49ers"
+    named = set(TEAM_PATTERN.findall(text))
+    for nickname in TEAM_ABBREVIATIONS:
+        if nickname.lower() in opponents:
+            filters.setdefault('defense', set()).add(nickname)
+        elif nickname.lower() in named:
+            filters.setdefault('offense', set()).add(nickname)
+    return filters
+
+
+def play_defenses(plays):
+    """(team names, index into them of the defense on each play, -1 if unknown).
+
+    The defense is the other team with the ball in the same game, or else
+    the other team the game's name mentions ("401671789_ravens-chiefs"),
+    for exports that only log one side's offense.
+    """
+    offenses = {}
+    for i in range(len(plays)):
+        if play_category(plays.play_types[plays.play_type[i]]) in ('pass', 'rush'):
+            offenses.setdefault(plays.game[i], set()).add(plays.teams[plays.team[i]])
+    teams = list(plays.teams.values)
+    ids = {team: team_id for team_id, team in enumerate(teams)}
+    defenses = array('h')
+    for i in range(len(plays)):
+        game = plays.game[i]
+        offense = plays.teams[plays.team[i]]
+        others = offenses.get(game, set()) - {offense}
+        if not others:
+            named = set(TEAM_PATTERN.findall(plays.games[game].lower().replace('_', ' ')))
+            others = {nickname for nickname in TEAM_ABBREVIATIONS if nickname.lower() in named} - {offense}
+        if len(others) != 1:
+            defenses.append(-1)
+            continue
+        defense = others.pop()
+        if defense not in ids:
+            ids[defense] = len(teams)
+            teams.append(defense)
+        defenses.append(ids[defense])
+    return teams, defenses
+
+
+class FacetIndex:
+    """Per-facet bitmaps over the plays of a PlayTable.
+
+    Bit i of a bitmap is set when play i has that facet value. Filters OR the
+    bitmaps of the values asked for within a facet and AND across facets, all
+    as Python big-int operations, before any text ranking happens.
+    """
+
+    def __init__(self, plays):
+        self.size = len(plays)
+        values = {facet: {} for facet in FACETS}
+        defense_teams, defenses = play_defenses(plays)
+        for i in range(self.size):
+            play_type = plays.play_types[plays.play_type[i]]
+            yards_to_goal = plays.yards_to_goal[i]
+            row = {
+                'down': plays.down[i] if plays.down[i] > 0 else None,
+                'distance': distance_bucket(plays.distance[i]) if plays.down[i] > 0 else None,
+                'quarter': plays.quarter[i],
+                'field_zone': field_zone(yards_to_goal),
+                # Field position is more reliable than the exported flag when it is known
+                'red_zone': (0 < yards_to_goal <= 20) if yards_to_goal >= 0 else bool(plays.red_zone[i]),
+                'play_type': play_type,
+                'category': play_category(play_type),
+                'offense': plays.teams[plays.team[i]],
+                'defense': defense_teams[defenses[i]] if defenses[i] >= 0 else None,
+            }
+            for facet, value in row.items():
+                if value is not None:
+                    values[facet].setdefault(value, []).append(i)
+        self.bitmaps = {facet: {value: bitmap_from_ids(ids, self.size) for value, ids in by_value.items()}
+                        for facet, by_value in values.items()}
+        self.all = (1 << self.size) - 1
+
+    def values(self, facet):
+        return sorted(self.bitmaps[facet], key=str)
+
+    def select(self, filters):
+        """Bitmap of plays matching every facet in filters"""
+        result = self.all
+        for facet, wanted in filters.items():
+            by_value = self.bitmaps.get(facet)
+            if by_value is None:
+                continue
+            # A team that never plays in this corpus doesn't narrow the search
+            if facet in ('offense', 'defense') and not any(value in by_value for value in wanted):
+                continue
+            facet_bits = 0
+            for value in wanted:
+                facet_bits |= by_value.get(value, 0)
+            result &= facet_bits
+            if not result:
+                break
+        return result
+
+    def ids(self, filters):
+        return ids_from_bitmap(self.select(filters))
+
+    def count(self, filters):
+        return bin(self.select(filters)).count('1')
+
+
+class ClockIndex:
+    """Per-game plays sorted by absolute game seconds for bisect range scans"""
+
+    def __init__(self, plays):
+        by_game = {}
+        for i in range(len(plays)):
+            by_game.setdefault(plays.games[plays.game[i]], []).append((plays.game_seconds[i], i))
+        self.seconds = {}
+        self.play_ids = {}
+        for game, entries in by_game.items():
+            entries.sort()
+            self.seconds[game] = array('h', (seconds for seconds, _ in entries))
+            self.play_ids[game] = array('I', (i for _, i in entries))
+        # Snap plays (pass or rush) in game order, for opening scripts
+        self.snaps = {game: [i for i in ids if play_category(plays.play_types[plays.play_type[i]]) in ('pass', 'rush')]
+                      for game, ids in self.play_ids.items()}
+
+    def games(self):
+        return list(self.seconds)
+
+    def window(self, start, end, games=None):
+        """Play ids with start <= game seconds <= end, grouped by game in time order"""
+        result = []
+        for game in games or self.seconds:
+            seconds = self.seconds.get(game)
+            if seconds is None:
+                continue
+            result.extend(self.play_ids[game][bisect_left(seconds, start):bisect_right(seconds, end)])
+        return result
+
+    def opening(self, count=OPENING_SCRIPT_PLAYS, games=None):
+        """The first count snaps of each game"""
+        result = []
+        for game in games or self.snaps:
+            result.extend(self.snaps.get(game, [])[:count])
+        return result
+
+    def select(self, time_filter, games=None):
+        """Play ids matching a parse_time_window() result, or None when it asks for no window"""
+        if not time_filter['windows'] and not time_filter['opening']:
+            return None
+        selected = set()
+        for start, end in time_filter['windows']:
+            selected.update(self.window(start, end, games))
+        if time_filter['opening']:
+            selected.update(self.opening(time_filter['opening'], games))
+        return selected
+
+
+def load_player_aliases(path=None):
+    """Lowercase alias -> export name pairs from the aliases file ($PLAYER_ALIASES_FILE, '0' for none)"""
+    path = path or os.getenv('PLAYER_ALIASES_FILE', PLAYER_ALIASES_FILE)
+    if path == '0' or not os.path.exists(path):
+        return {}
+    try:
+        with open(path, encoding='utf-8') as file:
+            return {' '.join(alias.lower().split()): name for alias, name in json.load(file).items()}
+    except (OSError, ValueError, AttributeError) as e:
+        print(f"Ignoring player aliases file {path}: {str(e)}")
+        return {}
+
+
+def trigrams(word):
+    padded = f"  {word} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+class PlayerIndex:
+    """Player entities with alias lookup and per-role posting lists of play ids.
+
+    The canonical id of a player is their abbreviated export name
+    ("L.Jackson"). Lookups accept that form, the surname, "first last" when
+    the first initial matches, nicknames from the aliases file (see
+    load_player_aliases()) for players in the plays, and misspelled surnames
+    through trigram similarity.
+    """
+
+    def __init__(self, plays, aliases=None):
+        self.names = []
+        self.ids = {}
+        # role -> player id -> play ids
+        self.postings = {role: {} for role in ROLES}
+        for i in range(len(plays)):
+            for name, role in player_roles(plays.text[i]):
+                player_id = self.ids.get(name)
+                if player_id is None:
+                    player_id = self.ids[name] = len(self.names)
+                    self.names.append(name)
+                posting = self.postings[role].get(player_id)
+                if posting is None:
+                    posting = self.postings[role][player_id] = array('I')
+                posting.append(i)
+
+        # Lowercase alias -> player ids
+        self.aliases = {}
+        self.trigrams = {}
+        for player_id, name in enumerate(self.names):
+            initial, surname = name.lower().split('.', 1)
+            for alias in (name.lower(), surname, f"{initial} {surname}", f"{initial}{surname}"):
+                self.aliases.setdefault(alias, []).append(player_id)
+            for trigram in trigrams(surname):
+                self.trigrams.setdefault(trigram, set()).add(player_id)
+        # Nicknames of players in these plays; they match even as lowercase words
+        self.nicknames = set()
+        for alias, name in (load_player_aliases() if aliases is None else aliases).items():
+            if name in self.ids:
+                self.aliases[alias] = [self.ids[name]]
+                self.nicknames.add(alias)
+
+    def play_count(self, player_id, role=None):
+        roles = [role] if role else ROLES
+        return sum(len(self.postings[r].get(player_id, ())) for r in roles)
+
+    def _best(self, player_ids):
+        # An ambiguous surname resolves to the most involved player
+        return max(player_ids, key=self.play_count)
+
+    def lookup(self, name, fuzzy=True):
+        """Canonical name for a typed player name, or None"""
+        key = ' '.join(name.lower().replace('.', '. ').split()).replace('. ', '.')
+        player_ids = self.aliases.get(key) or self.aliases.get(key.replace('.', ''))
+        if not player_ids and ' ' in key:
+            first, surname = key.split(' ', 1)[0], key.rsplit(' ', 1)[1]
+            candidates = self.aliases.get(surname, [])
+            player_ids = [pid for pid in candidates if self.names[pid].lower().startswith(first[0])] or None
+        if not player_ids and fuzzy and len(key) >= 4:
+            surname = key.rsplit(' ', 1)[-1]
+            wanted = trigrams(surname)
+            overlap = {}
+            for trigram in wanted:
+                for player_id in self.trigrams.get(trigram, ()):
+                    overlap[player_id] = overlap.get(player_id, 0) + 1
+            scored = []
+            for player_id, shared in overlap.items():
+                candidate = trigrams(self.names[player_id].lower().split('.', 1)[1])
+                similarity = shared / len(wanted | candidate)
+                if similarity >= 0.5:
+                    scored.append((similarity, player_id))
+            if scored:
+                best = max(similarity for similarity, _ in scored)
+                player_ids = [player_id for similarity, player_id in scored if similarity == best]
+        return self.names[self._best(player_ids)] if player_ids else None
+
+    def resolve(self, text):
+        """Players mentioned in free text, in order of mention.
+
+        Lowercase words only match offensive skill players ("flowers"), and
+        fuzzy surname matching is only tried on capitalized words, so ordinary
+        vocabulary ("key plays") isn't read as a defender's name.
+        """
+        words = re.findall(r"[A-Za-z][A-Za-z.'\-]*", text)
+        found = []
+        i = 0
+        while i < len(words):
+            match = None
+            # "First Last" only when the first word looks like a name, so "about Jackson" isn't A.Jackson
+            if i + 1 < len(words) and words[i][:1].isupper() and words[i].lower() not in STOPWORDS:
+                match = self.lookup(f"{words[i]} {words[i + 1]}", fuzzy=False)
+                if match:
+                    i += 1
+            if not match:
+                word = words[i].rstrip('.')
+                match = self.lookup(word, fuzzy=False)
+                if match and not word[:1].isupper() and '.' not in word and word.lower() not in self.nicknames:
+                    player_id = self.ids[match]
+                    if not any(self.postings[role].get(player_id) for role in ('passer', 'rusher', 'target')):
+                        match = None
+                if not match and word[:1].isupper() and len(word) >= 4:
+                    match = self.lookup(word)
+            if match and match not in found:
+                found.append(match)
+            i += 1
+        return found
+
+    def plays(self, name, role=None):
+        """Sorted play ids for a player, optionally in one role"""
+        player_id = self.ids.get(name)
+        if player_id is None:
+            return []
+        if role:
+            return list(self.postings[role].get(player_id, ()))
+        play_ids = set()
+        for by_player in self.postings.values():
+            play_ids.update(by_player.get(player_id, ()))
+        return sorted(play_ids)
+
+    def top(self, role, count=5):
+        """Most involved players in a role as (name, play count)"""
+        ranked = sorted(self.postings[role].items(), key=lambda item: -len(item[1]))
+        return [(self.names[player_id], len(play_ids)) for player_id, play_ids in ranked[:count]]
@@ -0,0 +1,411 @@
+import re
+from array import array
+
+# Team nickname -> abbreviation used in the "at XXX 32" field position
+TEAM_ABBREVIATIONS = {
+    'Cardinals': 'ARI', 'Falcons': 'ATL', 'Ravens': 'BAL', 'Bills': 'BUF',
+    'Panthers': 'CAR', 'Bears': 'CHI', 'Bengals': 'CIN', 'Browns': 'CLE',
+    'Cowboys': 'DAL', 'Broncos': 'DEN', 'Lions': 'DET', 'Packers': 'GB',
+    'Texans': 'HOU', 'Colts': 'IND', 'Jaguars': 'JAX', 'Chiefs': 'KC',
+    'Raiders': 'LV', 'Chargers': 'LAC', 'Rams': 'LAR', 'Dolphins': 'MIA',
+    'Vikings': 'MIN', 'Patriots': 'NE', 'Saints': 'NO', 'Giants': 'NYG',
+    'Jets': 'NYJ', 'Eagles': 'PHI', 'Steelers': 'PIT', '49ers': 'SF',
+    'Seahawks': 'SEA', 'Buccaneers': 'TB', 'Titans': 'TEN', 'Commanders': 'WSH',
+}
+
+# Alternate abbreviations that show up inside play descriptions
+ABBREVIATION_ALIASES = {
+    'BLT': 'BAL', 'CLV': 'CLE', 'HST': 'HOU', 'ARZ': 'ARI', 'WAS': 'WSH',
+    'JAC': 'JAX', 'LA': 'LAR', 'SD': 'LAC', 'OAK': 'LV',
+}
+
+# Broad category for each play type label
+PASS_TYPES = {'Pass Reception', 'Pass Incompletion', 'Passing Touchdown', 'Sack',
+              'Pass Interception Return', 'Interception Return Touchdown'}
+RUSH_TYPES = {'Rush', 'Rushing Touchdown'}
+SPECIAL_TEAMS_TYPES = {'Kickoff', 'Kickoff Return (Offense)', 'Kickoff Return Touchdown', 'Punt',
+                       'Field Goal Good', 'Field Goal Missed', 'Blocked Punt', 'Blocked Field Goal',
+                       'Extra Point Good', 'Extra Point Missed'}
+ADMIN_TYPES = {'Official Timeout', 'Timeout', 'Two-minute warning', 'End Period', 'End of Half',
+               'End of Game'}
+
+QUARTER_SECONDS = 15 * 60
+OVERTIME_SECONDS = 10 * 60
+
+# Start of a play record: "Q1 | 14:19 | "
+RECORD_START = re.compile(r'Q(\d) \| (\d{1,2}):(\d{2}) \| ')
+SITUATION = re.compile(r'(\d)(?:st|nd|rd|th) & (\d+|Goal) at (?:([A-Z]{2,3}) )?(\d+)')
+# Longest record prefix ("Q1 | 14:19 | ") a page break can cut in two
+RECORD_PREFIX_CHARS = 13
+RESULT = re.compile(r'(Complete|Incomplete) play, (not in|in) red zone, (-?\d+) yards? gained')
+# Air yards, when the source records them (structured exports append ", 12 air yards" to the result)
+AIR_YARDS = re.compile(r', (-?\d+) air yards')
+# Depth and direction of a pass attempt: "pass short right to", "pass incomplete deep middle"
+PASS_DETAIL = re.compile(r'\bpass (?:incomplete )?(short|deep)?\s?(left|middle|right)?\b')
+PASS_DEPTHS = ('short', 'deep')
+PASS_DIRECTIONS = ('left', 'middle', 'right')
+# air_yards value of a pass whose air yards the record doesn't give
+NO_AIR_YARDS = -128
+# Abbreviated player names: "L.Jackson", "Ja.Watson", "B.St-Juste". A name directly
+# followed by exactly three dots was cut off by the export ("J.Sto...") and is skipped.
+PLAYER_NAME = re.compile(r"(?<![A-Za-z])([A-Z][a-z]{0,2}\.[A-Z][A-Za-z'\-]*[A-Za-z])(?![A-Za-z'\-]|\.\.\.(?!\.))")
+
+
+def game_seconds(quarter, clock):
+    """Seconds elapsed since kickoff for a play at (quarter, seconds left in quarter)"""
+    if quarter <= 4:
+        return (quarter - 1) * QUARTER_SECONDS + QUARTER_SECONDS - clock
+    return 4 * QUARTER_SECONDS + (quarter - 5) * OVERTIME_SECONDS + max(OVERTIME_SECONDS - clock, 0)
+
+
+NAME = r"[A-Z][a-z]{0,2}\.[A-Z][A-Za-z'\-]*[A-Za-z]"
+PASSER = re.compile(rf"({NAME}) (?:pass\b|sacked\b|spiked\b)")
+TARGET = re.compile(rf"\bpass (?:incomplete )?(?:(?:short|deep) )?(?:(?:left|middle|right) )?(?:intended for |to )({NAME})")
+RUSHER = re.compile(rf"({NAME}) (?:left end|left tackle|left guard|right end|right tackle|right guard|up the middle|"
+                    rf"scrambles|kneels|rushes|to [A-Z]|for -?\d|ran ob|pushed ob)")
+KICKER = re.compile(rf"({NAME}) (?:kicks|punts|\d+ yard field goal|extra point)")
+DEFENDERS = re.compile(r"[(\[]([^)\]]*)[)\]]")
+
+
+def player_roles(text):
+    """(player, role) pairs for a play record: passer, target, rusher, tackler, kicker or other"""
+    description = ' | '.join(text.split(' | ')[4:-1]) or text
+    play_type = description.split(':', 1)[0] if ':' in description else ''
+    roles = {}
+    for match in PASSER.finditer(description):
+        roles.setdefault(match.group(1), 'passer')
+    for match in TARGET.finditer(description):
+        roles.setdefault(match.group(1), 'target')
+    if play_type in RUSH_TYPES or 'scrambles' in description:
+        for match in RUSHER.finditer(description):
+            roles.setdefault(match.group(1), 'rusher')
+            break
+    for match in KICKER.finditer(description):
+        roles.setdefault(match.group(1), 'kicker')
+    for match in DEFENDERS.finditer(description):
+        for name in PLAYER_NAME.findall(match.group(1)):
+            roles.setdefault(name, 'tackler')
+    for name in PLAYER_NAME.findall(description):
+        roles.setdefault(name, 'other')
+    return list(roles.items())
+
+
+def normalize_abbreviation(abbreviation):
+    """Map description-style abbreviations (BLT, CLV) to field-position ones (BAL, CLE)"""
+    return ABBREVIATION_ALIASES.get(abbreviation, abbreviation)
+
+
+def play_category(play_type):
+    """Collapse a play type label into pass / rush / special_teams / admin / other"""
+    if play_type in PASS_TYPES:
+        return 'pass'
+    if play_type in RUSH_TYPES:
+        return 'rush'
+    if play_type in SPECIAL_TEAMS_TYPES:
+        return 'special_teams'
+    if play_type in ADMIN_TYPES:
+        return 'admin'
+    return 'other'
+
+
+class StringTable:
+    """Interned strings stored once and referenced by integer id"""
+
+    def __init__(self, values=None):
+        self.values = []
+        self.ids = {}
+        for value in values or []:
+            self.intern(value)
+
+    def intern(self, value):
+        string_id = self.ids.get(value)
+        if string_id is None:
+            string_id = len(self.values)
+            self.ids[value] = string_id
+            self.values.append(value)
+        return string_id
+
+    def __getitem__(self, string_id):
+        return self.values[string_id]
+
+    def __len__(self):
+        return len(self.values)
+
+
+class PlayTable:
+    """Columnar table of parsed plays backed by typed arrays.
+
+    Categorical columns (game, team, field side, play type, players) hold ids
+    into shared StringTables. Players are stored CSR-style: the players of play
+    i are player_ids[player_offsets[i]:player_offsets[i + 1]]. Numeric columns
+    use -1 where the record has no value (e.g. kickoffs have no down); pass
+    depth and direction index PASS_DEPTHS and PASS_DIRECTIONS, and air_yards
+    is NO_AIR_YARDS unless the record gives it.
+    """
+
+    NUMERIC_COLUMNS = {
+        'game': 'H',
+        'quarter': 'b',
+        'clock': 'h',
+        'game_seconds': 'h',
+        'team': 'H',
+        'down': 'b',
+        'distance': 'b',
+        'goal_to_go': 'b',
+        'field_side': 'H',
+        'yard_line': 'b',
+        'yards_to_goal': 'b',
+        'play_type': 'H',
+        'yards': 'h',
+        'red_zone': 'b',
+        'complete': 'b',
+        'pass_depth': 'b',
+        'pass_direction': 'b',
+        'air_yards': 'b',
+    }
+
+    def __init__(self):
+        for name, typecode in self.NUMERIC_COLUMNS.items():
+            setattr(self, name, array(typecode))
+        self.player_offsets = array('I', [0])
+        self.player_ids = array('I')
+        self.text = []
+        self.games = StringTable()
+        self.teams = StringTable()
+        self.field_sides = StringTable([''])
+        self.play_types = StringTable()
+        self.players = StringTable()
+
+    def __len__(self):
+        return len(self.quarter)
+
+    def append(self, game, quarter, clock, game_seconds, team, down, distance, goal_to_go, field_side, yard_line,
+               yards_to_goal, play_type, yards, red_zone, complete, players, text, pass_depth=-1, pass_direction=-1,
+               air_yards=NO_AIR_YARDS):
+        """Append one play; string fields are interned"""
+        self.game.append(self.games.intern(game))
+        self.quarter.append(quarter)
+        self.clock.append(clock)
+        self.game_seconds.append(game_seconds)
+        self.team.append(self.teams.intern(team))
+        self.down.append(down)
+        self.distance.append(distance)
+        self.goal_to_go.append(goal_to_go)
+        self.field_side.append(self.field_sides.intern(field_side))
+        self.yard_line.append(yard_line)
+        self.yards_to_goal.append(yards_to_goal)
+        self.play_type.append(self.play_types.intern(play_type))
+        self.yards.append(yards)
+        self.red_zone.append(red_zone)
+        self.complete.append(complete)
+        self.pass_depth.append(pass_depth)
+        self.pass_direction.append(pass_direction)
+        self.air_yards.append(air_yards)
+        self.player_ids.extend(self.players.intern(player) for player in players)
+        self.player_offsets.append(len(self.player_ids))
+        self.text.append(text)
+
+    def players_for(self, i):
+        """Player names involved in play i, in order of appearance"""
+        start, end = self.player_offsets[i], self.player_offsets[i + 1]
+        return [self.players[player_id] for player_id in self.player_ids[start:end]]
+
+    def row(self, i):
+        """Materialize play i as a dict"""
+        return {
+            'game': self.games[self.game[i]],
+            'quarter': self.quarter[i],
+            'clock': self.clock[i],
+            'game_seconds': self.game_seconds[i],
+            'team': self.teams[self.team[i]],
+            'down': self.down[i],
+            'distance': self.distance[i],
+            'goal_to_go': bool(self.goal_to_go[i]),
+            'field_side': self.field_sides[self.field_side[i]],
+            'yard_line': self.yard_line[i],
+            'yards_to_goal': self.yards_to_goal[i],
+            'play_type': self.play_types[self.play_type[i]],
+            'yards': self.yards[i],
+            'red_zone': bool(self.red_zone[i]),
+            'complete': bool(self.complete[i]),
+            'pass_depth': PASS_DEPTHS[self.pass_depth[i]] if self.pass_depth[i] >= 0 else None,
+            'pass_direction': PASS_DIRECTIONS[self.pass_direction[i]] if self.pass_direction[i] >= 0 else None,
+            'air_yards': self.air_yards[i] if self.air_yards[i] != NO_AIR_YARDS else None,
+            'players': self.players_for(i),
+            'text': self.text[i],
+        }
+
+    def extend(self, other, start=0, end=None):
+        """Append plays start..end (default: all) of another table, re-interning its strings"""
+        end = len(other) if end is None else end
+        remaps = {}
+        for column, strings in (('game', 'games'), ('team', 'teams'), ('field_side', 'field_sides'),
+                                ('play_type', 'play_types')):
+            table = getattr(self, strings)
+            remaps[column] = [table.intern(value) for value in getattr(other, strings).values]
+        for name in self.NUMERIC_COLUMNS:
+            values = getattr(other, name)[start:end]
+            if name in remaps:
+                remap = remaps[name]
+                getattr(self, name).extend(remap[value] for value in values)
+            else:
+                getattr(self, name).extend(values)
+        player_remap = [self.players.intern(value) for value in other.players.values]
+        base = len(self.player_ids) - other.player_offsets[start]
+        first, last = other.player_offsets[start], other.player_offsets[end]
+        self.player_ids.extend(player_remap[player_id] for player_id in other.player_ids[first:last])
+        self.player_offsets.extend(base + offset for offset in other.player_offsets[start + 1:end + 1])
+        self.text.extend(other.text[start:end])
+
+    @classmethod
+    def concat(cls, tables):
+        """Combine several tables (e.g. one per game) into one"""
+        combined = cls()
+        for table in tables:
+            combined.extend(table)
+        return combined
+
+    def nbytes(self):
+        """Approximate memory held by the columns and play text"""
+        total = sum(getattr(self, name).buffer_info()[1] * getattr(self, name).itemsize
+                    for name in self.NUMERIC_COLUMNS)
+        total += (len(self.player_offsets) + len(self.player_ids)) * 4
+        total += sum(len(text) for text in self.text)
+        return total
+
+
+def split_records(text):
+    """Split extracted text into play records.
+
+    Records are located by their "Q# | mm:ss | " prefix rather than by page or
+    paragraph, so a record PyPDF2 split across a page break ("Touchback to" /
+    "the BLT 30") is rejoined once whitespace is collapsed. Text before the
+    first record is returned separately.
+    """
+    text = ' '.join(text.split())
+    starts = [match.start() for match in RECORD_START.finditer(text)]
+    if not starts:
+        return text, []
+    records = [text[start:end].strip() for start, end in zip(starts, starts[1:] + [len(text)])]
+    return text[:starts[0]].strip(), records
+
+
+def iter_records(pages):
+    """Stream page texts into ('play', record) and ('preamble', text) chunks.
+
+    Only the last, possibly unfinished record is carried from one page to the
+    next, so a record split across a page break is rejoined exactly as
+    split_records() would rejoin it, without ever holding the whole document.
+    Text before the first record comes out as one preamble chunk per page.
+    """
+    carry = ''
+    in_records = False
+    for page in pages:
+        text = ' '.join(page.split())
+        if not text:
+            continue
+        buffer = f"{carry} {text}" if carry else text
+        starts = [match.start() for match in RECORD_START.finditer(buffer)]
+        if not starts:
+            if in_records:
+                # One record running over the whole page
+                carry = buffer
+                continue
+            # Hold back a "Q" near the end in case the page break cut a record prefix
+            tail = buffer.rfind('Q', max(0, len(buffer) - RECORD_PREFIX_CHARS))
+            if tail == -1:
+                tail = len(buffer)
+            if buffer[:tail].strip():
+                yield 'preamble', buffer[:tail].strip()
+            carry = buffer[tail:]
+            continue
+        if starts[0] > 0 and buffer[:starts[0]].strip():
+            yield 'preamble', buffer[:starts[0]].strip()
+        for start, end in zip(starts, starts[1:]):
+            yield 'play', buffer[start:end].strip()
+        carry = buffer[starts[-1]:]
+        in_records = True
+    if carry.strip():
+        yield ('play' if in_records else 'preamble'), carry.strip()
+
+
+def parse_record(record):
+    """Parse one pipe-delimited play record into a dict of fields, or None if malformed"""
+    parts = record.split(' | ')
+    if len(parts) < 6:
+        return None
+    quarter_part, clock_part, team, situation = parts[:4]
+    description = ' | '.join(parts[4:-1])
+    result = parts[-1]
+
+    minutes, seconds = clock_part.split(':')
+    quarter = int(quarter_part[1:])
+    clock = int(minutes) * 60 + int(seconds)
+    fields = {
+        'quarter': quarter,
+        'clock': clock,
+        'game_seconds': game_seconds(quarter, clock),
+        'team': team.strip(),
+        'down': -1,
+        'distance': -1,
+        'goal_to_go': 0,
+        'field_side': '',
+        'yard_line': -1,
+        'yards_to_goal': -1,
+        'play_type': description.split(':', 1)[0].strip() if ':' in description else 'Unknown',
+        'yards': 0,
+        'red_zone': 0,
+        'complete': 0,
+        'pass_depth': -1,
+        'pass_direction': -1,
+        'air_yards': NO_AIR_YARDS,
+        'players': list(dict.fromkeys(PLAYER_NAME.findall(description))),
+        'text': record,
+    }
+
+    match = SITUATION.search(situation)
+    if match:
+        down, distance, side, yard_line = match.groups()
+        fields['down'] = int(down)
+        fields['yard_line'] = int(yard_line)
+        fields['field_side'] = normalize_abbreviation(side) if side else ''
+        if distance == 'Goal':
+            fields['goal_to_go'] = 1
+            distance = yard_line
+        fields['distance'] = min(int(distance), 99)
+        offense = TEAM_ABBREVIATIONS.get(fields['team'])
+        if not side:
+            fields['yards_to_goal'] = fields['yard_line']
+        elif offense:
+            own_side = fields['field_side'] == offense
+            fields['yards_to_goal'] = 100 - fields['yard_line'] if own_side else fields['yard_line']
+
+    match = RESULT.search(result)
+    if match:
+        completion, zone, yards = match.groups()
+        fields['complete'] = int(completion == 'Complete')
+        fields['red_zone'] = int(zone == 'in')
+        fields['yards'] = int(yards)
+
+    # Depth and direction are read off pass attempts only; a sack never got the ball out
+    if play_category(fields['play_type']) == 'pass' and fields['play_type'] != 'Sack':
+        match = PASS_DETAIL.search(description)
+        if match:
+            depth, direction = match.groups()
+            fields['pass_depth'] = PASS_DEPTHS.index(depth) if depth else -1
+            fields['pass_direction'] = PASS_DIRECTIONS.index(direction) if direction else -1
+        match = AIR_YARDS.search(result)
+        if match:
+            fields['air_yards'] = max(min(int(match.group(1)), 127), -127)
+    return fields
+
+
+def parse_plays(text, game='', table=None):
+    """Parse every play record in a document's text into a PlayTable"""
+    table = table if table is not None else PlayTable()
+    _, records = split_records(text)
+    for record in records:
+        fields = parse_record(record)
+        if fields:
+            table.append(game=game, **fields)
+    return table
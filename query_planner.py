@@ -0,0 +1,100 @@
+import re
+from play_index import parse_situation, parse_time_window
+from stats_engine import parse_stats_query, parse_target_query
+from corpus_index import choose_granularity
+
+INTENTS = ('small_talk', 'scheduling', 'stat', 'lookup', 'scouting')
+
+# Greetings and introductions; as whole words, so "this" or "which" is not "hi"
+GREETING = re.compile(r"^\W*(hi|hello|hey|good (?:morning|afternoon|evening))\b|\b(i am|i'm|my name is|this is)\b")
+# Courtesies that need a polite reply, not a search
+COURTESY = re.compile(r"^\W*(thanks|thank you|thx|cheers|ok(?:ay)?|great|cool|got it|bye|goodbye)\b\W*$")
+# Wording that asks for a call on its own ("I'd like this scheduled", "a booking for Thursday")
+SCHEDULING_TERMS = re.compile(r'\b(schedul\w*|book\w*|consult\w*|meetings?|appointments?)\b')
+# Wording that only asks for a call next to a time ("a call tomorrow at 3pm")
+SCHEDULING_HINTS = re.compile(r'\b(tomorrow|next|calls?)\b')
+TIME_OF_DAY = re.compile(r'\b\d{1,2}(?::\d{2})?\s*(?:am|pm)\b|\b\d{1,2}:\d{2}\b')
+# Wording that asks to see plays rather than to have them counted or explained
+LOOKUP_TERMS = re.compile(r'\b(show|list|find|pull up|give me|which plays|what plays|drive chart|'
+                          r'play[- ]by[- ]play)\b')
+# Wording that asks for judgement, so the model writes the answer even when exact figures are available
+NARRATIVE_TERMS = re.compile(r'\b(why|explain|describe|summar\w*|scout\w*|strateg\w*|approach|attack|game ?plan|'
+                             r'insights?|analy[sz]\w*|compare|comparison|exploit|defend|identity|patterns?|trends?|'
+                             r'tendenc(?:y|ies)|key|should|how (?:do|does|did|would|can))\b')
+# Situational slots a lookup needs at least one of, so it never lists the whole corpus
+SITUATION_SLOTS = ('down', 'distance', 'quarter', 'red_zone', 'field_zone', 'category', 'play_type')
+# Plays a lookup answer lists before it stops
+LOOKUP_PLAY_LIMIT = 25
+
+
+class QueryPlan:
+    """What a chat message asks for and the steps that answer it.
+
+    Steps run in order: 'greet' or 'reply' (canned small talk), 'schedule',
+    'stats' (vectorized aggregates), 'lookup' (plays from the facet, clock
+    and player indexes), 'drive_chart', 'retrieve' (ranked document context)
+    and 'llm'. A plan without 'llm' is answered from the indexes alone; the
+    steps after 'schedule' are the fallback when no call gets booked.
+    """
+
+    __slots__ = ('query', 'intent', 'slots', 'filters', 'granularity', 'steps')
+
+    def __init__(self, query, intent, slots, filters, granularity, steps):
+        self.query = query
+        self.intent = intent
+        # team, opponent, player, down and quarter values the message names
+        self.slots = slots
+        # Facet filters as from parse_situation, for the stats engine
+        self.filters = filters
+        self.granularity = granularity
+        self.steps = steps
+
+    def needs_llm(self):
+        return 'llm' in self.steps
+
+    def describe(self):
+        slots = "; ".join(f"{name}={','.join(map(str, values))}" for name, values in self.slots.items() if values)
+        return f"{self.intent} [{' -> '.join(self.steps)}]" + (f" ({slots})" if slots else "")
+
+
+def extract_slots(query, players=None):
+    """(slots, facet filters) of a message: the teams, opponents, players, downs and quarters it names"""
+    filters = parse_situation(query)
+    slots = {
+        'team': sorted(filters.get('offense', ())),
+        'opponent': sorted(filters.get('defense', ())),
+        'player': players.resolve(query) if players is not None else [],
+        'down': sorted(filters.get('down', ())),
+        'quarter': sorted(filters.get('quarter', ())),
+    }
+    return slots, filters
+
+
+def plan_query(query, players=None):
+    """Classify a chat message and plan the cheapest steps that answer it"""
+    text = query.lower()
+    slots, filters = extract_slots(query, players)
+    granularity = choose_granularity(query)
+    window = parse_time_window(query)
+    football = (any(slots.values()) or any(facet in filters for facet in SITUATION_SLOTS)
+                or bool(window['windows'] or window['opening']))
+    narrative = bool(NARRATIVE_TERMS.search(text))
+    counted = parse_target_query(query) is not None or parse_stats_query(query) is not None
+
+    # Booking comes first even when the call is about football; if nothing gets booked, the message
+    # is answered like any other question
+    if SCHEDULING_TERMS.search(text) or (SCHEDULING_HINTS.search(text) and TIME_OF_DAY.search(text)):
+        steps = ['schedule'] + (['stats'] if counted else []) + (['retrieve'] if football or counted else [])
+        return QueryPlan(query, 'scheduling', slots, filters, granularity, steps + ['llm'])
+    if GREETING.search(text) and not football and not counted and not narrative:
+        return QueryPlan(query, 'small_talk', slots, filters, granularity, ['greet'])
+    if COURTESY.search(text):
+        return QueryPlan(query, 'small_talk', slots, filters, granularity, ['reply'])
+    # Drive questions are counted on the drive chart, which the stats engine does not aggregate
+    if counted and not narrative and granularity != 'drive':
+        return QueryPlan(query, 'stat', slots, filters, granularity, ['stats'])
+    if LOOKUP_TERMS.search(text) and not narrative and (football or granularity == 'drive'):
+        steps = ['drive_chart'] if granularity == 'drive' else ['lookup']
+        return QueryPlan(query, 'lookup', slots, filters, granularity, steps)
+    steps = (['stats'] if counted else []) + ['retrieve'] + (['drive_chart'] if granularity == 'drive' else [])
+    return QueryPlan(query, 'scouting', slots, filters, granularity, steps + ['llm'])
@@ -0,0 +1,424 @@
+import os
+import json
+import time
+import numpy as np
+from stats_engine import CATEGORIES, PLAYER_DIMENSIONS, EXPLOSIVE_YARDS
+from drive_table import RESULTS, SCORING_RESULTS, format_clock
+from play_parser import NO_AIR_YARDS
+
+REPORT_VERSION = 1
+# Players listed per role in a team report
+TOP_PLAYERS = 3
+# Drives with a snap this close to the goal count as red zone trips
+RED_ZONE_YARDS = 20
+SNAP_CODES = (CATEGORIES.index('pass'), CATEGORIES.index('rush'))
+
+
+def merge_counts(total, counts):
+    """Add one summary's counters into a running total: numbers sum, dicts merge, lists add per element"""
+    for key, value in counts.items():
+        if isinstance(value, dict):
+            merge_counts(total.setdefault(key, {}), value)
+        elif isinstance(value, list):
+            current = total.setdefault(key, [0] * len(value))
+            total[key] = [a + b for a, b in zip(current, value)]
+        elif isinstance(value, (int, float)) and not isinstance(value, bool):
+            total[key] = total.get(key, 0) + value
+        else:
+            total.setdefault(key, value)
+    return total
+
+
+def rate(numerator, denominator, digits=3):
+    return round(numerator / denominator, digits) if denominator else None
+
+
+def team_counts(stats, plays, drives, drive_ids):
+    """Counters of one offense's snaps (play ids) and drives in one game"""
+    category = stats.category[plays]
+    yards = stats.yards[plays]
+    down = stats.down[plays]
+    touchdown = stats.touchdown[plays]
+    passes = category == CATEGORIES.index('pass')
+    rushes = category == CATEGORIES.index('rush')
+    third = down == 3
+    red_zone = stats.codes['red_zone'][plays] > 0
+    play_types = stats.labels['play_type']
+    play_type = stats.codes['play_type'][plays]
+    counts = {
+        'games': 1,
+        'plays': int(len(plays)),
+        'passes': int(passes.sum()),
+        'rushes': int(rushes.sum()),
+        'pass_yards': int(yards[passes].sum()),
+        'rush_yards': int(yards[rushes].sum()),
+        'judged': int((down > 0).sum()),
+        'successes': int(stats.success[plays].sum()),
+        'explosives': int(stats.explosive[plays].sum()),
+        'touchdowns': int(touchdown.sum()),
+        'sacks': int(sum((play_type == play_types.index(name)).sum()
+                         for name in ('Sack',) if name in play_types)),
+        'interceptions': int(sum((play_type == play_types.index(name)).sum()
+                                 for name in ('Pass Interception Return', 'Interception Return Touchdown')
+                                 if name in play_types)),
+        'deep_passes': int((stats.codes['pass_depth'][plays] == 1).sum()),
+        'third_downs': int(third.sum()),
+        'third_down_conversions': int((third & ((yards >= stats.distance_to_go[plays]) | touchdown)).sum()),
+        'red_zone_plays': int(red_zone.sum()),
+        'red_zone_passes': int((red_zone & passes).sum()),
+        'plays_by_down': np.bincount(down[down > 0], minlength=5)[1:5].tolist(),
+        'passes_by_down': np.bincount(down[(down > 0) & passes], minlength=5)[1:5].tolist(),
+        'drives': len(drive_ids),
+        'drive_plays': sum(drives.plays[i] for i in drive_ids),
+        'drive_yards': sum(drives.yards[i] for i in drive_ids),
+        'drive_seconds': sum(drives.seconds[i] for i in drive_ids),
+        'red_zone_trips': 0,
+        'red_zone_trip_touchdowns': 0,
+        'drive_results': {},
+    }
+    for i in drive_ids:
+        result = RESULTS[drives.result[i]]
+        counts['drive_results'][result] = counts['drive_results'].get(result, 0) + 1
+        # A trip needs a snap inside the 20; a long touchdown from outside it is not one
+        start, end = drives.play_start[i], drives.play_end[i]
+        spots = [drives.source.yards_to_goal[j] for j in range(start, end)
+                 if stats.category[j] in SNAP_CODES and drives.source.yards_to_goal[j] >= 0]
+        if spots and min(spots) <= RED_ZONE_YARDS:
+            counts['red_zone_trips'] += 1
+            counts['red_zone_trip_touchdowns'] += result == 'Touchdown'
+    return counts
+
+
+def player_counts(stats, plays):
+    """Counters of every player in some plays, by role, as {name: {'team', 'games', role counters}}"""
+    players = {}
+    offense = stats.codes['offense'][plays]
+    yards = stats.yards[plays]
+    touchdown = stats.touchdown[plays]
+    catch = stats.catch[plays]
+    attempt = stats.attempt[plays]
+    direction = stats.codes['pass_direction'][plays]
+    deep = stats.codes['pass_depth'][plays] == 1
+    air_yards = stats.air_yards[plays]
+    air_known = air_yards != NO_AIR_YARDS
+    play_types = stats.labels['play_type']
+    intercepted = np.isin(stats.codes['play_type'][plays],
+                          [play_types.index(name) for name in ('Pass Interception Return', 'Interception Return Touchdown')
+                           if name in play_types])
+    sacked = stats.codes['play_type'][plays] == (play_types.index('Sack') if 'Sack' in play_types else -1)
+    rush = stats.category[plays] == CATEGORIES.index('rush')
+    for role in PLAYER_DIMENSIONS:
+        codes = stats.codes[role][plays]
+        if role == 'passer':
+            # Sacks name the passer too; they are not attempts
+            role_plays = codes >= 0
+            columns = {
+                'dropbacks': role_plays,
+                'attempts': role_plays & attempt,
+                'completions': role_plays & catch,
+                'pass_yards': np.where(role_plays & attempt, yards, 0),
+                'pass_touchdowns': role_plays & catch & touchdown,
+                'interceptions': role_plays & intercepted,
+                'sacks': role_plays & sacked,
+                'deep_attempts': role_plays & attempt & deep,
+            }
+        elif role == 'rusher':
+            role_plays = (codes >= 0) & rush
+            columns = {
+                'carries': role_plays,
+                'rush_yards': np.where(role_plays, yards, 0),
+                'rush_touchdowns': role_plays & touchdown,
+                'explosive_runs': role_plays & (yards >= EXPLOSIVE_YARDS['rush']),
+                'rush_successes': role_plays & stats.success[plays],
+            }
+        else:
+            role_plays = (codes >= 0) & attempt
+            columns = {
+                'targets': role_plays,
+                'catches': role_plays & catch,
+                'receiving_yards': np.where(role_plays, yards, 0),
+                'receiving_touchdowns': role_plays & catch & touchdown,
+                'deep_targets': role_plays & deep,
+                'targets_left': role_plays & (direction == 0),
+                'targets_middle': role_plays & (direction == 1),
+                'targets_right': role_plays & (direction == 2),
+                'air_yards': np.where(role_plays & air_known, air_yards, 0),
+                'air_yards_known': role_plays & air_known,
+            }
+        if not role_plays.any():
+            continue
+        ids = codes[role_plays]
+        # One bincount per counter over the player ids of this role's plays
+        sums = {name: np.bincount(ids, weights=values[role_plays]) for name, values in columns.items()}
+        for player in np.unique(ids):
+            name = stats.labels[role][player]
+            entry = players.setdefault(name, {'team': None, 'games': 1})
+            if entry['team'] is None:
+                teams = offense[(codes == player) & role_plays]
+                entry['team'] = stats.labels['offense'][int(np.bincount(teams).argmax())]
+            for counter, values in sums.items():
+                entry[counter] = int(values[player])
+    return players
+
+
+def summarize_game(index, doc_id):
+    """Mergeable counters of one game's offenses and players"""
+    stats = index.stats
+    start, end = index.shards[doc_id]['plays']
+    play_ids = np.arange(start, end)
+    snaps = play_ids[(stats.category[start:end] == CATEGORIES.index('pass')) |
+                     (stats.category[start:end] == CATEGORIES.index('rush'))]
+    offense = stats.codes['offense'][snaps]
+    drives = index.drives
+    drive_ids = range(*index.shards[doc_id]['drives'])
+    teams = {}
+    for code in np.unique(offense):
+        team_drives = [i for i in drive_ids if drives.team[i] == code]
+        teams[stats.labels['offense'][code]] = team_counts(stats, snaps[offense == code], drives, team_drives)
+    return {'game': index.shards[doc_id]['game'], 'week': index.shards[doc_id]['week'], 'teams': teams,
+            'players': player_counts(stats, play_ids)}
+
+
+def team_view(name, counts, players):
+    """Season report of one offense from its merged counters"""
+    plays = counts['plays']
+    scoring = sum(counts['drive_results'].get(result, 0) for result in SCORING_RESULTS)
+    drives = counts['drives']
+    leaders = {}
+    for role, key in (('passer', 'attempts'), ('rusher', 'carries'), ('target', 'targets')):
+        ranked = sorted((player for player in players.values() if player['team'] == name and player.get(key)),
+                        key=lambda player: -player[key])
+        leaders[role] = [summary_line(player_view(player['name'], player), role) for player in ranked[:TOP_PLAYERS]]
+    return {
+        'team': name,
+        'games': counts['games'],
+        'plays': plays,
+        'pass_rate': rate(counts['passes'], plays),
+        'pass_rate_by_down': {str(down): rate(passes, total) for down, (passes, total)
+                              in enumerate(zip(counts['passes_by_down'], counts['plays_by_down']), 1)},
+        'yards_per_play': rate(counts['pass_yards'] + counts['rush_yards'], plays, 2),
+        'yards_per_pass': rate(counts['pass_yards'], counts['passes'], 2),
+        'yards_per_rush': rate(counts['rush_yards'], counts['rushes'], 2),
+        'success_rate': rate(counts['successes'], counts['judged']),
+        'explosive_rate': rate(counts['explosives'], plays),
+        'deep_pass_rate': rate(counts['deep_passes'], counts['passes']),
+        'sack_rate': rate(counts['sacks'], counts['passes']),
+        'interceptions': counts['interceptions'],
+        'touchdowns': counts['touchdowns'],
+        'third_down_rate': rate(counts['third_down_conversions'], counts['third_downs']),
+        'red_zone_pass_rate': rate(counts['red_zone_passes'], counts['red_zone_plays']),
+        'red_zone_trips': counts['red_zone_trips'],
+        'red_zone_touchdown_rate': rate(counts['red_zone_trip_touchdowns'], counts['red_zone_trips']),
+        'drives': drives,
+        'scoring_drive_rate': rate(scoring, drives),
+        'plays_per_drive': rate(counts['drive_plays'], drives, 1),
+        'yards_per_drive': rate(counts['drive_yards'], drives, 1),
+        'time_per_drive': format_clock(counts['drive_seconds'] // drives) if drives else None,
+        'drive_results': dict(sorted(counts['drive_results'].items(), key=lambda item: -item[1])),
+        'leaders': leaders,
+    }
+
+
+def player_view(name, counts):
+    """Season report of one player from their merged counters; only the roles they played appear"""
+    view = {'player': name, 'team': counts['team'], 'games': counts['games']}
+    if counts.get('attempts') or counts.get('dropbacks'):
+        view['passing'] = {
+            'attempts': counts['attempts'],
+            'completions': counts['completions'],
+            'completion_rate': rate(counts['completions'], counts['attempts']),
+            'yards': counts['pass_yards'],
+            'yards_per_attempt': rate(counts['pass_yards'], counts['attempts'], 2),
+            'touchdowns': counts['pass_touchdowns'],
+            'interceptions': counts['interceptions'],
+            'sacks': counts['sacks'],
+            'deep_rate': rate(counts['deep_attempts'], counts['attempts']),
+        }
+    if counts.get('carries'):
+        view['rushing'] = {
+            'carries': counts['carries'],
+            'yards': counts['rush_yards'],
+            'yards_per_carry': rate(counts['rush_yards'], counts['carries'], 2),
+            'touchdowns': counts['rush_touchdowns'],
+            'explosive_rate': rate(counts['explosive_runs'], counts['carries']),
+            'success_rate': rate(counts['rush_successes'], counts['carries']),
+        }
+    if counts.get('targets'):
+        targets = counts['targets']
+        view['receiving'] = {
+            'targets': targets,
+            'catches': counts['catches'],
+            'catch_rate': rate(counts['catches'], targets),
+            'yards': counts['receiving_yards'],
+            'yards_per_target': rate(counts['receiving_yards'], targets, 2),
+            'touchdowns': counts['receiving_touchdowns'],
+            'deep_rate': rate(counts['deep_targets'], targets),
+            'direction': {side: rate(counts[f'targets_{side}'], targets) for side in ('left', 'middle', 'right')},
+            'adot': rate(counts['air_yards'], counts['air_yards_known'], 1),
+        }
+    return view
+
+
+def percent(value):
+    return '-' if value is None else f"{value:.0%}"
+
+
+def format_team_report(report):
+    """Team report as prompt- and chat-ready text"""
+    downs = ", ".join(f"{down}: {percent(share)}" for down, share in report['pass_rate_by_down'].items())
+    lines = [
+        f"{report['team']} offense, {report['games']} games, {report['plays']} snaps",
+        f"- Pass rate {percent(report['pass_rate'])} (by down {downs}); deep passes {percent(report['deep_pass_rate'])}",
+        f"- {report['yards_per_play']} yds/play ({report['yards_per_pass']} per pass, {report['yards_per_rush']} per rush);"
+        f" success {percent(report['success_rate'])}, explosive {percent(report['explosive_rate'])}",
+        f"- 3rd down conversions {percent(report['third_down_rate'])}; red zone: {report['red_zone_trips']} trips, "
+        f"TD rate {percent(report['red_zone_touchdown_rate'])}, pass rate {percent(report['red_zone_pass_rate'])}",
+        f"- {report['drives']} drives, {percent(report['scoring_drive_rate'])} scoring; {report['plays_per_drive']} plays,"
+        f" {report['yards_per_drive']} yds, {report['time_per_drive']} per drive; "
+        + ", ".join(f"{result} {count}" for result, count in report['drive_results'].items()),
+        f"- Touchdowns {report['touchdowns']}, interceptions {report['interceptions']}, "
+        f"sack rate {percent(report['sack_rate'])}",
+    ]
+    for role, label in (('passer', 'Passing'), ('rusher', 'Rushing'), ('target', 'Receiving')):
+        if report['leaders'][role]:
+            lines.append(f"- {label}: " + "; ".join(report['leaders'][role]))
+    return "\n".join(lines)
+
+
+def summary_line(report, role):
+    """Player's one-line figures in a role (passer, rusher or target)"""
+    name = report['player']
+    passing, rushing, receiving = report.get('passing'), report.get('rushing'), report.get('receiving')
+    if role == 'passer':
+        return (f"{name} {passing['completions']}/{passing['attempts']}, {passing['yards']} yds, "
+                f"{passing['touchdowns']} TD, {passing['interceptions']} INT")
+    if role == 'rusher':
+        return f"{name} {rushing['carries']} car, {rushing['yards']} yds, {rushing['yards_per_carry']} avg"
+    return f"{name} {receiving['catches']}/{receiving['targets']} tgt, {receiving['yards']} yds"
+
+
+def format_player_report(report):
+    """Player report as prompt- and chat-ready text"""
+    lines = [f"{report['player']} ({report['team']}), {report['games']} games"]
+    passing = report.get('passing')
+    if passing:
+        lines.append(f"- Passing: {passing['completions']}/{passing['attempts']} ({percent(passing['completion_rate'])}),"
+                     f" {passing['yards']} yds, {passing['yards_per_attempt']} Y/A, {passing['touchdowns']} TD,"
+                     f" {passing['interceptions']} INT, {passing['sacks']} sacks; deep {percent(passing['deep_rate'])}")
+    rushing = report.get('rushing')
+    if rushing:
+        lines.append(f"- Rushing: {rushing['carries']} carries, {rushing['yards']} yds, {rushing['yards_per_carry']} avg,"
+                     f" {rushing['touchdowns']} TD; success {percent(rushing['success_rate'])},"
+                     f" explosive {percent(rushing['explosive_rate'])}")
+    receiving = report.get('receiving')
+    if receiving:
+        sides = " / ".join(percent(share) for share in receiving['direction'].values())
+        adot = '-' if receiving['adot'] is None else receiving['adot']
+        lines.append(f"- Receiving: {receiving['catches']}/{receiving['targets']} ({percent(receiving['catch_rate'])}),"
+                     f" {receiving['yards']} yds, {receiving['yards_per_target']} yds/tgt, {receiving['touchdowns']} TD;"
+                     f" deep {percent(receiving['deep_rate'])}, left/middle/right {sides}, aDOT {adot}")
+    return "\n".join(lines)
+
+
+class ReportStore:
+    """Team and player tendency reports materialized from the parsed games.
+
+    Each game is summarized once into mergeable counters (kept per game, so
+    adding or changing one game recomputes only that game), and the season
+    views are the merged counters turned into rates. The per-game summaries
+    and views are saved as JSON next to the corpus file, keyed by each
+    source's (size, mtime), so a restart with the same documents reads them
+    back instead of recomputing.
+    """
+
+    def __init__(self, path=None):
+        self.path = path
+        self.games = {}
+        self.teams = {}
+        self.players = {}
+        self.updated = None
+        self.load()
+
+    def load(self):
+        if not self.path:
+            return
+        try:
+            with open(self.path, 'r', encoding='utf-8') as file:
+                data = json.load(file)
+        except FileNotFoundError:
+            return
+        except (OSError, ValueError) as e:
+            print(f"Ignoring unreadable report store {self.path}: {str(e)}")
+            return
+        if data.get('version') != REPORT_VERSION:
+            return
+        self.games = data.get('games', {})
+        self.teams = data.get('teams', {})
+        self.players = data.get('players', {})
+        self.updated = data.get('updated')
+
+    def save(self):
+        if not self.path:
+            return
+        tmp_path = f"{self.path}.{os.getpid()}.tmp"
+        try:
+            with open(tmp_path, 'w', encoding='utf-8') as file:
+                json.dump({'version': REPORT_VERSION, 'updated': self.updated, 'games': self.games,
+                           'teams': self.teams, 'players': self.players}, file)
+            os.replace(tmp_path, self.path)
+        except OSError as e:
+            print(f"Error writing report store: {str(e)}")
+
+    def refresh(self, index, signatures=None):
+        """Bring the reports in line with an index: summarize new or changed games, drop removed ones.
+
+        signatures maps doc id -> the source's (size, mtime); a game with no
+        signature is always summarized again. Returns how many games were.
+        """
+        signatures = signatures or {}
+        games = {}
+        summarized = 0
+        for doc_id, shard in index.shards.items():
+            signature = list(signatures[doc_id]) if signatures.get(doc_id) else None
+            signature = signature and signature + [shard['plays'][1] - shard['plays'][0]]
+            entry = self.games.get(doc_id)
+            if signature and entry and entry['signature'] == signature:
+                games[doc_id] = entry
+                continue
+            games[doc_id] = {'signature': signature, 'summary': summarize_game(index, doc_id)}
+            summarized += 1
+        if summarized or set(games) != set(self.games) or not self.updated:
+            self.games = games
+            self.rebuild()
+            self.save()
+        return summarized
+
+    def rebuild(self):
+        """Season views from the per-game summaries"""
+        teams = {}
+        players = {}
+        for entry in self.games.values():
+            for name, counts in entry['summary']['teams'].items():
+                merge_counts(teams.setdefault(name, {}), counts)
+            for name, counts in entry['summary']['players'].items():
+                merge_counts(players.setdefault(name, {}), counts)
+        for name, counts in players.items():
+            counts['name'] = name
+        self.players = {name: player_view(name, counts) for name, counts in players.items()}
+        self.teams = {name: team_view(name, counts, players) for name, counts in teams.items()}
+        self.updated = time.time()
+
+    def team(self, name=None):
+        """A team's report; by default the offense with the most snaps"""
+        if name is None:
+            name = max(self.teams, key=lambda team: self.teams[team]['plays'], default=None)
+        return self.teams.get(name)
+
+    def player(self, name=None, role=None):
+        """A player's report; by default the busiest player in a role (passer, rusher or target)"""
+        if name is None and role:
+            key = {'passer': ('passing', 'attempts'), 'rusher': ('rushing', 'carries'),
+                   'target': ('receiving', 'targets')}[role]
+            ranked = [player for player in self.players.values() if key[0] in player]
+            name = max(ranked, key=lambda player: player[key[0]][key[1]])['player'] if ranked else None
+        return self.players.get(name)
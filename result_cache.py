@@ -0,0 +1,82 @@
+import re
+import time
+import threading
+from collections import OrderedDict
+from play_parser import PLAYER_NAME
+
+DEFAULT_MAX_ENTRIES = 256
+DEFAULT_TTL_SECONDS = 600
+
+# Capitalized team abbreviations ("KC") and abbreviated player names ("L.Jackson") are matched
+# case-sensitively, so they keep their case in cache keys
+ABBREVIATION = re.compile(r'[A-Z]{2,3}')
+
+
+def normalize_query(query):
+    """Cache key form of a question: case, spacing and trailing punctuation don't change what it retrieves"""
+    words = []
+    for word in query.split():
+        bare = word.strip('.,;:!?\'"()')
+        words.append(word if ABBREVIATION.fullmatch(bare) or PLAYER_NAME.fullmatch(bare) else word.lower())
+    return ' '.join(words).rstrip('.!? ')
+
+
+class ResultCache:
+    """Thread-safe in-memory LRU cache with a time-to-live per entry.
+
+    Keys carry the corpus generation they were computed against, so results
+    from an older knowledge base never match; clear() drops them eagerly
+    when the generation moves. Hits, misses, evictions and expirations are
+    counted for sizing.
+    """
+
+    def __init__(self, max_entries=DEFAULT_MAX_ENTRIES, ttl=DEFAULT_TTL_SECONDS):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.entries = OrderedDict()
+        self.lock = threading.Lock()
+        self.hits = self.misses = self.evictions = self.expired = 0
+
+    def get(self, key):
+        """Cached value for key, or None on a miss"""
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is not None and self.ttl > 0 and time.monotonic() - entry[0] > self.ttl:
+                del self.entries[key]
+                self.expired += 1
+                entry = None
+            if entry is None:
+                self.misses += 1
+                return None
+            self.entries.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+
+    def put(self, key, value):
+        if self.max_entries <= 0:
+            return
+        with self.lock:
+            self.entries[key] = (time.monotonic(), value)
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.max_entries:
+                self.entries.popitem(last=False)
+                self.evictions += 1
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+
+    def stats(self):
+        """Counters and occupancy of the cache"""
+        with self.lock:
+            lookups = self.hits + self.misses
+            return {
+                'entries': len(self.entries),
+                'max_entries': self.max_entries,
+                'ttl_seconds': self.ttl,
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': round(self.hits / lookups, 3) if lookups else None,
+                'evictions': self.evictions,
+                'expired': self.expired,
+            }
@@ -0,0 +1,307 @@
+import re
+import math
+from array import array
+import numpy as np
+
+# Words too common to say anything about relevance
+STOPWORDS = {'a', 'an', 'the', 'and', 'or', 'of', 'to', 'in', 'on', 'at', 'for', 'by', 'with', 'is', 'are',
+             'was', 'were', 'be', 'do', 'does', 'did', 'what', 'how', 'who', 'when', 'which', 'me', 'my',
+             'i', 'you', 'they', 'their', 'them', 'it', 'its', 'about', 'tell', 'show', 'give', 'can'}
+
+# Multi-word phrases folded into one token before splitting. "not in red zone"
+# appears in every play's result text, so it must not match a "red zone" query.
+PHRASES = (
+    ('not in red zone', ' nonredzone '),
+    ('red zone', ' redzone '),
+    ('two-minute', ' twominute '),
+    ('two minute', ' twominute '),
+    ('up the middle', ' upthemiddle '),
+)
+
+# BM25F field weights; a query term found in a play's player list counts for more than one in its prose
+FIELD_WEIGHTS = {'player': 3.0, 'play_type': 2.0, 'situation': 1.5, 'text': 1.0}
+FIELD_B = {'player': 0.3, 'play_type': 0.0, 'situation': 0.3, 'text': 0.75}
+K1 = 1.2
+
+TOKEN = re.compile(r"[a-z]{1,3}\.[a-z][a-z'\-]*[a-z]|[a-z0-9]+")
+
+# Index token of each raw token seen so far (None for stopwords); the vocabulary is small and
+# every play repeats most of it
+_INDEX_TOKENS = {}
+
+
+def normalize_token(token):
+    """Reduce simple English plurals so 'passes' matches 'pass' and 'yards' matches 'yard'"""
+    if len(token) <= 3 or '.' in token:
+        return token
+    if token.endswith('sses') or token.endswith('shes') or token.endswith('ches') or token.endswith('xes'):
+        return token[:-2]
+    if token.endswith('ies') and len(token) > 4:
+        return token[:-3] + 'y'
+    if token.endswith('s') and not token.endswith('ss') and not token.endswith('us'):
+        return token[:-1]
+    return token
+
+
+def tokenize(text):
+    """Lowercase, fold phrases, split and normalize text into index tokens.
+
+    Abbreviated player names yield both the full token ("l.jackson") and the
+    surname ("jackson") so either form of a query finds the play.
+    """
+    text = text.lower()
+    for phrase, replacement in PHRASES:
+        if phrase in text:
+            text = text.replace(phrase, replacement)
+    tokens = []
+    for token in TOKEN.findall(text):
+        index_tokens = _INDEX_TOKENS.get(token)
+        if index_tokens is None:
+            index_tokens = []
+            word = token
+            if '.' in word:
+                index_tokens.append(word)
+                word = word.split('.', 1)[1]
+            if word not in STOPWORDS:
+                index_tokens.append(normalize_token(word))
+            index_tokens = _INDEX_TOKENS[token] = tuple(index_tokens)
+        tokens.extend(index_tokens)
+    return tokens
+
+
+def token_counts(text):
+    """Term frequencies of a text's index tokens"""
+    counts = {}
+    for token in tokenize(text):
+        counts[token] = counts.get(token, 0) + 1
+    return counts
+
+
+def merge_counts(total, counts):
+    """Add term frequencies into total in place"""
+    for term, tf in counts.items():
+        total[term] = total.get(term, 0) + tf
+    return total
+
+
+class InvertedIndex:
+    """Term -> sorted posting list of unit ids.
+
+    Units must be added in increasing id order so every posting list stays
+    sorted without a final sort.
+    """
+
+    def __init__(self):
+        self.postings = {}
+        self.size = 0
+
+    def add(self, unit_id, text):
+        for term in set(tokenize(text)):
+            posting = self.postings.get(term)
+            if posting is None:
+                posting = self.postings[term] = array('I')
+            posting.append(unit_id)
+        self.size += 1
+
+    def lookup(self, term):
+        return self.postings.get(term, ())
+
+    def intersect(self, terms):
+        """Units containing every term, smallest posting list first"""
+        postings = sorted((self.lookup(term) for term in terms), key=len)
+        if not postings or not postings[0]:
+            return []
+        result = set(postings[0])
+        for posting in postings[1:]:
+            result.intersection_update(posting)
+            if not result:
+                break
+        return sorted(result)
+
+    def union_counts(self, terms):
+        """Number of query terms each unit contains, for units containing at least one"""
+        counts = {}
+        for term in terms:
+            for unit_id in self.lookup(term):
+                counts[unit_id] = counts.get(unit_id, 0) + 1
+        return counts
+
+    def search(self, query, limit):
+        """Units matching all query terms first, then units matching the most terms"""
+        terms = list(dict.fromkeys(tokenize(query)))
+        if not terms:
+            return []
+        matched = self.intersect(terms)
+        if len(matched) >= limit or len(terms) == 1:
+            return [(1.0, unit_id) for unit_id in matched[:limit]]
+        counts = self.union_counts(terms)
+        ranked = sorted(counts.items(), key=lambda item: (-item[1], item[0]))
+        return [(count / len(terms), unit_id) for unit_id, count in ranked[:limit]]
+
+
+class BM25Index(InvertedIndex):
+    """Inverted index ranked with BM25F.
+
+    Each unit is added as a dict of fields (player, play_type, situation,
+    text). Adding only appends (term, unit, field, tf, field length) entries
+    to flat arrays; finalize() turns them into one precomputed impact score
+    per posting with a handful of NumPy passes, so a query is just a sum of
+    impacts over its terms' posting lists followed by a partition top-k.
+
+    The entries are kept after finalize() so a later index seeded from this
+    one (previous=) can copy the units of unchanged games with copy_units()
+    instead of tokenizing them again.
+    """
+
+    def __init__(self, previous=None):
+        super().__init__()
+        # Term and field ids of the entries; shared with the previous index so its entries copy as they are
+        self._term_ids = dict(previous._term_ids) if previous is not None else {}
+        self._field_ids = dict(previous._field_ids) if previous is not None else {}
+        self._entries = {name: array(typecode) for name, typecode in
+                         (('term', 'I'), ('unit', 'I'), ('field', 'B'), ('tf', 'I'), ('length', 'I'))}
+        # Unit ids and lengths of every field added, for the per-field average
+        self._field_units = {}
+        self._field_lengths = {}
+        self.impacts = {}
+
+    def add(self, unit_id, fields):
+        if isinstance(fields, str):
+            fields = {'text': fields}
+        self.add_counts(unit_id, {field: token_counts(text) for field, text in fields.items()})
+
+    def add_counts(self, unit_id, field_counts):
+        """Add a unit already tokenized, as {field: term frequencies}"""
+        term_ids = self._term_ids
+        entries = self._entries
+        for field, counts in field_counts.items():
+            length = sum(counts.values())
+            self._field_units.setdefault(field, array('I')).append(unit_id)
+            self._field_lengths.setdefault(field, array('I')).append(length)
+            if not counts:
+                continue
+            field_id = self._field_ids.setdefault(field, len(self._field_ids))
+            terms = [term_ids.setdefault(term, len(term_ids)) for term in counts]
+            entries['term'].extend(terms)
+            entries['tf'].extend(counts.values())
+            entries['unit'].extend([unit_id] * len(terms))
+            entries['field'].extend([field_id] * len(terms))
+            entries['length'].extend([length] * len(terms))
+        self.size += 1
+
+    def copy_units(self, previous, start, end, offset):
+        """Add units start..end of the index this one was seeded from, renumbered by offset"""
+        units = np.frombuffer(previous._entries['unit'], dtype='I')
+        # Bounds of the same dtype, or searchsorted copies the whole array to compare
+        bounds = np.array([start, end], dtype=units.dtype)
+        first, last = np.searchsorted(units, bounds).tolist()
+        for name, values in previous._entries.items():
+            part = np.frombuffer(values, dtype=values.typecode)[first:last]
+            self._entries[name].frombytes((part.astype(np.int64) + offset).astype(part.dtype).tobytes() if name == 'unit'
+                                          else part.tobytes())
+        for field, field_units in previous._field_units.items():
+            field_units = np.frombuffer(field_units, dtype='I')
+            first, last = np.searchsorted(field_units, bounds).tolist()
+            self._field_units.setdefault(field, array('I')).frombytes((field_units[first:last].astype(np.int64) + offset)
+                                                                       .astype(np.uint32).tobytes())
+            lengths = np.frombuffer(previous._field_lengths[field], dtype='I')[first:last]
+            self._field_lengths.setdefault(field, array('I')).frombytes(lengths.tobytes())
+        self.size += end - start
+
+    def finalize(self):
+        """Compute idf, length norms and per-posting impact scores"""
+        entries = {name: np.frombuffer(values, dtype=values.typecode) if len(values) else np.empty(0, dtype=np.int64)
+                   for name, values in self._entries.items()}
+        fields = sorted(self._field_ids, key=self._field_ids.get)
+        if fields and len(entries['term']):
+            average = np.array([(sum(self._field_lengths[field]) / len(self._field_lengths[field])) or 1.0
+                                if self._field_lengths.get(field) else 1.0 for field in fields])
+            b = np.array([FIELD_B.get(field, 0.75) for field in fields])
+            weight = np.array([FIELD_WEIGHTS.get(field, 1.0) for field in fields])
+            field = entries['field']
+            norm = 1 - b[field] + b[field] * entries['length'] / average[field]
+            weighted = weight[field] * entries['tf'] / norm
+            # Sum the fields of each (term, unit) pair
+            order = np.lexsort((entries['unit'], entries['term']))
+            terms, units, weighted = entries['term'][order], entries['unit'][order], weighted[order]
+            starts = np.flatnonzero(np.concatenate(([True], (terms[1:] != terms[:-1]) | (units[1:] != units[:-1]))))
+            terms, units, weighted = terms[starts], units[starts], np.add.reduceat(weighted, starts)
+            df = np.bincount(terms, minlength=len(self._term_ids))
+            idf = np.log(1 + (self.size - df + 0.5) / (df + 0.5))
+            impacts = (idf[terms] * weighted / (K1 + weighted)).astype(np.float32)
+            units = units.astype(np.uint32)
+            bounds = np.concatenate(([0], np.cumsum(df)))
+            for term, term_id in self._term_ids.items():
+                start, end = bounds[term_id], bounds[term_id + 1]
+                if end > start:
+                    posting = self.postings[term] = array('I')
+                    posting.frombytes(units[start:end].tobytes())
+                    impact = self.impacts[term] = array('f')
+                    impact.frombytes(impacts[start:end].tobytes())
+
+    def term_postings(self, term, ranges=None):
+        """(unit ids, impacts) of a term as numpy views of its posting list, cut to the given unit id ranges.
+
+        Units are added game by game, so each game's units are one contiguous
+        stretch of every posting list: a game shard is a slice found by binary
+        search, and idf stays corpus-wide so shard scores compare directly.
+        """
+        posting = self.postings.get(term)
+        if not posting:
+            return None
+        unit_ids = np.frombuffer(posting, dtype=posting.typecode)
+        impacts = np.frombuffer(self.impacts[term], dtype=self.impacts[term].typecode)
+        if ranges is None:
+            return unit_ids, impacts
+        bounds = np.searchsorted(unit_ids, ranges).tolist()
+        slices = [slice(start, end) for start, end in bounds if end > start]
+        if not slices:
+            return None
+        return (np.concatenate([unit_ids[part] for part in slices]),
+                np.concatenate([impacts[part] for part in slices]))
+
+    def search(self, query, limit, min_score_ratio=0.25, candidates=None, ranges=None):
+        """Top units by BM25F score; units scoring far below the best match are dropped.
+
+        With ranges ((start, end) unit id ranges of the game shards a query
+        was routed to), only postings inside them are read. With candidates
+        (a set of unit ids already selected by filters), only those units are
+        scored and every candidate is eligible, scored 0 when no query term
+        matches it. Unrouted queries sum impacts over every shard at once as
+        vectorized array operations.
+        """
+        terms = list(dict.fromkeys(tokenize(query)))
+        if ranges is not None:
+            ranges = np.asarray(ranges, dtype=np.int64).reshape(-1, 2)
+        found = [postings for postings in (self.term_postings(term, ranges) for term in terms) if postings]
+        if found:
+            unit_ids, inverse = np.unique(np.concatenate([ids for ids, _ in found]), return_inverse=True)
+            scores = np.bincount(inverse, weights=np.concatenate([impacts for _, impacts in found]))
+        else:
+            unit_ids, scores = np.empty(0, dtype=np.int64), np.empty(0)
+
+        if candidates is not None:
+            eligible = np.fromiter(candidates, dtype=np.int64, count=len(candidates))
+            eligible.sort()
+            eligible_scores = np.zeros(len(eligible))
+            positions = np.searchsorted(eligible, unit_ids)
+            hit = positions < len(eligible)
+            hit[hit] = eligible[positions[hit]] == unit_ids[hit]
+            eligible_scores[positions[hit]] = scores[hit]
+            return top_scores(eligible, eligible_scores, limit)
+
+        if not len(scores):
+            return []
+        top = top_scores(unit_ids, scores, limit)
+        cutoff = top[0][0] * min_score_ratio
+        return [(score, unit_id) for score, unit_id in top if score >= cutoff]
+
+
+def top_scores(unit_ids, scores, limit):
+    """Highest (score, unit_id) pairs, best first, ties in unit id order"""
+    if len(scores) > limit:
+        threshold = np.partition(scores, len(scores) - limit)[len(scores) - limit]
+        keep = scores >= threshold
+        unit_ids, scores = unit_ids[keep], scores[keep]
+    order = np.lexsort((unit_ids, -scores))[:limit]
+    return [(float(scores[i]), int(unit_ids[i])) for i in order]
@@ -0,0 +1,434 @@
+import re
+import numpy as np
+from play_parser import play_category, PASS_DEPTHS, PASS_DIRECTIONS, NO_AIR_YARDS
+from play_index import parse_situation, play_defenses
+
+CATEGORIES = ('pass', 'rush', 'special_teams', 'admin', 'other')
+DISTANCES = ('short', 'medium', 'long')
+FIELD_ZONES = ('goal_line', 'red_zone', 'opponent_territory', 'own_territory', 'backed_up')
+PLAYER_DIMENSIONS = ('passer', 'rusher', 'target')
+DIMENSIONS = ('down', 'distance', 'quarter', 'field_zone', 'red_zone', 'category', 'play_type', 'offense', 'defense',
+              'game', 'pass_depth', 'pass_direction') + PLAYER_DIMENSIONS
+
+CATCH_TYPES = {'Pass Reception', 'Passing Touchdown'}
+TOUCHDOWN_TYPES = {'Passing Touchdown', 'Rushing Touchdown', 'Interception Return Touchdown',
+                   'Kickoff Return Touchdown'}
+# Gains that count as explosive: 10+ yards on a run, 20+ on a pass
+EXPLOSIVE_YARDS = {'rush': 10, 'pass': 20}
+# Share of the yards to go a play must gain to be a success on 1st, 2nd, 3rd and 4th down
+SUCCESS_SHARE = (0.4, 0.6, 1.0, 1.0)
+# Upper bounds of the yards-gained buckets; the last bucket is open ended
+YARD_BUCKETS = ((-1, 'loss'), (3, '0-3'), (9, '4-9'), (19, '10-19'))
+
+# Wording that asks for a number rather than a description
+STATS_TERMS = re.compile(r'\b(how many|how often|count|counts|ratio|rate|rates|percent|percentage|share|split|'
+                         r'average|avg|mean|median|per carry|per attempt|per play|per game|yards per|'
+                         r'success rate|explosive|distribution|breakdown|mix|tendenc(?:y|ies)|frequency|'
+                         r'stats|statistics|totals?)\b')
+# "by down", "per quarter", "for each receiver" -> grouping dimension
+GROUP_WORDS = {
+    'down': 'down', 'downs': 'down', 'distance': 'distance', 'quarter': 'quarter', 'quarters': 'quarter',
+    'zone': 'field_zone', 'field zone': 'field_zone', 'field position': 'field_zone',
+    'play type': 'play_type', 'type': 'play_type', 'team': 'offense', 'offense': 'offense',
+    'defense': 'defense', 'opponent': 'defense', 'opponents': 'defense', 'game': 'game',
+    'games': 'game', 'week': 'game', 'passer': 'passer', 'quarterback': 'passer', 'qb': 'passer',
+    'rusher': 'rusher', 'runner': 'rusher', 'ball carrier': 'rusher', 'running back': 'rusher',
+    'receiver': 'target', 'receivers': 'target', 'target': 'target', 'targets': 'target', 'player': 'target',
+    'players': 'target', 'depth': 'pass_depth', 'pass depth': 'pass_depth', 'direction': 'pass_direction',
+    'pass direction': 'pass_direction', 'side': 'pass_direction',
+}
+GROUP_PATTERN = re.compile(r'\b(?:by|per|each|for each|across|split by|broken down by)\s+(' +
+                           '|'.join(sorted(map(re.escape, GROUP_WORDS), key=len, reverse=True)) + r')\b')
+# Metrics that imply a grouping when none is named
+IMPLIED_GROUPS = (
+    (re.compile(r'\bper carry\b|\bcarries\b|\brushers?\b'), ('rusher',)),
+    (re.compile(r'\btargets?\b|\breceivers?\b'), ('target',)),
+    (re.compile(r'\brun/pass\b|\bpass/run\b|\brun-pass\b|\bpass-run\b|\bplay mix\b|\bmix\b'), ('category',)),
+)
+# Wording that asks about where passes go rather than what plays gained
+TARGET_TERMS = re.compile(r'\b(adot|depth of target|target depth|air yards|routing|routes?|pass depth|'
+                          r'pass direction|directions?|heat ?map|deep (?:passes|balls|shots|targets)|'
+                          r'short (?:passes|targets))\b')
+TARGET_DEPTH = re.compile(r'\b(short|deep)\s+(?:pass|passes|ball|balls|throws?|targets?|shots?|attempts?)\b')
+TARGET_DIRECTION = re.compile(r'\b(?:to the|over the|down the|on the|towards? the)\s+(left|middle|right)\b')
+# Player groups beyond this many are cut to the busiest
+MAX_PLAYER_GROUPS = 15
+# Tokens of example plays sent alongside a stats table, for the model to cite
+EXAMPLE_TOKEN_BUDGET = 800
+
+
+def parse_stats_query(query):
+    """(group_by dimensions, facet filters) for a question asking for numbers, or None if it asks for none"""
+    text = query.lower()
+    group_by = []
+    for word in GROUP_PATTERN.findall(text):
+        dimension = GROUP_WORDS[word]
+        if dimension not in group_by:
+            group_by.append(dimension)
+    if not group_by:
+        for pattern, dimensions in IMPLIED_GROUPS:
+            if pattern.search(text):
+                group_by = list(dimensions)
+                break
+    if not group_by and not STATS_TERMS.search(text):
+        return None
+    group_by = group_by or ['category']
+    filters = parse_situation(query)
+    # "How often do they pass" asks for the pass share, so grouping by category keeps the runs it is a share of
+    if 'category' in group_by:
+        filters.pop('category', None)
+    return group_by, filters
+
+
+def parse_target_query(query):
+    """(group_by dimensions, facet filters) for a question about pass depth, direction or air yards, or None"""
+    text = query.lower()
+    if not TARGET_TERMS.search(text):
+        return None
+    group_by = []
+    for word in GROUP_PATTERN.findall(text):
+        dimension = GROUP_WORDS[word]
+        if dimension not in group_by:
+            group_by.append(dimension)
+    filters = parse_situation(query)
+    filters.pop('category', None)
+    for pattern, facet in ((TARGET_DEPTH, 'pass_depth'), (TARGET_DIRECTION, 'pass_direction')):
+        for value in pattern.findall(text):
+            filters.setdefault(facet, set()).add(value)
+    return group_by or ['target'], filters
+
+
+def as_array(values, dtype):
+    """A play table column as a NumPy array; array.array and memoryview columns are wrapped, not copied"""
+    if isinstance(values, list):
+        return np.array(values, dtype=dtype)
+    return np.frombuffer(values, dtype=values.typecode if hasattr(values, 'typecode') else values.format)
+
+
+class StatsEngine:
+    """Deterministic aggregates over the parsed plays, computed with NumPy.
+
+    Every groupable dimension is held as an integer code column (-1 when a
+    play has no value), so a grouped query is one mask, one np.unique over
+    the stacked key columns, and a handful of np.bincount calls for the
+    counts, rates, yardage and success figures of every group at once.
+    """
+
+    def __init__(self, plays, players=None):
+        self.plays = plays
+        self.size = len(plays)
+        self.down = as_array(plays.down, np.int8).astype(np.int16)
+        self.distance_to_go = as_array(plays.distance, np.int8).astype(np.int16)
+        self.quarter = as_array(plays.quarter, np.int8).astype(np.int16)
+        self.yards = as_array(plays.yards, np.int16).astype(np.int32)
+        yards_to_goal = as_array(plays.yards_to_goal, np.int8).astype(np.int16)
+        play_type = as_array(plays.play_type, np.uint16).astype(np.int32)
+
+        type_names = list(plays.play_types.values)
+        type_category = np.array([CATEGORIES.index(play_category(name)) for name in type_names] or [0],
+                                 dtype=np.int32)
+        self.category = type_category[play_type] if self.size else np.empty(0, dtype=np.int32)
+        touchdown_types = np.array([name in TOUCHDOWN_TYPES for name in type_names] or [False])
+        self.touchdown = touchdown_types[play_type] if self.size else np.empty(0, dtype=bool)
+
+        has_down = self.down > 0
+        distance = np.select([self.distance_to_go <= 3, self.distance_to_go <= 6], [0, 1], 2)
+        known_spot = yards_to_goal >= 0
+        field_zone = np.select([yards_to_goal <= 5, yards_to_goal <= 20, yards_to_goal < 50, yards_to_goal < 90],
+                               [0, 1, 2, 3], 4)
+        red_zone = (yards_to_goal > 0) & (yards_to_goal <= 20)
+        # Field position is more reliable than the exported flag when it is known
+        red_zone = np.where(known_spot, red_zone, as_array(plays.red_zone, np.int8) > 0)
+        defense_teams, defenses = play_defenses(plays)
+        self.codes = {
+            'down': np.where(has_down, self.down, -1),
+            'distance': np.where(has_down & (self.distance_to_go >= 0), distance, -1),
+            'quarter': self.quarter.astype(np.int32),
+            'field_zone': np.where(known_spot, field_zone, -1),
+            'red_zone': red_zone.astype(np.int32),
+            'category': self.category,
+            'play_type': play_type,
+            'offense': as_array(plays.team, np.uint16).astype(np.int32),
+            'defense': np.array(defenses, dtype=np.int32),
+            'game': as_array(plays.game, np.uint16).astype(np.int32),
+            'pass_depth': as_array(plays.pass_depth, np.int8).astype(np.int32),
+            'pass_direction': as_array(plays.pass_direction, np.int8).astype(np.int32),
+        }
+        self.labels = {
+            'down': None, 'quarter': None, 'distance': DISTANCES, 'field_zone': FIELD_ZONES,
+            'red_zone': (False, True), 'category': CATEGORIES, 'play_type': type_names,
+            'offense': list(plays.teams.values), 'defense': defense_teams,
+            'game': list(plays.games.values),
+            'pass_depth': PASS_DEPTHS, 'pass_direction': PASS_DIRECTIONS,
+        }
+        player_names = players.names if players is not None else []
+        for role in PLAYER_DIMENSIONS:
+            codes = np.full(self.size, -1, dtype=np.int32)
+            for player_id, play_ids in (players.postings[role].items() if players is not None else ()):
+                codes[np.frombuffer(play_ids, dtype=play_ids.typecode)] = player_id
+            self.codes[role] = codes
+            self.labels[role] = player_names
+
+        # Success: enough of the yards to go for the down, or a touchdown; only judged on downs 1-4
+        share = np.array((0.0,) + SUCCESS_SHARE, dtype=np.float32)[np.clip(self.down, 0, 4)]
+        self.success = has_down & ((self.yards >= share * np.maximum(self.distance_to_go, 0)) | self.touchdown)
+        explosive = np.full(self.size, np.iinfo(np.int32).max, dtype=np.int32)
+        for category, yards in EXPLOSIVE_YARDS.items():
+            explosive[self.category == CATEGORIES.index(category)] = yards
+        self.explosive = self.yards >= explosive
+        self.yard_bucket = np.searchsorted(np.array([bound for bound, _ in YARD_BUCKETS]), self.yards, side='left')
+
+        # Pass attempts: throws that got the ball out, so not sacks
+        catch_types = np.array([name in CATCH_TYPES for name in type_names] or [False])
+        self.catch = catch_types[play_type] if self.size else np.empty(0, dtype=bool)
+        self.attempt = (self.category == CATEGORIES.index('pass')) & (
+            play_type != (type_names.index('Sack') if 'Sack' in type_names else -1))
+        self.air_yards = as_array(plays.air_yards, np.int8).astype(np.int32)
+
+    def label(self, dimension, code):
+        labels = self.labels[dimension]
+        return int(code) if labels is None else labels[code]
+
+    def mask(self, filters=None, play_ids=None):
+        """(mask, filters applied) for plays matching facet filters (as from parse_situation) and, when
+        given, a subset of play ids.
+
+        Snaps (passes and runs) are counted unless the filters ask for other
+        plays by category or play type.
+        """
+        mask = np.ones(self.size, dtype=bool)
+        filters = filters or {}
+        applied = {}
+        for facet, wanted in filters.items():
+            codes = self.codes.get(facet)
+            if codes is None:
+                continue
+            labels = self.labels[facet]
+            if facet == 'red_zone':
+                allowed = [int(bool(value)) for value in wanted]
+            elif labels is None:
+                allowed = [int(value) for value in wanted]
+            else:
+                allowed = [labels.index(value) for value in wanted if value in labels]
+                # A team or value this corpus never has doesn't narrow the search
+                if not allowed and facet in ('offense', 'defense'):
+                    continue
+            mask &= np.isin(codes, allowed)
+            applied[facet] = sorted(wanted, key=str)
+        if 'category' not in filters and 'play_type' not in filters:
+            mask &= (self.category == CATEGORIES.index('pass')) | (self.category == CATEGORIES.index('rush'))
+        if play_ids is not None:
+            subset = np.zeros(self.size, dtype=bool)
+            subset[np.fromiter(play_ids, dtype=np.int64, count=len(play_ids))] = True
+            mask &= subset
+        return mask, applied
+
+    def aggregate(self, group_by=('category',), filters=None, play_ids=None):
+        """Grouped aggregates of the plays matching filters, as plain dicts and lists.
+
+        Each group reports plays, pass and rush counts and rates, total,
+        average and median yards, a yards-gained distribution, success rate
+        (40% / 60% / 100% of the yards to go on 1st / 2nd / 3rd-4th down, or a
+        touchdown), explosive rate (runs of 10+, passes of 20+) and touchdowns.
+        """
+        group_by = [dimension for dimension in group_by if dimension in self.codes] or ['category']
+        mask, applied = self.mask(filters, play_ids)
+        for dimension in group_by:
+            # Plays without a value for a grouped dimension (no down, no ball carrier) can't be placed
+            mask &= self.codes[dimension] >= 0
+        selected = np.flatnonzero(mask)
+        result = {
+            'report': 'plays',
+            'group_by': group_by,
+            'filters': applied,
+            'plays': int(len(selected)),
+            'groups': [],
+        }
+        if not len(selected):
+            return result
+
+        group_keys, inverse, counts = self.group(group_by, selected)
+        groups = len(group_keys)
+
+        def total(values):
+            return np.bincount(inverse, weights=values, minlength=groups)
+
+        yards = self.yards[selected]
+        category = self.category[selected]
+        passes = total(category == CATEGORIES.index('pass'))
+        rushes = total(category == CATEGORIES.index('rush'))
+        yard_sum = total(yards)
+        judged = total(self.down[selected] > 0)
+        successes = total(self.success[selected])
+        explosives = total(self.explosive[selected])
+        touchdowns = total(self.touchdown[selected])
+        buckets = np.bincount(inverse * (len(YARD_BUCKETS) + 1) + self.yard_bucket[selected],
+                              minlength=groups * (len(YARD_BUCKETS) + 1)).reshape(groups, -1)
+        # Medians from one sort of (group, yards)
+        ordered = yards[np.lexsort((yards, inverse))]
+        starts = np.concatenate(([0], np.cumsum(counts)[:-1]))
+        medians = (ordered[starts + (counts - 1) // 2] + ordered[starts + counts // 2]) / 2
+
+        bucket_names = [name for _, name in YARD_BUCKETS] + [f"{YARD_BUCKETS[-1][0] + 1}+"]
+        rows = []
+        for g in range(groups):
+            plays = int(counts[g])
+            rows.append({
+                'group': {dimension: self.label(dimension, group_keys[g][d]) for d, dimension in enumerate(group_by)},
+                'plays': plays,
+                'passes': int(passes[g]),
+                'rushes': int(rushes[g]),
+                'pass_rate': round(passes[g] / plays, 3),
+                'rush_rate': round(rushes[g] / plays, 3),
+                'yards': int(yard_sum[g]),
+                'yards_per_play': round(yard_sum[g] / plays, 2),
+                'median_yards': float(medians[g]),
+                'yards_distribution': dict(zip(bucket_names, buckets[g].tolist())),
+                'success_rate': round(successes[g] / judged[g], 3) if judged[g] else None,
+                'explosive_rate': round(explosives[g] / plays, 3),
+                'touchdowns': int(touchdowns[g]),
+            })
+        if any(dimension in PLAYER_DIMENSIONS for dimension in group_by):
+            rows.sort(key=lambda row: -row['plays'])
+            rows = rows[:MAX_PLAYER_GROUPS]
+        result['groups'] = rows
+        return result
+
+    def group(self, group_by, selected):
+        """(distinct key rows, group of each selected play, plays per group) for some play ids"""
+        keys = np.stack([self.codes[dimension][selected] for dimension in group_by], axis=1)
+        group_keys, inverse, counts = np.unique(keys, axis=0, return_inverse=True, return_counts=True)
+        return group_keys, inverse.ravel(), counts
+
+    def targets(self, group_by=('target',), filters=None, play_ids=None):
+        """Grouped pass-target figures of the pass attempts matching filters, as plain dicts and lists.
+
+        Each group reports targets, catches, catch rate, yards, yards per
+        target, aDOT (mean air yards over the attempts whose air yards are
+        known, None when none are), the short/deep and left/middle/right
+        shares, and a depth x direction heatmap of targets, catches and yards.
+        """
+        group_by = [dimension for dimension in group_by if dimension in self.codes] or ['target']
+        filters = dict(filters or {})
+        filters.pop('category', None)
+        mask, applied = self.mask(dict(filters, category={'pass'}), play_ids)
+        applied.pop('category', None)
+        mask &= self.attempt
+        for dimension in group_by:
+            mask &= self.codes[dimension] >= 0
+        selected = np.flatnonzero(mask)
+        result = {
+            'report': 'targets',
+            'group_by': group_by,
+            'filters': applied,
+            'plays': int(len(selected)),
+            'groups': [],
+        }
+        if not len(selected):
+            return result
+
+        group_keys, inverse, counts = self.group(group_by, selected)
+        groups = len(group_keys)
+
+        def total(values):
+            return np.bincount(inverse, weights=values, minlength=groups)
+
+        catches = total(self.catch[selected])
+        yard_sum = total(self.yards[selected])
+        air_yards = self.air_yards[selected]
+        air_known = air_yards != NO_AIR_YARDS
+        air_counts = total(air_known)
+        air_sum = total(np.where(air_known, air_yards, 0))
+        depth = self.codes['pass_depth'][selected]
+        direction = self.codes['pass_direction'][selected]
+        depth_counts = np.bincount(inverse * len(PASS_DEPTHS) + np.maximum(depth, 0), weights=depth >= 0,
+                                   minlength=groups * len(PASS_DEPTHS)).reshape(groups, -1)
+        direction_counts = np.bincount(inverse * len(PASS_DIRECTIONS) + np.maximum(direction, 0),
+                                       weights=direction >= 0,
+                                       minlength=groups * len(PASS_DIRECTIONS)).reshape(groups, -1)
+        # Heatmap cells: depth x direction, for attempts that name both
+        cells = len(PASS_DEPTHS) * len(PASS_DIRECTIONS)
+        located = (depth >= 0) & (direction >= 0)
+        cell = inverse * cells + np.maximum(depth, 0) * len(PASS_DIRECTIONS) + np.maximum(direction, 0)
+
+        def heat(values):
+            return np.bincount(cell, weights=np.where(located, values, 0), minlength=groups * cells).reshape(groups, -1)
+
+        cell_targets = heat(1)
+        cell_catches = heat(self.catch[selected])
+        cell_yards = heat(self.yards[selected])
+        cell_names = [f"{d} {r}" for d in PASS_DEPTHS for r in PASS_DIRECTIONS]
+
+        rows = []
+        for g in range(groups):
+            targets = int(counts[g])
+            depth_known = depth_counts[g].sum()
+            direction_known = direction_counts[g].sum()
+            rows.append({
+                'group': {dimension: self.label(dimension, group_keys[g][d]) for d, dimension in enumerate(group_by)},
+                'targets': targets,
+                'catches': int(catches[g]),
+                'catch_rate': round(catches[g] / targets, 3),
+                'yards': int(yard_sum[g]),
+                'yards_per_target': round(yard_sum[g] / targets, 2),
+                'adot': round(air_sum[g] / air_counts[g], 1) if air_counts[g] else None,
+                'air_yards_known': int(air_counts[g]),
+                'depth': {name: round(depth_counts[g][k] / depth_known, 3) if depth_known else None
+                          for k, name in enumerate(PASS_DEPTHS)},
+                'direction': {name: round(direction_counts[g][k] / direction_known, 3) if direction_known else None
+                              for k, name in enumerate(PASS_DIRECTIONS)},
+                'heatmap': {name: {'targets': int(cell_targets[g][k]), 'catches': int(cell_catches[g][k]),
+                                   'yards': int(cell_yards[g][k])}
+                            for k, name in enumerate(cell_names)},
+            })
+        if any(dimension in PLAYER_DIMENSIONS for dimension in group_by):
+            rows.sort(key=lambda row: -row['targets'])
+            rows = rows[:MAX_PLAYER_GROUPS]
+        result['groups'] = rows
+        return result
+
+
+def format_targets(result):
+    """Compact text table of a targets() result for a prompt"""
+    filters = "; ".join(f"{facet}={','.join(map(str, values))}" for facet, values in result['filters'].items())
+    cells = list(result['groups'][0]['heatmap'])
+    lines = [f"Exact target figures computed from {result['plays']} pass attempts" +
+             (f" ({filters})" if filters else "") + f", grouped by {', '.join(result['group_by'])}:",
+             " | ".join(result['group_by'] + ['tgt', 'catches', 'catch%', 'yds', 'yds/tgt', 'aDOT', 'deep%',
+                                              'left% / middle% / right%',
+                                              'targets-catches-yds by ' + ' / '.join(cells)])]
+    known = 0
+    for row in result['groups']:
+        known += row['air_yards_known']
+        adot = '-' if row['adot'] is None else f"{row['adot']:.1f}"
+        deep = '-' if row['depth']['deep'] is None else f"{row['depth']['deep']:.0%}"
+        sides = ' / '.join('-' if share is None else f"{share:.0%}" for share in row['direction'].values())
+        heatmap = ' / '.join(f"{cell['targets']}-{cell['catches']}-{cell['yards']}" for cell in row['heatmap'].values())
+        lines.append(" | ".join([str(value) for value in row['group'].values()] + [
+            str(row['targets']), str(row['catches']), f"{row['catch_rate']:.0%}", str(row['yards']),
+            f"{row['yards_per_target']:.1f}", adot, deep, sides, heatmap]))
+    if not known:
+        lines.append("aDOT needs air yards, which these play-by-play records don't give; short = under 15 air "
+                     "yards and deep = 15+ are the depth measure available.")
+    return "\n".join(lines)
+
+
+def format_stats(result):
+    """Compact text table of an aggregate() or targets() result for a prompt"""
+    if not result['groups']:
+        return ""
+    if result.get('report') == 'targets':
+        return format_targets(result)
+    filters = "; ".join(f"{facet}={','.join(map(str, values))}" for facet, values in result['filters'].items())
+    lines = [f"Exact counts computed from {result['plays']} plays" + (f" ({filters})" if filters else "") +
+             f", grouped by {', '.join(result['group_by'])}:",
+             " | ".join(result['group_by'] + ['plays', 'share', 'pass%', 'rush%', 'yds', 'yds/play', 'median', 'success%',
+                                              'explosive%', 'TD', 'yards gained (' +
+                                              ' / '.join(result['groups'][0]['yards_distribution']) + ')'])]
+    for row in result['groups']:
+        success = '-' if row['success_rate'] is None else f"{row['success_rate']:.0%}"
+        lines.append(" | ".join([str(value) for value in row['group'].values()] + [
+            str(row['plays']), f"{row['plays'] / result['plays']:.0%}", f"{row['pass_rate']:.0%}", f"{row['rush_rate']:.0%}", str(row['yards']),
+            f"{row['yards_per_play']:.1f}", f"{row['median_yards']:g}", success, f"{row['explosive_rate']:.0%}",
+            str(row['touchdowns']), ' / '.join(str(count) for count in row['yards_distribution'].values())]))
+    return "\n".join(lines)
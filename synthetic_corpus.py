@@ -0,0 +1,329 @@
+import os
+import sys
+import json
+import random
+import argparse
+import textwrap
+from play_parser import TEAM_ABBREVIATIONS, QUARTER_SECONDS
+
+FLAVORS = ('pdf', 'text', 'json')
+
+SURNAMES = ('Adams', 'Allen', 'Bailey', 'Baker', 'Bell', 'Brooks', 'Brown', 'Butler', 'Carter', 'Clark',
+            'Collins', 'Cook', 'Cooper', 'Davis', 'Diggs', 'Evans', 'Fisher', 'Foster', 'Gordon', 'Graham',
+            'Gray', 'Green', 'Hall', 'Harris', 'Hill', 'Howard', 'Hughes', 'Jackson', 'James', 'Jenkins',
+            'Johnson', 'Jones', 'Kelly', 'King', 'Lewis', 'Long', 'Martin', 'Miller', 'Mitchell', 'Moore',
+            'Morgan', 'Murphy', 'Nelson', 'Parker', 'Perry', 'Phillips', 'Powell', 'Price', 'Reed', 'Rivera',
+            'Roberts', 'Robinson', 'Ross', 'Russell', 'Sanders', 'Scott', 'Simmons', 'Smith', 'Stewart',
+            'Taylor', 'Thomas', 'Thompson', 'Turner', 'Walker', 'Ward', 'Washington', 'Watson', 'White',
+            'Williams', 'Wilson', 'Wood', 'Wright', 'Young')
+INITIALS = 'ABCDEGJKLMNRST'
+RUN_DIRECTIONS = ('left end', 'left tackle', 'left guard', 'up the middle', 'right guard', 'right tackle',
+                  'right end')
+PASS_DIRECTIONS = ('left', 'middle', 'right')
+ORDINALS = {1: '1st', 2: '2nd', 3: '3rd', 4: '4th'}
+
+
+def player_name(rng):
+    return f"{rng.choice(INITIALS)}.{rng.choice(SURNAMES)}"
+
+
+def roster(rng):
+    """Named players for one team-season, by position group"""
+    return {
+        'qb': player_name(rng),
+        'rb': [player_name(rng) for _ in range(2)],
+        'receivers': [player_name(rng) for _ in range(5)],
+        'k': player_name(rng),
+        'p': player_name(rng),
+        'defense': [player_name(rng) for _ in range(8)],
+    }
+
+
+def spot(offense, defense, yards_to_goal):
+    """Field position text ("BAL 36", "50") for a ball yards_to_goal from the offense's end zone"""
+    yards_to_goal = min(max(yards_to_goal, 1), 99)
+    if yards_to_goal == 50:
+        return '50'
+    if yards_to_goal > 50:
+        return f"{TEAM_ABBREVIATIONS[offense]} {100 - yards_to_goal}"
+    return f"{TEAM_ABBREVIATIONS[defense]} {yards_to_goal}"
+
+
+def record(quarter, clock, team, situation, play_type, description, yards, yards_to_goal, complete=True):
+    """One play in the pipe-delimited layout of the play-by-play documents"""
+    red_zone = 'in' if 0 < yards_to_goal <= 20 else 'not in'
+    return (f"Q{quarter} | {clock // 60}:{clock % 60:02d} | {team} | {situation} | {play_type}: {description}"
+            f" | {'Complete' if complete else 'Incomplete'} play, {red_zone} red zone, {yards} yards gained.")
+
+
+def simulate_game(rng, home, away, rosters):
+    """Play records for one simulated game, in game order.
+
+    A simple drive model: down and distance, field position, scoring,
+    punts, field goals, turnovers and the game clock all advance the way the
+    real exports do, so every parser and index sees realistic records.
+    """
+    records = []
+    teams = (away, home)
+    offense = 0
+    quarter, clock = 1, QUARTER_SECONDS
+    kickoff = True
+    yards_to_goal = 75
+    down, distance = 1, 10
+
+    def tick(seconds):
+        nonlocal quarter, clock
+        clock -= seconds
+        if clock <= 0:
+            records.append(record(quarter, 0, teams[offense], 'N/A', 'End Period', f"End of Quarter {quarter}", 0,
+                                  yards_to_goal, complete=False))
+            quarter += 1
+            clock = QUARTER_SECONDS
+        return quarter <= 4
+
+    while quarter <= 4:
+        team, opponent = teams[offense], teams[1 - offense]
+        players, defenders = rosters[team], rosters[opponent]['defense']
+        tackler = rng.choice(defenders)
+        if kickoff:
+            kicker = rosters[opponent]['k']
+            records.append(record(quarter, clock, team, 'N/A', 'Kickoff',
+                                  f"{kicker} kicks 65 yards from {TEAM_ABBREVIATIONS[opponent]} 35 to end zone, "
+                                  f"Touchback to the {TEAM_ABBREVIATIONS[team]} 30.", 0, 75))
+            kickoff = False
+            yards_to_goal, down, distance = 75, 1, 10
+            if not tick(rng.randint(0, 5)):
+                break
+            continue
+
+        goal = distance >= yards_to_goal
+        situation = (f"{ORDINALS[down]} & {'Goal' if goal else distance} at "
+                     f"{spot(team, opponent, yards_to_goal)}")
+        change_of_possession = False
+        if down == 4 and yards_to_goal <= 35:
+            kick = yards_to_goal + 17
+            good = rng.random() < max(0.35, 1.0 - (kick - 20) * 0.015)
+            play_type = 'Field Goal Good' if good else 'Field Goal Missed'
+            records.append(record(quarter, clock, team, situation, play_type,
+                                  f"{players['k']} {kick} yard field goal is {'GOOD' if good else 'No Good'}, "
+                                  f"Holder-{players['p']}.", 0, yards_to_goal))
+            kickoff = good
+            change_of_possession = True
+            yards_to_goal = 100 - yards_to_goal if not good else 75
+        elif down == 4 and (distance > 2 or yards_to_goal > 60):
+            length = rng.randint(35, 55)
+            landing = max(yards_to_goal - length, 10)
+            records.append(record(quarter, clock, team, situation, 'Punt',
+                                  f"{players['p']} punts {length} yards to {spot(team, opponent, landing)}, "
+                                  f"fair catch by {rng.choice(rosters[opponent]['receivers'])}.", 0, yards_to_goal))
+            change_of_possession = True
+            yards_to_goal = 100 - landing
+        else:
+            shotgun = '(Shotgun) ' if down >= 3 or rng.random() < 0.5 else ''
+            roll = rng.random()
+            pass_rate = 0.7 if distance >= 7 else 0.45
+            if roll >= pass_rate:
+                rusher = rng.choice(players['rb']) if rng.random() < 0.85 else players['qb']
+                yards = max(-4, min(int(rng.gauss(4.2, 5)), yards_to_goal))
+                if yards >= yards_to_goal:
+                    play_type, text = 'Rushing Touchdown', (f"{rusher} {rng.choice(RUN_DIRECTIONS)} for {yards} yards,"
+                                                            f" TOUCHDOWN.")
+                else:
+                    play_type = 'Rush'
+                    text = (f"{shotgun}{rusher} {rng.choice(RUN_DIRECTIONS)} to "
+                            f"{spot(team, opponent, yards_to_goal - yards)} for {yards} yards ({tackler}).")
+            else:
+                passer, target = players['qb'], rng.choice(players['receivers'])
+                depth = 'deep' if rng.random() < 0.2 else 'short'
+                direction = rng.choice(PASS_DIRECTIONS)
+                outcome = rng.random()
+                if outcome < 0.06:
+                    yards = -rng.randint(2, 10)
+                    play_type = 'Sack'
+                    text = (f"{shotgun}{passer} sacked at {spot(team, opponent, yards_to_goal - yards)} for {yards}"
+                            f" yards ({tackler}).")
+                elif outcome < 0.085:
+                    yards = 0
+                    play_type = 'Pass Interception Return'
+                    text = (f"{shotgun}{passer} pass {depth} {direction} intended for {target} INTERCEPTED by "
+                            f"{tackler} at {spot(team, opponent, max(yards_to_goal - 10, 1))}.")
+                    change_of_possession = True
+                elif outcome < 0.40:
+                    yards = 0
+                    play_type = 'Pass Incompletion'
+                    text = f"{shotgun}{passer} pass incomplete {depth} {direction} to {target}."
+                else:
+                    mean = 17 if depth == 'deep' else 7
+                    yards = max(0, min(int(rng.gauss(mean, 6)), yards_to_goal))
+                    if yards >= yards_to_goal:
+                        play_type = 'Passing Touchdown'
+                        text = f"{shotgun}{passer} pass {depth} {direction} to {target} for {yards} yards, TOUCHDOWN."
+                    else:
+                        play_type = 'Pass Reception'
+                        text = (f"{shotgun}{passer} pass {depth} {direction} to {target} to "
+                                f"{spot(team, opponent, yards_to_goal - yards)} for {yards} yards ({tackler}).")
+            records.append(record(quarter, clock, team, situation, play_type, text, yards, yards_to_goal,
+                                  complete=play_type != 'Sack'))
+            if play_type.endswith('Touchdown'):
+                change_of_possession = kickoff = True
+            elif not change_of_possession:
+                yards_to_goal = min(yards_to_goal - yards, 99)
+                if yards >= distance:
+                    down, distance = 1, min(10, yards_to_goal)
+                elif down == 4:
+                    change_of_possession = True
+                    yards_to_goal = 100 - yards_to_goal
+                else:
+                    down, distance = down + 1, distance - yards
+            else:
+                yards_to_goal = 100 - max(yards_to_goal - 10, 1)
+
+        if change_of_possession:
+            offense = 1 - offense
+            down, distance = 1, 10
+            yards_to_goal = min(max(yards_to_goal, 1), 99)
+            if not kickoff:
+                distance = min(10, yards_to_goal)
+        if not tick(rng.randint(6, 42)):
+            break
+    records.append(record(4, 0, teams[offense], 'N/A', 'End of Game', "END GAME", 0, yards_to_goal, complete=False))
+    return records
+
+
+def schedule(rng, teams, weeks):
+    """(week, home, away) pairings; every team plays once per week"""
+    games = []
+    for week in range(1, weeks + 1):
+        order = list(teams)
+        rng.shuffle(order)
+        for i in range(0, len(order) - 1, 2):
+            games.append((week, order[i], order[i + 1]))
+    return games
+
+
+def generate_games(teams=32, seasons=1, weeks=17, seed=0, limit=None):
+    """Yield (game_id, week, home, away, records) for simulated seasons, reproducibly for a seed"""
+    rng = random.Random(seed)
+    names = sorted(TEAM_ABBREVIATIONS)[:teams]
+    count = 0
+    for season in range(seasons):
+        rosters = {team: roster(rng) for team in names}
+        for week, home, away in schedule(rng, names, weeks):
+            if limit is not None and count >= limit:
+                return
+            game_id = f"9{season:02d}{week:02d}{count:05d}"
+            yield game_id, week, home, away, simulate_game(rng, home, away, rosters)
+            count += 1
+
+
+def pdf_escape(line):
+    return line.replace('\\', '\\\\').replace('(', '\\(').replace(')', '\\)')
+
+
+def write_pdf(path, records, lines_per_page=60, width=110):
+    """Write records as a plain text PDF, wrapped so records run across line and page breaks"""
+    lines = [line for text in records for line in textwrap.wrap(text, width)]
+    pages = [lines[i:i + lines_per_page] for i in range(0, len(lines), lines_per_page)] or [[]]
+    objects = ["<< /Type /Catalog /Pages 2 0 R >>", None, "<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>"]
+    kids = []
+    for page in pages:
+        body = "BT /F1 8 Tf 10 TL 30 800 Td " + " ".join(f"({pdf_escape(line)}) Tj T*" for line in page) + " ET"
+        objects.append(f"<< /Length {len(body)} >>\nstream\n{body}\nendstream")
+        objects.append(f"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 612 842] /Resources << /Font << /F1 3 0 R >>"
+                       f" >> /Contents {len(objects)} 0 R >>")
+        kids.append(f"{len(objects)} 0 R")
+    objects[1] = f"<< /Type /Pages /Kids [{' '.join(kids)}] /Count {len(kids)} >>"
+
+    output = bytearray(b"%PDF-1.4\n")
+    offsets = []
+    for number, obj in enumerate(objects, 1):
+        offsets.append(len(output))
+        output.extend(f"{number} 0 obj\n{obj}\nendobj\n".encode('latin-1'))
+    xref = len(output)
+    output.extend(f"xref\n0 {len(objects) + 1}\n0000000000 65535 f \n".encode('latin-1'))
+    for offset in offsets:
+        output.extend(f"{offset:010d} 00000 n \n".encode('latin-1'))
+    output.extend(f"trailer\n<< /Size {len(objects) + 1} /Root 1 0 R >>\nstartxref\n{xref}\n%%EOF\n".encode('latin-1'))
+    with open(path, 'wb') as file:
+        file.write(output)
+
+
+def write_text(path, records):
+    with open(path, 'w', encoding='utf-8') as file:
+        file.write("\n".join(records) + "\n")
+
+
+def write_json(path, records, home, away, week=None):
+    """Write records as an ESPN summary-style play-by-play document"""
+    team_ids = {away: '1', home: '2'}
+    plays = []
+    for sequence, text in enumerate(records):
+        parts = text.split(' | ')
+        description = ' | '.join(parts[4:-1])
+        play_type, play_text = description.split(': ', 1)
+        result = parts[-1].split(', ')
+        yards_to_goal = None
+        situation = parts[3]
+        if situation != 'N/A':
+            position = situation.split(' at ')[1].split(' ')
+            yard_line = int(position[-1])
+            own = len(position) == 2 and position[0] == TEAM_ABBREVIATIONS[parts[2]]
+            yards_to_goal = 100 - yard_line if own else yard_line
+        plays.append({
+            'sequenceNumber': str(sequence),
+            'type': {'text': play_type},
+            'text': play_text,
+            'period': {'number': int(parts[0][1:])},
+            'clock': {'displayValue': parts[1]},
+            'statYardage': int(result[-1].split(' ')[0]),
+            # Rows without a situation have no field position to derive the red zone from
+            'complete': result[0] == 'Complete play',
+            'redZone': result[1] == 'in red zone',
+            'start': {
+                'team': {'id': team_ids[parts[2]]},
+                'downDistanceText': None if situation == 'N/A' else situation,
+                'yardsToEndzone': yards_to_goal,
+            },
+        })
+    competitors = [{'homeAway': side, 'team': {'id': team_ids[team], 'shortDisplayName': team}}
+                   for side, team in (('away', away), ('home', home))]
+    with open(path, 'w', encoding='utf-8') as file:
+        json.dump({'header': {'week': {'number': week}, 'competitions': [{'competitors': competitors}]},
+                   'drives': {'previous': [{'plays': plays}]}}, file)
+
+
+def write_corpus_dir(out_dir, flavor='pdf', teams=32, seasons=1, weeks=17, seed=0, limit=None):
+    """Generate games into out_dir as one file per game; returns (games, plays) written"""
+    os.makedirs(out_dir, exist_ok=True)
+    games = plays = 0
+    for game_id, week, home, away, records in generate_games(teams, seasons, weeks, seed, limit):
+        stem = os.path.join(out_dir, f"{game_id}_{away.lower()}-{home.lower()}_synthetic")
+        if flavor == 'pdf':
+            write_pdf(stem + '.pdf', records)
+        elif flavor == 'text':
+            write_text(stem + '.txt', records)
+        else:
+            write_json(stem + '.json', records, home, away, week)
+        games += 1
+        plays += len(records)
+    return games, plays
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Generate synthetic play-by-play games for load testing")
+    parser.add_argument('out_dir')
+    parser.add_argument('--flavor', choices=FLAVORS, default='pdf')
+    parser.add_argument('--teams', type=int, default=32, help="Number of teams (even, at most 32)")
+    parser.add_argument('--seasons', type=int, default=1)
+    parser.add_argument('--weeks', type=int, default=17)
+    parser.add_argument('--games', type=int, help="Stop after this many games")
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args(argv)
+    games, plays = write_corpus_dir(args.out_dir, args.flavor, args.teams, args.seasons, args.weeks, args.seed,
+                                    args.games)
+    print(f"Wrote {games} {args.flavor} games ({plays} plays) to {args.out_dir}")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,46 @@
+from play_parser import parse_plays
+from corpus_index import CorpusIndex
+from context_builder import build_context, dedupe_key, estimate_tokens
+
+
+def record(clock, situation, description, yards=0):
+    return f"Q1 | {clock} | Ravens | {situation} | {description} | Complete play, not in red zone, {yards} yards gained."
+
+
+def game_index():
+    records = [record(f"{14 - i}:00", '1st & 10 at BAL 25',
+                      f"Rush: D.Henry left end to BLT {26 + i} for {i + 1} yards (N.Bolton).", i + 1)
+               for i in range(12)]
+    plays = parse_plays(' '.join(records), game='401671789_ravens-chiefs')
+    return CorpusIndex({'401671789_ravens-chiefs': {'plays': plays, 'text': ''}})
+
+
+def test_context_stays_within_budget():
+    index = game_index()
+    units = [index.units[unit_id] for unit_id in index.by_granularity['play']]
+    context, tokens, used = build_context(units, index.plays, budget=120)
+    assert 0 < used < len(units)
+    assert tokens == estimate_tokens(context)
+    assert tokens <= 120
+
+
+def test_best_units_are_chosen_then_put_in_game_order():
+    index = game_index()
+    units = [index.units[unit_id] for unit_id in reversed(index.by_granularity['play'])]
+    context, _, used = build_context(units, index.plays, budget=120)
+    lines = context.split("\n\n")[1:]
+    # The last plays ranked best, so they are the ones kept, listed by game clock
+    assert lines == [unit.text for unit in sorted(units[:used], key=lambda unit: unit.play_start)]
+
+
+def test_drive_whose_plays_are_already_in_is_skipped():
+    index = game_index()
+    plays = [index.units[unit_id] for unit_id in index.by_granularity['play']]
+    drives = [index.units[unit_id] for unit_id in index.by_granularity['drive']]
+    _, _, used = build_context(plays + drives, index.plays, budget=10000)
+    assert used == len(plays)
+
+
+def test_dedupe_key_ignores_case_punctuation_and_spacing_only():
+    assert dedupe_key("Rush: D.Henry  left end.") == dedupe_key("rush d henry left END")
+    assert dedupe_key("Rush for 4 yards") != dedupe_key("Rush for 5 yards")
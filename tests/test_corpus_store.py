@@ -0,0 +1,68 @@
+import pytest
+from play_parser import PlayTable, parse_plays
+from corpus_store import MappedCorpus, write_corpus
+
+GAME = ' '.join([
+    "Q1 | 15:00 | Ravens | 1st & 10 at BAL 30 | Rush: D.Henry left end to BLT 34 for 4 yards (N.Bolton). "
+    "| Complete play, not in red zone, 4 yards gained.",
+    "Q1 | 14:22 | Ravens | 2nd & 6 at BAL 34 | Pass Reception: L.Jackson pass short right to Z.Flowers to BLT 44 "
+    "for 10 yards (J.Reid). | Complete play, not in red zone, 10 yards gained.",
+    "Q4 | 0:41 | Chiefs | 1st & Goal at BAL 5 | Passing Touchdown: P.Mahomes pass short left to T.Kelce for 5 yards, "
+    "TOUCHDOWN. Passé décisive. | Complete play, in red zone, 5 yards gained.",
+])
+SOURCES = {'401671789_ravens-chiefs.pdf': [1234, 5678]}
+
+
+def rows(plays, start=0, end=None):
+    return [plays.row(i) for i in range(start, len(plays) if end is None else end)]
+
+
+@pytest.fixture
+def written(tmp_path):
+    plays = parse_plays(GAME, game='401671789_ravens-chiefs')
+    knowledge_base = {
+        '401671789_ravens-chiefs.pdf': {'text': 'Ravens at Chiefs', 'plays': plays, 'week': 1},
+        'notes.pdf': {'text': 'No play records here', 'plays': PlayTable()},
+        'roster.csv': [{'name': 'L.Jackson', 'position': 'QB'}],
+    }
+    path = str(tmp_path / 'corpus.bin')
+    write_corpus(path, knowledge_base, SOURCES, 'v1')
+    return plays, MappedCorpus(path)
+
+
+def test_plays_and_documents_survive_the_round_trip(written):
+    plays, corpus = written
+    assert corpus.version == 'v1'
+    assert corpus.sources == SOURCES
+    assert len(corpus) == len(plays) == 3
+    assert rows(corpus.plays) == rows(plays)
+    assert corpus.knowledge_base == {
+        '401671789_ravens-chiefs.pdf': {'text': 'Ravens at Chiefs', 'play_range': (0, 3), 'week': 1},
+        'notes.pdf': 'No play records here',
+        'roster.csv': [{'name': 'L.Jackson', 'position': 'QB'}],
+    }
+
+
+def test_mapped_plays_are_read_only(written):
+    _, corpus = written
+    with pytest.raises(TypeError):
+        corpus.plays.extend(PlayTable())
+
+
+def test_rewrite_takes_unchanged_games_from_the_mapped_table(written, tmp_path):
+    plays, corpus = written
+    added = parse_plays(GAME.split(' Q4 ')[0], game='401671790_ravens-bengals')
+    knowledge_base = dict(corpus.knowledge_base, **{'401671790_ravens-bengals.pdf': {'text': '', 'plays': added}})
+    path = str(tmp_path / 'rewritten.bin')
+    write_corpus(path, knowledge_base, SOURCES, 'v1', corpus.plays)
+    rewritten = MappedCorpus(path)
+    assert rows(rewritten.plays, 0, 3) == rows(plays)
+    assert rows(rewritten.plays, 3) == rows(added)
+    assert rewritten.knowledge_base['401671790_ravens-bengals.pdf']['play_range'] == (3, 5)
+
+
+def test_other_files_are_rejected(tmp_path):
+    path = tmp_path / 'corpus.bin'
+    path.write_bytes(b'not a corpus file')
+    with pytest.raises(ValueError):
+        MappedCorpus(str(path))
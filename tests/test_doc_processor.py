@@ -0,0 +1,64 @@
+import os
+import pytest
+from synthetic_corpus import write_corpus_dir
+from doc_processor import DocumentProcessor
+
+
+@pytest.fixture
+def docs_dir(tmp_path, monkeypatch):
+    monkeypatch.setenv('INGEST_CACHE', '0')
+    monkeypatch.setenv('INGEST_WORKERS', '1')
+    monkeypatch.setenv('REPORT_STORE', '0')
+    docs_dir = tmp_path / 'documents'
+    write_corpus_dir(str(docs_dir), 'text', teams=4, weeks=2, seed=3, limit=4)
+    return docs_dir
+
+
+@pytest.fixture
+def processor(docs_dir, tmp_path, monkeypatch):
+    def load(name):
+        """A processor with its own artifact directory, so each one ingests from scratch"""
+        monkeypatch.setenv('INGEST_ARTIFACT_DIR', str(tmp_path / name))
+        return DocumentProcessor(str(docs_dir))
+    return load
+
+
+def summary(index):
+    units = [(unit.unit_id, unit.doc_id, unit.granularity, unit.text, unit.play_start, unit.play_end)
+             for unit in index.units]
+    plays = [index.plays.row(i) for i in range(len(index.plays))]
+    return units, plays, index.shards
+
+
+def test_reload_matches_a_fresh_build(docs_dir, processor):
+    current = processor('current')
+    files = sorted(os.listdir(docs_dir))
+    changed = docs_dir / files[1]
+    changed.write_text("\n".join(changed.read_text().splitlines()[:-3]) + "\n")
+    os.remove(docs_dir / files[2])
+    (docs_dir / files[3]).rename(docs_dir / 'renamed_text.txt')
+
+    assert current.reload()
+    fresh = processor('fresh')
+    assert summary(current.index) == summary(fresh.index)
+    query = 'deep pass to the left on 3rd down'
+    assert current.index.search(query)
+    assert [unit.unit_id for unit in current.index.search(query)] == [unit.unit_id for unit in fresh.index.search(query)]
+    assert not current.reload()
+
+
+def test_failed_file_is_not_retried_until_it_changes(docs_dir, processor):
+    current = processor('current')
+    generation = current.generation
+    bad = docs_dir / 'zz_bad.pdf'
+    bad.write_bytes(b'not a pdf')
+    assert not current.reload()
+    assert 'zz_bad.pdf' in current.failed_sources
+    current.ingest_report = []
+    assert not current.reload()
+    assert current.ingest_report == []
+    assert current.generation == generation
+
+    bad.write_bytes(b'still not a pdf')
+    assert not current.reload()
+    assert [entry['file'] for entry in current.ingest_report] == ['zz_bad.pdf']
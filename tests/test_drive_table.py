@@ -0,0 +1,80 @@
+from play_parser import parse_plays
+from drive_table import DriveTable, RESULTS, drive_ranges
+
+
+def record(clock, situation, description, yards=0):
+    return f"Q2 | {clock} | Ravens | {situation} | {description} | Complete play, not in red zone, {yards} yards gained."
+
+
+def drive_results(*records):
+    plays = parse_plays(' '.join(records), game='401671789_ravens-chiefs')
+    drives = DriveTable(plays)
+    drives.add_game(0, len(plays))
+    return [RESULTS[result] for result in drives.result]
+
+
+def test_fumble_lost_on_a_sack_ends_the_drive():
+    results = drive_results(
+        record('14:53', '1st & 10 at BAL 20', "Sack: L.Jackson sacked at BLT 13 for -7 yards (C.Jones). "
+               "FUMBLES (C.Jones), RECOVERED by KC-F.Anudike-Uzomah at BLT 14."),
+        record('13:37', '1st & 10 at BAL 30', "Rush: D.Henry left end to BLT 34 for 4 yards (N.Bolton).", 4),
+    )
+    assert results[0] == 'Fumble'
+
+
+def test_fumble_recovered_by_the_offense_is_not_a_turnover():
+    results = drive_results(
+        record('14:53', '1st & 10 at BAL 20', "Rush: D.Henry right tackle to BLT 24 for 4 yards. "
+               "FUMBLES (C.Jones), recovered by BLT-P.Mekari at BLT 24.", 4),
+        record('14:10', '2nd & 6 at BAL 24', "Rush: D.Henry left end to BLT 30 for 6 yards (N.Bolton).", 6),
+    )
+    assert results == ['Unknown']
+
+
+def test_interception_logged_as_an_incompletion():
+    results = drive_results(
+        record('5:37', '1st & 10 at BAL 30', "Pass Incompletion: (Shotgun) L.Jackson pass deep left intended for "
+               "M.Andrews INTERCEPTED by C.Taylor-Britt at CIN 43."),
+        record('5:30', '1st & 10 at BAL 25', "Rush: D.Henry left end to BLT 30 for 5 yards (N.Bolton).", 5),
+    )
+    assert results[0] == 'Interception'
+
+
+def game(*records):
+    plays = parse_plays(' '.join(records), game='401671789_ravens-chiefs')
+    return drive_ranges(plays, 0, len(plays))
+
+
+def test_drive_ranges_split_on_scores_punts_and_kickoffs():
+    ranges = game(
+        record('10:00', '1st & 10 at BAL 25', "Rush: D.Henry left end to BLT 30 for 5 yards (N.Bolton).", 5),
+        record('9:20', '2nd & 5 at BAL 30', "Pass Incompletion: L.Jackson pass short left intended for Z.Flowers."),
+        record('9:15', '3rd & 5 at BAL 30', "Pass Reception: L.Jackson pass short right to M.Andrews to BLT 33 "
+               "for 3 yards (J.Reid).", 3),
+        record('8:30', '4th & 2 at BAL 33', "Punt: J.Stout punts 45 yards to KC 22, fair catch by M.Hardman."),
+        record('5:55', 'N/A', "Kickoff: H.Butker kicks 65 yards from KC 35 to end zone, Touchback to the BLT 30."),
+        record('5:55', '1st & 10 at BAL 30', "Rushing Touchdown: L.Jackson left end for 70 yards, TOUCHDOWN.", 70),
+    )
+    assert ranges == [(0, 4), (4, 6)]
+
+
+def test_drive_ranges_continue_across_a_quarter_break_but_not_a_half():
+    ranges = game(
+        "Q1 | 0:30 | Ravens | 1st & 10 at BAL 25 | Rush: D.Henry left end to BLT 30 for 5 yards (N.Bolton). "
+        "| Complete play, not in red zone, 5 yards gained.",
+        "Q2 | 15:00 | Ravens | 2nd & 5 at BAL 30 | Rush: D.Henry right end to BLT 36 for 6 yards (N.Bolton). "
+        "| Complete play, not in red zone, 6 yards gained.",
+        "Q2 | 0:10 | Ravens | 1st & 10 at BAL 36 | Rush: D.Henry up the middle to BLT 40 for 4 yards (N.Bolton). "
+        "| Complete play, not in red zone, 4 yards gained.",
+        "Q3 | 15:00 | Ravens | 1st & 10 at BAL 25 | Rush: J.Hill left end to BLT 28 for 3 yards (N.Bolton). "
+        "| Complete play, not in red zone, 3 yards gained.",
+    )
+    assert ranges == [(0, 3), (3, 4)]
+
+
+def test_drive_ranges_end_on_a_turnover_on_downs():
+    ranges = game(
+        record('3:00', '4th & 2 at KC 40', "Rush: D.Henry left end to KC 39 for 1 yard (N.Bolton).", 1),
+        record('2:50', '1st & 10 at KC 25', "Rush: D.Henry left end to KC 30 for 5 yards (N.Bolton).", 5),
+    )
+    assert ranges == [(0, 1), (1, 2)]
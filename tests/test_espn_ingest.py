@@ -0,0 +1,43 @@
+from espn_ingest import json_records, csv_records, is_play_by_play_csv, game_week
+
+SUMMARY = {
+    'header': {'week': {'number': 3}, 'competitions': [{'competitors': [
+        {'homeAway': 'away', 'team': {'id': '33', 'shortDisplayName': 'Ravens'}},
+        {'homeAway': 'home', 'team': {'id': '12', 'shortDisplayName': 'Chiefs'}},
+    ]}]},
+    'drives': {'previous': [{'plays': [
+        {'sequenceNumber': '2', 'type': {'text': 'Sack'}, 'period': {'number': 1}, 'clock': {'displayValue': '14:20'},
+         'text': '(Shotgun) L.Jackson sacked at BLT 18 for -7 yards (C.Jones).', 'statYardage': -7,
+         'start': {'team': {'id': '33'}, 'downDistanceText': '2nd & 6 at BAL 25', 'yardsToEndzone': 75}},
+        {'sequenceNumber': '1', 'type': {'text': 'Pass Reception'}, 'period': {'number': 1},
+         'clock': {'displayValue': '15:00'}, 'text': 'L.Jackson pass short right to Z.Flowers for 4 yards | (J.Reid).',
+         'statYardage': 4, 'airYards': 2,
+         'start': {'team': {'id': '33'}, 'downDistanceText': '1st & 10 at BAL 21', 'yardsToEndzone': 79}},
+    ]}]},
+}
+
+
+def test_json_plays_map_onto_play_records_in_sequence_order():
+    assert json_records(SUMMARY) == [
+        "Q1 | 15:00 | Ravens | 1st & 10 at BAL 21 | Pass Reception: L.Jackson pass short right to Z.Flowers for "
+        "4 yards / (J.Reid). | Complete play, not in red zone, 4 yards gained, 2 air yards.",
+        "Q1 | 14:20 | Ravens | 2nd & 6 at BAL 25 | Sack: (Shotgun) L.Jackson sacked at BLT 18 for -7 yards "
+        "(C.Jones). | Incomplete play, not in red zone, -7 yards gained.",
+    ]
+    assert game_week(SUMMARY) == 3
+
+
+def test_csv_rows_map_onto_play_records():
+    row = {'qtr': '4', 'time': '125', 'posteam': 'KC', 'down': '3', 'ydstogo': '4', 'yrdln': 'BAL 12',
+           'yardline_100': '12', 'play_type': 'Rush', 'desc': 'I.Pacheco up the middle to BAL 9 for 3 yards.',
+           'yards_gained': '3', 'week': '7'}
+    assert is_play_by_play_csv(row)
+    assert list(csv_records([row])) == [
+        "Q4 | 2:05 | Chiefs | 3rd & 4 at BAL 12 | Rush: I.Pacheco up the middle to BAL 9 for 3 yards. "
+        "| Complete play, in red zone, 3 yards gained."
+    ]
+    assert game_week(row) == 7
+
+
+def test_rows_without_quarter_clock_or_text_are_dropped():
+    assert list(csv_records([{'qtr': '1', 'time': '', 'desc': 'Timeout #1 by BAL.'}])) == []
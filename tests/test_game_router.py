@@ -0,0 +1,41 @@
+from game_router import GameRouter, mentioned_teams, parse_game_name, parse_weeks
+
+SHARDS = {
+    '401671623_broncos-ravens_context.pdf': {'week': 4},
+    '401671624_raiders-ravens_context.pdf': {'week': 2},
+    '401671625_commanders-ravens_context.pdf': {'week': 6},
+    '401671789_ravens-chiefs_context.pdf': {'week': 1},
+    '401671700_chiefs-bengals_context.pdf': {'week': 2},
+    'roster.csv': {'week': None},
+}
+
+
+def test_game_names_weeks_and_teams():
+    assert parse_game_name('401671789_ravens-chiefs_context.pdf') == ('401671789', {'Ravens', 'Chiefs'})
+    assert parse_game_name('roster.csv') == (None, set())
+    assert parse_weeks("weeks 3-5 and week 9") == {3, 4, 5, 9}
+    assert mentioned_teams("How did BAL do in Kansas City? no idea") == {'Ravens', 'Chiefs'}
+
+
+def test_routes_by_game_id_team_and_matchup():
+    router = GameRouter(SHARDS)
+    assert router.focus_team == 'Ravens'
+    assert router.route("what happened in 401671624") == {'401671624_raiders-ravens_context.pdf'}
+    assert router.route("Bengals red zone plays") == {'401671700_chiefs-bengals_context.pdf'}
+    assert router.route("Ravens vs Chiefs") == {'401671789_ravens-chiefs_context.pdf'}
+
+
+def test_routes_by_week_and_recent_games():
+    router = GameRouter(SHARDS)
+    assert router.route("Ravens in week 2") == {'401671624_raiders-ravens_context.pdf'}
+    assert router.route("last 2 games") == {'401671623_broncos-ravens_context.pdf',
+                                            '401671625_commanders-ravens_context.pdf'}
+    assert router.route("Ravens first two games") == {'401671789_ravens-chiefs_context.pdf',
+                                                      '401671624_raiders-ravens_context.pdf'}
+
+
+def test_questions_that_match_nothing_or_everything_are_not_routed():
+    router = GameRouter(SHARDS)
+    assert router.route("best third down plays") is None
+    assert router.route("Steelers blitzes") is None
+    assert router.route("week 12") is None
@@ -0,0 +1,89 @@
+import os
+import pytest
+from ingest_cache import IngestCache
+
+
+@pytest.fixture
+def cache(tmp_path):
+    return IngestCache(str(tmp_path / 'cache'), max_bytes=1 << 20, version='3')
+
+
+def source(tmp_path, name, data):
+    path = tmp_path / name
+    path.write_bytes(data)
+    return str(path)
+
+
+def test_pages_round_trip_and_key_follows_content_and_version(cache, tmp_path):
+    path = source(tmp_path, 'game.pdf', b'%PDF one')
+    key = cache.key_for(path)
+    cache.put(key, path, ["page one", "page two"])
+    assert list(cache.iter_pages(key)) == ["page one", "page two"]
+    assert IngestCache(cache.cache_dir, version='4').key_for(path) != key
+    assert cache.key_for(source(tmp_path, 'game.pdf', b'%PDF two')) != key
+
+
+def test_truncated_entry_is_dropped_and_raises(cache, tmp_path):
+    path = source(tmp_path, 'game.pdf', b'%PDF one')
+    key = cache.key_for(path)
+    cache.put(key, path, ["page one", "page two"])
+    entry = cache._entry_path(key)
+    with open(entry, 'r', encoding='utf-8') as file:
+        lines = file.readlines()
+    with open(entry, 'w', encoding='utf-8') as file:
+        file.writelines(lines[:2])
+    with pytest.raises(ValueError):
+        list(cache.iter_pages(key))
+    assert not cache.has(key)
+
+
+def test_corrupt_entry_is_dropped_and_raises(cache, tmp_path):
+    path = source(tmp_path, 'game.pdf', b'%PDF one')
+    key = cache.key_for(path)
+    cache.put(key, path, ["page one"])
+    with open(cache._entry_path(key), 'a', encoding='utf-8') as file:
+        file.write("{not json\n")
+    # The trailer was already read, so anything after it is ignored
+    assert list(cache.iter_pages(key)) == ["page one"]
+    with open(cache._entry_path(key), 'w', encoding='utf-8') as file:
+        file.write('{"key": 1}\n{"text": "page one"}\n{not json\n')
+    with pytest.raises(ValueError):
+        list(cache.iter_pages(key))
+    assert not cache.has(key)
+
+
+def test_failed_write_leaves_no_entry(cache, tmp_path):
+    path = source(tmp_path, 'game.pdf', b'%PDF one')
+    key = cache.key_for(path)
+
+    def pages():
+        yield "page one"
+        raise RuntimeError("extraction failed")
+    with pytest.raises(RuntimeError):
+        cache.put(key, path, pages())
+    assert not cache.has(key)
+    assert os.listdir(cache.cache_dir) == []
+
+
+def test_evict_drops_least_recently_used_entries(cache, tmp_path):
+    keys = []
+    for i in range(3):
+        path = source(tmp_path, f"game{i}.pdf", f"%PDF {i}".encode())
+        keys.append(cache.key_for(path))
+        cache.put(keys[-1], path, ["x" * 1000])
+        os.utime(cache._entry_path(keys[-1]), (1000 + i, 1000 + i))
+    # Reading the oldest entry makes it the most recently used
+    list(cache.iter_pages(keys[0]))
+    cache.max_bytes = cache.stats()['bytes'] - 1
+    assert cache.evict() == 1
+    assert [cache.has(key) for key in keys] == [True, False, True]
+
+
+def test_invalidate_and_clear(cache, tmp_path):
+    for name in ('a.pdf', 'b.pdf'):
+        path = source(tmp_path, name, name.encode())
+        cache.put(cache.key_for(path), path, ["page"])
+    assert cache.invalidate('/elsewhere/a.pdf') == 1
+    assert cache.stats()['entries'] == 1
+    assert cache.clear() == 1
+    assert cache.stats()['entries'] == 0
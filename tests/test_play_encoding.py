@@ -0,0 +1,70 @@
+from play_parser import parse_plays
+from corpus_index import CorpusIndex
+from play_encoding import CompactEncoder, compact_description, type_code
+
+CHIEFS = ' '.join([
+    "Q1 | 15:00 | Ravens | 1st & 10 at BAL 30 | Rush: (Shotgun) D.Henry left end to BLT 34 for 4 yards "
+    "(N.Bolton).... | Complete play, not in red zone, 4 yards gained.",
+    "Q1 | 14:22 | Ravens | 2nd & 6 at BAL 34 | Sack: (No Huddle, Shotgun) L.Jackson sacked at BLT 27 for -7 yards "
+    "(C.Jones). | Incomplete play, not in red zone, -7 yards gained.",
+    "Q2 | 1:05 | Chiefs | 1st & Goal at BAL 5 | Passing Touchdown: P.Mahomes pass short left to T.Kelce for 5 yards, "
+    "TOUCHDOWN. | Complete play, in red zone, 5 yards gained.",
+])
+BENGALS = ("Q3 | 9:00 | Ravens | 3rd & 2 at KC 40 | Rush: D.Henry up the middle to KC 38 for 2 yards (N.Bolton). "
+           "| Complete play, not in red zone, 2 yards gained.")
+
+
+def play_units():
+    index = CorpusIndex({
+        '401671789_ravens-chiefs_context.pdf': {'plays': parse_plays(CHIEFS, game='401671789_ravens-chiefs_context'),
+                                                'text': ''},
+        '401671790_ravens-bengals_context.pdf': {'plays': parse_plays(BENGALS, game='401671790_ravens-bengals_context'),
+                                                 'text': ''},
+    })
+    return index, [index.units[unit_id] for unit_id in index.by_granularity['play']]
+
+
+def encode(index, units):
+    encoder = CompactEncoder(index.plays, units)
+    return encoder.assemble("Plays:", [(unit, encoder.render(unit)) for unit in units]).split("\n")
+
+
+def test_rows_are_grouped_under_game_lines_after_the_legend():
+    index, units = play_units()
+    lines = encode(index, units)
+    assert lines[1].startswith("Plays as rows: qtr|clock|off|down&dist|ytg|type|yds|flags|play under")
+    assert lines[:1] + lines[2:] == [
+        "Plays:",
+        "Types: PTD=Passing Touchdown, R=Rush, SK=Sack",
+        "@ 401671789_ravens-chiefs",
+        "1|15:00|BAL|1&10|70|R|4||SG D.Henry left end (N.Bolton)",
+        "1|14:22|BAL|2&6|66|SK|-7|X|NH SG L.Jackson sacked (C.Jones).",
+        "2|1:05|KC|1&G|5|PTD|5|Z|P.Mahomes pass short left to T.Kelce, TOUCHDOWN.",
+        "@ 401671790_ravens-bengals",
+        "3|9:00|BAL|3&2|40|R|2||D.Henry up the middle (N.Bolton).",
+    ]
+
+
+def test_single_offense_drops_the_offense_column():
+    index, units = play_units()
+    ravens = [unit for unit in units if index.plays.teams[index.plays.team[unit.play_start]] == 'Ravens']
+    lines = encode(index, ravens)
+    assert lines[1].startswith("Plays as rows: qtr|clock|down&dist|ytg|type|yds|flags|play under")
+    assert lines[2] == "Offense on every play: Ravens (BAL)"
+    assert lines[5] == "1|15:00|1&10|70|R|4||SG D.Henry left end (N.Bolton)"
+
+
+def test_drive_rows_get_a_header_without_the_doc_id():
+    index, _ = play_units()
+    drive = index.units[index.by_granularity['drive'][0]]
+    rows = CompactEncoder(index.plays, [drive]).render(drive).split("\n")
+    assert rows[0].startswith("# Drive 1: Q1 15:00-14:22")
+    assert rows[1:] == ["1|15:00|1&10|70|R|4||SG D.Henry left end (N.Bolton)",
+                        "1|14:22|2&6|66|SK|-7|X|NH SG L.Jackson sacked (C.Jones)."]
+
+
+def test_descriptions_keep_a_gain_that_differs_from_the_yards_column():
+    record = ("Q1 | 5:00 | Ravens | 1st & 10 at BAL 30 | Rush: D.Henry left end to BLT 40 for 10 yards. PENALTY on "
+              "BLT, Holding, 10 yards. | Complete play, not in red zone, 0 yards gained.")
+    assert compact_description(record, 0) == "D.Henry left end for 10 yards. PENALTY on BLT, Holding, 10 yards."
+    assert type_code('Two Point Conversion') == 'TPC'
@@ -0,0 +1,50 @@
+from play_parser import parse_plays
+from play_index import PlayerIndex, OPENING_SCRIPT_PLAYS, parse_situation, parse_time_window
+
+PLAYS = ' '.join([
+    "Q1 | 9:39 | Ravens | 3rd & 1 at KC 24 | Rush: (Shotgun) L.Jackson left end ran ob at KC 13 for 11 yards "
+    "(J.Reid). | Complete play, not in red zone, 11 yards gained.",
+    "Q1 | 8:14 | Ravens | 2nd & 2 at KC 5 | Rushing Touchdown: D.Henry right guard for 5 yards, TOUCHDOWN. "
+    "| Complete play, in red zone, 5 yards gained.",
+])
+
+
+def test_full_names_resolve_from_the_play_text():
+    players = PlayerIndex(parse_plays(PLAYS), aliases={})
+    assert players.resolve("How did Lamar Jackson and Derrick Henry run?") == ['L.Jackson', 'D.Henry']
+
+
+def test_nicknames_come_from_the_aliases():
+    players = PlayerIndex(parse_plays(PLAYS), aliases={'king henry': 'D.Henry', 'lamar': 'L.Jackson',
+                                                       'nobody': 'N.Body'})
+    assert players.resolve("lamar and king henry") == ['L.Jackson', 'D.Henry']
+    assert 'nobody' not in players.aliases
+
+
+def test_parse_situation_reads_down_distance_zone_and_teams():
+    filters = parse_situation("Ravens 3rd and short in the red zone against the Chiefs")
+    assert filters == {'down': {3}, 'distance': {'short'}, 'red_zone': {True},
+                       'offense': {'Ravens'}, 'defense': {'Chiefs'}}
+
+
+def test_parse_situation_team_defense_is_the_defense():
+    filters = parse_situation("Chiefs defense on 2nd & 8 in the 4th quarter")
+    assert filters == {'down': {2}, 'distance': {'long'}, 'quarter': {4}, 'defense': {'Chiefs'}}
+
+
+def test_parse_situation_halves_and_categories():
+    assert parse_situation("first half runs") == {'quarter': {1, 2}, 'category': {'rush'}}
+    assert parse_situation("what happened in overtime")['quarter'] == {5}
+
+
+def test_parse_time_window():
+    assert parse_time_window("last 5 minutes of the 4th") == {'windows': [(3300, 3600)], 'opening': None}
+    assert parse_time_window("first 3 minutes of the second half")['windows'] == [(1800, 1980)]
+    assert parse_time_window("two-minute drill")['windows'] == [(1680, 1800), (3480, 3600)]
+    assert parse_time_window("their opening script") == {'windows': [], 'opening': OPENING_SCRIPT_PLAYS}
+    assert parse_time_window("what did they do on 3rd down") == {'windows': [], 'opening': None}
+
+
+def test_parse_situation_reads_team_names_with_digits():
+    assert parse_situation("How do the 49ers run on 3rd down?")['offense'] == {'49ers'}
+    assert parse_situation("Bears passes against the 49ers")['defense'] == {'49ers'}
@@ -0,0 +1,87 @@
+from play_parser import (PASS_DEPTHS, PASS_DIRECTIONS, NO_AIR_YARDS, PlayTable, iter_records, parse_plays, parse_record,
+                         split_records)
+
+RECORDS = [
+    "Q1 | 15:00 | Chiefs | N/A | Kickoff: H.Butker kicks 65 yards from KC 35 to end zone, Touchback to the BLT 30. "
+    "| Complete play, not in red zone, 0 yards gained.",
+    "Q1 | 15:00 | Ravens | 1st & 10 at BAL 30 | Rush: D.Henry left end to BLT 34 for 4 yards (N.Bolton). "
+    "| Complete play, not in red zone, 4 yards gained.",
+    "Q1 | 14:22 | Ravens | 2nd & 6 at BAL 34 | Pass Incompletion: L.Jackson pass incomplete short left to "
+    "Z.Flowers. | Complete play, not in red zone, 0 yards gained.",
+]
+
+
+def cut(record, *words):
+    """A record broken into pages after the given word counts, as PyPDF2 breaks them"""
+    tokens = record.split(' ')
+    bounds = [0, *words, len(tokens)]
+    return [' '.join(tokens[start:end]) for start, end in zip(bounds, bounds[1:])]
+
+
+def test_record_split_across_a_page_break_is_rejoined():
+    first, second = cut(RECORDS[0], 16)
+    pages = [
+        "Ravens at Chiefs\nPlay-by-play\n" + first,
+        second + "\n" + RECORDS[1],
+        "\n" + RECORDS[2],
+    ]
+    chunks = list(iter_records(pages))
+    assert chunks == [('preamble', 'Ravens at Chiefs Play-by-play')] + [('play', record) for record in RECORDS]
+    assert [chunk for kind, chunk in chunks if kind == 'play'] == split_records(' '.join(pages))[1]
+
+
+def test_record_prefix_cut_by_a_page_break_is_not_preamble():
+    first, second = cut(RECORDS[0], 2)
+    pages = ["Game summary " + first, second]
+    assert list(iter_records(pages)) == [('preamble', 'Game summary'), ('play', RECORDS[0])]
+
+
+def test_record_running_over_a_whole_page():
+    record = RECORDS[1]
+    pages = cut(record, 5, 12)
+    assert list(iter_records(pages)) == [('play', record)]
+
+
+def test_parse_record_reads_pass_depth_direction_and_air_yards():
+    fields = parse_record("Q1 | 14:22 | Ravens | 2nd & 6 at BAL 34 | Pass Reception: L.Jackson pass deep left to "
+                          "Z.Flowers to KC 40 for 26 yards (J.Reid). | Complete play, not in red zone, 26 yards "
+                          "gained, 18 air yards.")
+    assert (PASS_DEPTHS[fields['pass_depth']], PASS_DIRECTIONS[fields['pass_direction']]) == ('deep', 'left')
+    assert (fields['yards'], fields['air_yards']) == (26, 18)
+
+    fields = parse_record("Q1 | 13:40 | Ravens | 3rd & 6 at BAL 34 | Pass Incompletion: L.Jackson pass incomplete "
+                          "short middle intended for M.Andrews. | Complete play, not in red zone, 0 yards gained.")
+    assert (PASS_DEPTHS[fields['pass_depth']], PASS_DIRECTIONS[fields['pass_direction']]) == ('short', 'middle')
+    assert fields['air_yards'] == NO_AIR_YARDS
+
+    fields = parse_record("Q1 | 13:00 | Ravens | 1st & 10 at BAL 40 | Rush: D.Henry left end to BLT 44 for 4 yards. "
+                          "| Complete play, not in red zone, 4 yards gained.")
+    assert (fields['pass_depth'], fields['pass_direction']) == (-1, -1)
+
+
+def test_split_records_rejoins_a_record_broken_by_a_page_break():
+    text = "Ravens at Chiefs\n" + RECORDS[0].replace("Touchback to the BLT 30.", "Touchback to\n\nthe BLT 30.")
+    assert split_records(text + "\n" + RECORDS[1]) == ('Ravens at Chiefs', RECORDS[:2])
+
+
+def test_parse_record_fields():
+    fields = parse_record("Q2 | 2:05 | Ravens | 3rd & Goal at KC 4 | Pass Reception: L.Jackson pass short right to "
+                          "M.Andrews to KC 1 for 3 yards (J.Reid). | Complete play, in red zone, 3 yards gained.")
+    assert {name: fields[name] for name in ('quarter', 'clock', 'game_seconds', 'team', 'down', 'distance',
+                                            'goal_to_go', 'field_side', 'yards_to_goal', 'play_type', 'yards',
+                                            'red_zone', 'complete', 'players')} == {
+        'quarter': 2, 'clock': 125, 'game_seconds': 1675, 'team': 'Ravens', 'down': 3, 'distance': 4,
+        'goal_to_go': 1, 'field_side': 'KC', 'yards_to_goal': 4, 'play_type': 'Pass Reception', 'yards': 3,
+        'red_zone': 1, 'complete': 1, 'players': ['L.Jackson', 'M.Andrews', 'J.Reid'],
+    }
+    kickoff = parse_record(RECORDS[0])
+    assert (kickoff['down'], kickoff['yards_to_goal'], kickoff['field_side']) == (-1, -1, '')
+    assert parse_record("Q1 | 15:00 | not a record") is None
+
+
+def test_play_table_concat_keeps_rows_and_strings():
+    first = parse_plays(' '.join(RECORDS[:2]), game='401671789_ravens-chiefs')
+    second = parse_plays(RECORDS[2], game='401671790_ravens-bengals')
+    combined = PlayTable.concat([first, second])
+    assert [combined.row(i) for i in range(3)] == [first.row(0), first.row(1), second.row(0)]
+    assert combined.players.values == ['H.Butker', 'D.Henry', 'N.Bolton', 'L.Jackson', 'Z.Flowers']
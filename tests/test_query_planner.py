@@ -0,0 +1,50 @@
+from query_planner import plan_query
+
+
+def test_small_talk():
+    assert plan_query("hi there").steps == ['greet']
+    assert plan_query("thanks!").steps == ['reply']
+
+
+def test_counted_questions_are_answered_from_the_stats():
+    plan = plan_query("how many passes on 3rd down by down")
+    assert plan.intent == 'stat'
+    assert plan.steps == ['stats']
+    assert plan.slots['down'] == [3]
+
+
+def test_lookups_skip_the_model():
+    assert plan_query("show me 3rd down plays in the red zone").steps == ['lookup']
+    assert plan_query("list the Ravens drives").steps == ['drive_chart']
+
+
+def test_judgement_goes_to_the_model():
+    plan = plan_query("why do the Ravens run on 3rd down")
+    assert plan.intent == 'scouting'
+    assert plan.needs_llm()
+    assert plan.slots['team'] == ['Ravens']
+
+
+def test_opponents_fill_their_own_slot():
+    plan = plan_query("why do the Ravens run on 3rd down against the Chiefs")
+    assert plan.slots['team'] == ['Ravens']
+    assert plan.slots['opponent'] == ['Chiefs']
+
+
+def test_scheduling_comes_first():
+    assert plan_query("Can we book a call tomorrow at 3pm?").steps == ['schedule', 'llm']
+    plan = plan_query("Can we book a call tomorrow at 3pm about 3rd down?")
+    assert plan.intent == 'scheduling'
+    assert plan.steps == ['schedule', 'retrieve', 'llm']
+
+
+def test_scheduling_needs_no_time_when_it_asks_for_a_call():
+    assert plan_query("Can I get a booking for Thursday?").intent == 'scheduling'
+    assert plan_query("I'd like this scheduled").intent == 'scheduling'
+    assert plan_query("Set up a consultation next week").intent == 'scheduling'
+    assert plan_query("Let's talk tomorrow at 10:30").intent == 'scheduling'
+
+
+def test_play_calls_and_playbooks_are_not_scheduling():
+    assert plan_query("What is the Ravens' next play call on 3rd down?").intent != 'scheduling'
+    assert plan_query("Describe the Ravens playbook in the red zone").intent != 'scheduling'
@@ -0,0 +1,48 @@
+from play_parser import parse_plays
+from corpus_index import CorpusIndex
+from reports import ReportStore
+
+CHIEFS = ("Q1 | 15:00 | Ravens | 1st & 10 at BAL 30 | Rush: D.Henry left end to BLT 34 for 4 yards (N.Bolton). "
+          "| Complete play, not in red zone, 4 yards gained.")
+BENGALS = ("Q1 | 15:00 | Ravens | 1st & 10 at BAL 30 | Pass Reception: L.Jackson pass short right to Z.Flowers to "
+           "BLT 40 for 10 yards (J.Reid). | Complete play, not in red zone, 10 yards gained.")
+SIGNATURES = {'401671789_ravens-chiefs.pdf': (100, 1), '401671790_ravens-bengals.pdf': (200, 1)}
+
+
+def game_index(**games):
+    records = {'401671789_ravens-chiefs.pdf': CHIEFS, '401671790_ravens-bengals.pdf': BENGALS}
+    records.update(games)
+    return CorpusIndex({doc_id: {'plays': parse_plays(text, game=doc_id[:-4]), 'text': ''}
+                        for doc_id, text in records.items() if text})
+
+
+def test_refresh_summarizes_only_new_and_changed_games(tmp_path):
+    reports = ReportStore(str(tmp_path / 'reports.json'))
+    assert reports.refresh(game_index(), SIGNATURES) == 2
+    assert reports.teams['Ravens']['plays'] == 2
+    bengals = reports.games['401671790_ravens-bengals.pdf']
+    assert reports.refresh(game_index(), SIGNATURES) == 0
+
+    longer = CHIEFS + " " + CHIEFS.replace('15:00', '14:30')
+    changed = dict(SIGNATURES, **{'401671789_ravens-chiefs.pdf': (150, 2)})
+    assert reports.refresh(game_index(**{'401671789_ravens-chiefs.pdf': longer}), changed) == 1
+    assert reports.games['401671790_ravens-bengals.pdf'] is bengals
+    assert reports.teams['Ravens']['plays'] == 3
+
+
+def test_removed_games_leave_the_season_views(tmp_path):
+    reports = ReportStore(str(tmp_path / 'reports.json'))
+    reports.refresh(game_index(), SIGNATURES)
+    assert reports.refresh(game_index(**{'401671790_ravens-bengals.pdf': None}), SIGNATURES) == 0
+    assert reports.teams['Ravens']['games'] == 1
+    assert 'Z.Flowers' not in reports.players
+
+
+def test_saved_reports_are_read_back_instead_of_recomputed(tmp_path):
+    path = str(tmp_path / 'reports.json')
+    ReportStore(path).refresh(game_index(), SIGNATURES)
+    reports = ReportStore(path)
+    assert reports.teams['Ravens']['games'] == 2
+    assert reports.refresh(game_index(), SIGNATURES) == 0
+    # A game without a signature is always summarized again
+    assert reports.refresh(game_index(), {}) == 2
@@ -0,0 +1,48 @@
+from play_parser import parse_plays
+from corpus_index import CorpusIndex
+from result_cache import ResultCache, normalize_query
+from doc_processor import DocumentProcessor
+
+PLAYS = ' '.join([
+    "Q1 | 15:00 | Ravens | 1st & 10 at BAL 30 | Rush: D.Henry left end to BLT 34 for 4 yards (N.Bolton). "
+    "| Complete play, not in red zone, 4 yards gained.",
+    "Q1 | 14:22 | Ravens | 2nd & 6 at BAL 34 | Pass Reception: L.Jackson pass deep left to Z.Flowers to KC 40 "
+    "for 26 yards (J.Reid). | Complete play, not in red zone, 26 yards gained.",
+])
+
+
+def test_normalize_query_keeps_abbreviations_and_player_names():
+    assert normalize_query("  How did L.Jackson do vs KC?  ") == "how did L.Jackson do vs KC"
+    assert normalize_query("Deep passes.") == normalize_query("deep   PASSES")
+
+
+def test_lru_eviction_and_expiry(monkeypatch):
+    now = [100.0]
+    monkeypatch.setattr('result_cache.time.monotonic', lambda: now[0])
+    cache = ResultCache(max_entries=2, ttl=60)
+    cache.put('a', 1)
+    cache.put('b', 2)
+    assert cache.get('a') == 1
+    cache.put('c', 3)
+    assert cache.get('b') is None
+    now[0] += 61
+    assert cache.get('a') is None
+    stats = cache.stats()
+    assert (stats['hits'], stats['misses'], stats['evictions'], stats['expired']) == (1, 2, 1, 1)
+
+
+def test_results_are_dropped_when_the_generation_changes(tmp_path, monkeypatch):
+    monkeypatch.setenv('INGEST_ARTIFACT_DIR', str(tmp_path))
+    monkeypatch.setenv('INGEST_CACHE', '0')
+    processor = DocumentProcessor(autoload=False)
+    processor.index = CorpusIndex({'401671789_ravens-chiefs': {'plays': parse_plays(PLAYS), 'text': ''}})
+    first = processor.search_units("Deep passes")
+    assert processor.search_units("deep passes?") is first
+    assert processor.retrieval_cache_stats()['hits'] == 1
+
+    processor.index = CorpusIndex({'401671789_ravens-chiefs': {'plays': parse_plays(PLAYS), 'text': ''}})
+    processor.advance_generation()
+    assert processor.retrieval_cache_stats()['entries'] == 0
+    index, units = processor.search_units("Deep passes")
+    assert index is processor.index and index is not first[0]
+    assert units
@@ -0,0 +1,70 @@
+from play_parser import parse_plays
+from play_index import PlayerIndex
+from stats_engine import StatsEngine, parse_stats_query, parse_target_query
+
+
+def record(team, situation, description, yards=0):
+    return f"Q1 | 10:00 | {team} | {situation} | {description} | Complete play, not in red zone, {yards} yards gained."
+
+
+def engine():
+    plays = parse_plays(' '.join([
+        record('Ravens', '3rd & 2 at BAL 30', "Rush: D.Henry left end to BLT 35 for 5 yards (N.Bolton).", 5),
+        record('Ravens', '1st & 10 at BAL 35', "Pass Reception: L.Jackson pass short right to Z.Flowers to BLT 47 "
+               "for 12 yards (J.Reid).", 12),
+        record('Ravens', '4th & 3 at BAL 47', "Punt: J.Stout punts 45 yards to KC 8, fair catch by M.Hardman."),
+        record('Chiefs', '3rd & 8 at KC 8', "Pass Incompletion: P.Mahomes pass short left intended for T.Kelce."),
+    ]), game='401671789_ravens-chiefs')
+    return StatsEngine(plays)
+
+
+def count(stats, filters):
+    mask, applied = stats.mask(filters)
+    return int(mask.sum()), applied
+
+
+def test_only_snaps_are_counted_by_default():
+    assert count(engine(), {})[0] == 3
+
+
+def test_down_offense_and_defense_filters():
+    stats = engine()
+    assert count(stats, {'down': {3}})[0] == 2
+    assert count(stats, {'down': {3}, 'offense': {'Ravens'}})[0] == 1
+    assert count(stats, {'defense': {'Ravens'}})[0] == 1
+
+
+def test_a_team_missing_from_the_corpus_is_not_applied():
+    total, applied = count(engine(), {'offense': {'Bears'}})
+    assert total == 3
+    assert 'offense' not in applied
+
+
+def test_pass_share_keeps_the_runs():
+    group_by, filters = parse_stats_query("How often do the Ravens pass?")
+    result = engine().aggregate(group_by, filters)
+    assert result['plays'] == 2
+    assert {row['group']['category']: row['plays'] for row in result['groups']} == {'pass': 1, 'rush': 1}
+
+
+def test_targets_by_receiver_with_adot_and_heatmap():
+    plays = parse_plays(' '.join([
+        record('Ravens', '1st & 10 at BAL 30', "Pass Reception: L.Jackson pass deep left to Z.Flowers to KC 44 for "
+               "26 yards (J.Reid).", 26).replace('gained.', 'gained, 18 air yards.'),
+        record('Ravens', '1st & 10 at KC 44', "Pass Incompletion: L.Jackson pass incomplete deep right intended for "
+               "Z.Flowers."),
+        record('Ravens', '2nd & 10 at KC 44', "Pass Reception: L.Jackson pass short middle to M.Andrews to KC 38 for "
+               "6 yards (N.Bolton).", 6),
+        record('Ravens', '3rd & 4 at KC 38', "Sack: L.Jackson sacked at KC 45 for -7 yards (C.Jones).", -7),
+    ]), game='401671789_ravens-chiefs')
+    group_by, filters = parse_target_query("Ravens air yards by receiver")
+    result = StatsEngine(plays, PlayerIndex(plays, aliases={})).targets(group_by, filters)
+    assert result['plays'] == 3
+    flowers, andrews = result['groups']
+    assert flowers['group'] == {'target': 'Z.Flowers'}
+    assert (flowers['targets'], flowers['catches'], flowers['yards']) == (2, 1, 26)
+    assert (flowers['adot'], flowers['air_yards_known']) == (18.0, 1)
+    assert flowers['depth'] == {'short': 0.0, 'deep': 1.0}
+    assert flowers['heatmap']['deep left'] == {'targets': 1, 'catches': 1, 'yards': 26}
+    assert flowers['heatmap']['deep right'] == {'targets': 1, 'catches': 0, 'yards': 0}
+    assert (andrews['targets'], andrews['catch_rate'], andrews['adot']) == (1, 1.0, None)
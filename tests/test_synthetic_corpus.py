@@ -0,0 +1,35 @@
+import pytest
+from synthetic_corpus import FLAVORS, write_corpus_dir
+from doc_processor import DocumentProcessor
+
+
+@pytest.fixture
+def load_flavor(tmp_path, monkeypatch):
+    """Generate the same games in one flavor and load them the way the app does"""
+    monkeypatch.setenv('INGEST_CACHE', '0')
+    monkeypatch.setenv('INGEST_WORKERS', '1')
+    monkeypatch.setenv('CORPUS_STORE', '0')
+    monkeypatch.setenv('REPORT_STORE', '0')
+
+    def load(flavor):
+        monkeypatch.setenv('INGEST_ARTIFACT_DIR', str(tmp_path / f"{flavor}-artifacts"))
+        docs_dir = tmp_path / flavor
+        write_corpus_dir(str(docs_dir), flavor, teams=4, weeks=2, seed=7, limit=3)
+        return DocumentProcessor(str(docs_dir)).index
+    return load
+
+
+def rows(plays):
+    return [{name: value for name, value in plays.row(i).items() if name != 'text'} for i in range(len(plays))]
+
+
+def test_every_flavor_parses_to_the_same_play_table(load_flavor):
+    tables = {flavor: rows(load_flavor(flavor).plays) for flavor in FLAVORS}
+    assert tables['pdf']
+    assert tables['text'] == tables['pdf']
+    assert tables['json'] == tables['pdf']
+
+
+def test_json_games_carry_their_week(load_flavor):
+    index = load_flavor('json')
+    assert sorted(shard['week'] for shard in index.shards.values()) == [1, 1, 2]
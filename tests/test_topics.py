@@ -0,0 +1,26 @@
+import os
+import re
+from topics import BUTTON_TOPICS, resolve_topic
+
+TEMPLATE = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'templates', 'index.html')
+
+
+def button_messages():
+    with open(TEMPLATE, encoding='utf-8') as f:
+        return re.findall(r"class=\"option-button\" onclick=\"sendMessage\('([^']+)'\)", f.read())
+
+
+def test_every_button_resolves_to_a_topic():
+    messages = button_messages()
+    assert messages
+    for message in messages:
+        assert resolve_topic(message) in BUTTON_TOPICS, message
+
+
+def test_team_report_button():
+    assert resolve_topic('Tell me about Team-Level Behavior Report') == 'team report'
+
+
+def test_typed_questions_are_not_topics():
+    assert resolve_topic('How often do the Ravens pass on 3rd down?') is None
+    assert resolve_topic('Tell me about the Ravens red zone offense') is None
@@ -0,0 +1,51 @@
+from play_parser import parse_plays
+from corpus_index import CorpusIndex
+from vector_index import features, strip_noise
+
+PLAYS = ' '.join([
+    "Q1 | 15:00 | Ravens | 1st & 10 at BAL 30 | Rush: D.Henry left end to BLT 34 for 4 yards (N.Bolton). "
+    "| Complete play, not in red zone, 4 yards gained.",
+    "Q1 | 14:22 | Ravens | 2nd & 6 at BAL 34 | Rush: J.Hill up the middle to BLT 36 for 2 yards (C.Jones). "
+    "| Complete play, not in red zone, 2 yards gained.",
+    "Q1 | 13:40 | Ravens | 3rd & 4 at BAL 36 | Pass Reception: L.Jackson pass deep right to Z.Flowers to KC 20 "
+    "for 44 yards (J.Reid). | Complete play, not in red zone, 44 yards gained.",
+    "Q1 | 13:00 | Ravens | 1st & 10 at KC 20 | Rush: D.Henry right end to KC 15 for 5 yards (N.Bolton). "
+    "| Complete play, in red zone, 5 yards gained.",
+    "Q1 | 12:20 | Ravens | 2nd & 5 at KC 15 | Rush: J.Hill left end to KC 9 for 6 yards (C.Jones). "
+    "| Complete play, in red zone, 6 yards gained.",
+])
+
+
+def game_index():
+    return CorpusIndex({'401671789_ravens-chiefs.pdf': {'plays': parse_plays(PLAYS, game='401671789_ravens-chiefs'),
+                                                        'text': ''},
+                        'scouting.txt': 'Film notes: they love to attack the perimeter on early downs.'})
+
+
+def test_concepts_and_noise():
+    assert strip_noise("D.Henry left end to BLT 34 for 4 yards").split() == ['left', 'end', 'to', 'for', 'yards']
+    bag = features("How do they attack the edge?")
+    assert bag['concept:edge_run'] == 1
+
+
+def test_plays_sharing_a_concept_rank_above_the_rest():
+    index = game_index()
+    ranked = [unit_id for _, unit_id in index.vectors.search("outside runs to the edge", 'play', 10)]
+    plays = [index.units[unit_id].play_start for unit_id in ranked if index.units[unit_id].play_start >= 0]
+    assert set(plays[:3]) == {0, 3, 4}
+
+
+def test_identical_stripped_plays_share_one_vector():
+    index = game_index()
+    # Plays 0 and 4 differ only in players, spots and yards; the passage adds one row
+    assert index.vectors.row_vector[0] == index.vectors.row_vector[4]
+    assert len(index.vectors.matrix) == len(index.plays)
+
+
+def test_candidates_and_unmatched_queries():
+    index = game_index()
+    play_ids = index.by_granularity['play']
+    assert [unit_id for _, unit_id in index.vectors.search("deep shot", 'play', 5, candidates=play_ids[:2])] == []
+    top = index.vectors.search("deep shot downfield", 'play', 1)
+    assert index.units[top[0][1]].play_start == 2
+    assert index.vectors.search("zzz qqq", 'play', 5) == []
@@ -0,0 +1,32 @@
+# Topics the chat buttons stand for
+BUTTON_TOPICS = ('team report', 'player summary', 'quarterback summary', 'routing tendencies', 'adot', 'about us')
+
+# Button labels as sent by the UI (templates/index.html), mapped to the topic they stand for
+TOPIC_ALIASES = {
+    'team-level behavior report': 'team report',
+    'team level behavior report': 'team report',
+    'player-level behavior summary': 'player summary',
+    'share me a player-level behavior summary': 'player summary',
+    'quarterback behavior summary': 'quarterback summary',
+    'routing tendicies by top pass target': 'routing tendencies',
+    'routing tendencies by top pass target': 'routing tendencies',
+    'average depth of target (adot) per receiver': 'adot',
+    'adot per receiver': 'adot',
+    'contact us': 'about us',
+}
+
+# Prefix most buttons put in front of their label
+BUTTON_PREFIX = 'tell me about '
+
+
+def strip_prefix(message):
+    """A message in lowercase without the "Tell me about" button prefix"""
+    text = message.strip().lower()
+    return text[len(BUTTON_PREFIX):] if text.startswith(BUTTON_PREFIX) else text
+
+
+def resolve_topic(message):
+    """Button topic a message stands for, or None when it is not one"""
+    topic = strip_prefix(message)
+    topic = TOPIC_ALIASES.get(topic, topic)
+    return topic if topic in BUTTON_TOPICS else None
@@ -0,0 +1,192 @@
+import re
+import zlib
+import numpy as np
+from search_index import tokenize
+from play_parser import PLAYER_NAME
+
+# Football concepts shared by questions and play descriptions. Any phrase fires
+# the concept on either side, so "attack the edge" meets "left end" / "right end".
+CONCEPTS = {
+    'edge_run': ('left end', 'right end', 'edge', 'outside run', 'outside zone', 'perimeter', 'sweep', 'toss',
+                 'stretch run', 'bounce outside'),
+    'interior_run': ('up the middle', 'left guard', 'right guard', 'inside run', 'between the tackles', 'interior',
+                     'dive', 'a gap'),
+    'tackle_run': ('left tackle', 'right tackle', 'off tackle', 'b gap', 'c gap'),
+    'deep_pass': ('pass deep', 'deep', 'downfield', 'vertical', 'shot play', 'bomb', 'go route', 'explosive',
+                  'stretch the field', 'air it out'),
+    'short_pass': ('pass short', 'quick game', 'underneath', 'dink', 'check down', 'checkdown', 'screen',
+                   'quick pass'),
+    'pressure': ('sacked', 'sack', 'pressure', 'blitz', 'hurried', 'scrambles', 'scramble', 'pass rush'),
+    'turnover': ('intercepted', 'interception', 'fumble', 'fumbles', 'turnover', 'giveaway', 'takeaway'),
+    'scoring': ('touchdown', 'field goal is good', 'score', 'scoring', 'points', 'end zone'),
+    'kicking': ('punt', 'punts', 'field goal', 'kicks', 'special teams', 'extra point', 'kickoff'),
+    'penalty': ('penalty', 'flag', 'holding', 'false start', 'pass interference', 'offside'),
+    'clock': ('timeout', 'two-minute warning', 'spiked', 'kneels', 'clock management', 'run out the clock'),
+    'empty_backfield': ('shotgun', 'no huddle', 'spread', 'empty'),
+}
+CONCEPT_PATTERNS = {concept: re.compile(r'\b(?:' + '|'.join(re.escape(phrase) for phrase in phrases) + r')\b')
+                    for concept, phrases in CONCEPTS.items()}
+
+# Team abbreviations in field positions ("BLT 30") and any number carry no meaning for similarity
+NOISE = re.compile(r'\b[A-Z]{2,3}\b|\d+')
+
+# Dimensions of the vector space; features beyond this many share hashed dimensions
+MAX_DIMENSIONS = 2048
+
+
+def strip_noise(text):
+    """Drop player names, team abbreviations and numbers, which say nothing about the kind of play"""
+    return NOISE.sub(' ', PLAYER_NAME.sub(' ', text))
+
+
+def features(text, stripped=False):
+    """Sparse bag of features for a play description or question: words, word pairs and concepts"""
+    text = text if stripped else strip_noise(text)
+    lowered = text.lower()
+    counts = {}
+    for concept, pattern in CONCEPT_PATTERNS.items():
+        hits = len(pattern.findall(lowered))
+        if hits:
+            counts['concept:' + concept] = hits
+    tokens = [token for token in tokenize(text) if len(token) > 1]
+    for token in tokens:
+        counts[token] = counts.get(token, 0) + 1
+    for first, second in zip(tokens, tokens[1:]):
+        pair = first + ' ' + second
+        counts[pair] = counts.get(pair, 0) + 1
+    return counts
+
+
+def stable_hash(feature):
+    # Python's str hash changes per process; crc32 keeps dimensions identical across workers
+    return zlib.crc32(feature.encode('utf-8'))
+
+
+class VectorIndex:
+    """Offline embedding-style retrieval over TF-IDF feature vectors.
+
+    Every play and free-text passage becomes an L2-normalized TF-IDF vector
+    of word, word-pair and football-concept features. Once player names,
+    numbers and field positions are stripped, most plays share their vector
+    with many others, so only the distinct vectors are stored, as one
+    contiguous float32 matrix, and each row keeps an index into it. A query is
+    one matrix-vector product over the distinct vectors, a gather out to
+    rows, and argpartition for the top k. Drive and quarter units score as
+    their best play, via np.maximum.reduceat over their play ranges.
+    """
+
+    def __init__(self, corpus):
+        self.corpus = corpus
+        plays = corpus.plays
+        texts = []
+        for i in range(len(plays)):
+            parts = plays.text[i].split(' | ')
+            texts.append(' | '.join(parts[4:-1]) or plays.text[i])
+        passage_units = corpus.by_granularity['passage']
+        texts.extend(corpus.units[unit_id].text for unit_id in passage_units)
+        self.play_count = len(plays)
+        self.play_units = np.asarray(corpus.play_unit, dtype=np.int64)
+        self.passage_units = np.array(passage_units, dtype=np.int64)
+
+        # Deduplicate on the stripped text; rows point at their distinct vector
+        distinct = {}
+        row_vector = np.empty(len(texts), dtype=np.int32)
+        bags = []
+        for row, text in enumerate(texts):
+            text = strip_noise(text)
+            vector_id = distinct.get(text)
+            if vector_id is None:
+                vector_id = distinct[text] = len(bags)
+                bags.append(features(text, stripped=True))
+            row_vector[row] = vector_id
+        rows_per_vector = np.bincount(row_vector, minlength=len(bags))
+        document_frequency = {}
+        for bag, count in zip(bags, rows_per_vector.tolist()):
+            for feature in bag:
+                document_frequency[feature] = document_frequency.get(feature, 0) + count
+        self.row_vector = row_vector
+
+        # Most common features get their own dimension; the rest are hashed into the same space
+        ranked = sorted(document_frequency, key=lambda feature: (-document_frequency[feature], feature))
+        self.dimensions = max(1, min(len(ranked), MAX_DIMENSIONS))
+        self.vocabulary = {feature: dimension for dimension, feature in enumerate(ranked[:self.dimensions])}
+        rows = max(len(texts), 1)
+        self.idf = {feature: float(np.log((rows + 1) / (count + 1)) + 1.0)
+                    for feature, count in document_frequency.items()}
+
+        self.matrix = np.zeros((len(bags), self.dimensions), dtype=np.float32)
+        for vector_id, bag in enumerate(bags):
+            self.matrix[vector_id] = self.vectorize(bag)
+
+        # Play ranges of drive and quarter units, in play order, for reduceat
+        self.unit_starts = {}
+        for granularity in ('drive', 'quarter'):
+            unit_ids = corpus.by_granularity[granularity]
+            self.unit_starts[granularity] = (
+                np.array(unit_ids, dtype=np.int64),
+                np.array([corpus.units[unit_id].play_start for unit_id in unit_ids], dtype=np.int64),
+            )
+
+    def dimension(self, feature):
+        dimension = self.vocabulary.get(feature)
+        if dimension is None:
+            dimension = stable_hash(feature) % self.dimensions
+        return dimension
+
+    def vectorize(self, bag):
+        """Sublinear TF-IDF vector of a feature bag, L2-normalized; features unseen in the corpus are dropped"""
+        vector = np.zeros(self.dimensions, dtype=np.float32)
+        for feature, count in bag.items():
+            idf = self.idf.get(feature)
+            if idf is not None:
+                vector[self.dimension(feature)] += (1.0 + np.log(count)) * idf
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm > 0 else vector
+
+    def row_scores(self, query):
+        """Cosine similarity of the query to every play row then every passage row, or None if nothing matches"""
+        if not len(self.matrix):
+            return None
+        query_vector = self.vectorize(features(query))
+        if not query_vector.any():
+            return None
+        return (self.matrix @ query_vector)[self.row_vector]
+
+    def search(self, query, granularity, limit, candidates=None, ranges=None):
+        """Top (score, unit_id) of a granularity by vector similarity.
+
+        With candidates (unit ids selected by filters) only those units are
+        eligible; otherwise passages compete alongside, as in lexical search.
+        With ranges (unit id ranges of routed game shards) only units inside
+        them are ranked.
+        """
+        scores = self.row_scores(query)
+        if scores is None:
+            return []
+        play_scores = scores[:self.play_count]
+        if granularity == 'play':
+            unit_ids = self.play_units
+            unit_scores = play_scores
+        elif granularity == 'passage':
+            unit_ids, unit_scores = self.passage_units, scores[self.play_count:]
+        else:
+            unit_ids, starts = self.unit_starts[granularity]
+            unit_scores = np.maximum.reduceat(play_scores, starts) if len(starts) else play_scores[:0]
+        if ranges is not None and granularity != 'passage':
+            bounds = np.searchsorted(unit_ids, np.asarray(ranges, dtype=np.int64).reshape(-1, 2))
+            in_shard = np.zeros(len(unit_ids), dtype=bool)
+            for start, end in bounds.tolist():
+                in_shard[start:end] = True
+            unit_ids, unit_scores = unit_ids[in_shard], unit_scores[in_shard]
+        if candidates is not None:
+            eligible = np.isin(unit_ids, np.fromiter(candidates, dtype=np.int64, count=len(candidates)))
+            unit_ids, unit_scores = unit_ids[eligible], unit_scores[eligible]
+        elif granularity != 'passage' and len(self.passage_units):
+            unit_ids = np.concatenate([unit_ids, self.passage_units])
+            unit_scores = np.concatenate([unit_scores, scores[self.play_count:]])
+        if not len(unit_scores):
+            return []
+        limit = min(limit, len(unit_scores))
+        top = np.argpartition(-unit_scores, limit - 1)[:limit]
+        top = top[np.argsort(-unit_scores[top], kind='stable')]
+        return [(float(unit_scores[i]), int(unit_ids[i])) for i in top if unit_scores[i] > 0]